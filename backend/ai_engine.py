@@ -1,20 +1,29 @@
 import subprocess
 import music21
 import os
-import base64
-import platform
 import shutil
 import io
+import contextvars
 import copy
-from datetime import datetime
-from typing import Optional, List
+import json
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, List, Dict, Tuple, Union
 from PIL import Image, ImageEnhance, ImageFilter, ImageOps
 
-print("\n" + "="*50)
-print("🛡️ [System] EasyScore AI Engine (Persistent Storage Mode)")
-print("   - 모든 변환 파일이 './saved_results' 폴더에 영구 저장됩니다.")
-print("   - 임시 폴더(tempfile) 사용을 중단했습니다.")
-print("="*50 + "\n")
+import arrange
+import key_analysis
+import metrics
+import omr_pool
+import preprocess
+import tools
+import tracing
+from tools import IS_WINDOWS
+from workspace import Workspace
 
 # =========================================================
 # 📂 1. 저장 경로 강제 설정 (절대 사라지지 않음)
@@ -22,97 +31,175 @@ print("="*50 + "\n")
 BASE_OUTPUT_DIR = os.path.join(os.getcwd(), "saved_results")
 os.makedirs(BASE_OUTPUT_DIR, exist_ok=True)
 
+# 난이도 (편곡 모드, 파일 이름에 쓰는 이름) / 결과 파일 형식
+LEVEL_MODES = [("hard", "HARD"), ("easy", "EASY"), ("super_easy", "SUPER_EASY")]
+FORMATS = ("midi", "png")
+
+# 여러 페이지 입력일 때 페이지별 OMR 결과를 합쳐서 저장하는 파일 이름 (result_cache가 OMR 결과로 사용)
+MERGED_OMR_NAME = "omr_merged.musicxml"
+
+# 결과 캐시 키에 들어가는 파이프라인 버전/파라미터
+# (전처리나 편곡 로직을 바꾸면 버전을 올려서 기존 캐시를 무효화)
+PIPELINE_PARAMS = {
+    "version": 3,
+    "preprocess": preprocess.DEFAULT_PARAMS,
+    "key_profile": key_analysis.KEY_PROFILE,
+    "levels": ["HARD", "EASY", "SUPER_EASY"],
+}
+
 # =========================================================
-# 🕵️ OS 및 경로 설정
+# 🕵️ OS 및 외부 프로그램 경로 (tools.py에서 한 번만 찾고 캐시)
 # =========================================================
-CURRENT_OS = platform.system()
-IS_WINDOWS = CURRENT_OS == "Windows"
-IS_MAC = CURRENT_OS == "Darwin"
-USER_MUSESCORE_PATH = r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe"
-
 def find_musescore() -> str:
-    if IS_WINDOWS and USER_MUSESCORE_PATH and os.path.exists(USER_MUSESCORE_PATH):
-        return USER_MUSESCORE_PATH
-    search_paths = []
-    if IS_WINDOWS:
-        search_paths = [
-            r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe",
-            r"C:\Program Files (x86)\MuseScore 4\bin\MuseScore4.exe",
-            r"C:\Program Files\MuseScore Studio 4\bin\MuseScore4.exe",
-        ]
-    elif IS_MAC:
-        search_paths = [
-            '/Applications/MuseScore 4.app/Contents/MacOS/mscore',
-            '/Applications/MuseScore Studio 4.app/Contents/MacOS/mscore',
-        ]
-    for path in search_paths:
-        if os.path.exists(path): return path
-    cmd = "MuseScore4" if IS_WINDOWS else "mscore"
-    if shutil.which(cmd): return shutil.which(cmd)
-    return ""
+    return tools.musescore_path()
 
 def find_audiveris_info() -> dict:
-    if IS_WINDOWS:
-        search_roots = [
-            r"C:\Program Files\Audiveris",
-            r"C:\Audiveris",
-            os.path.expanduser(r"~\AppData\Local\Audiveris")
-        ]
-    else:
-        search_roots = ["/Applications/Audiveris.app", "/usr/local/share/audiveris"]
-    for root_dir in search_roots:
-        if not os.path.exists(root_dir): continue
-        jar_path = None
-        for current_root, dirs, files in os.walk(root_dir):
-            if "audiveris.jar" in files:
-                jar_path = os.path.join(current_root, "audiveris.jar")
-                break
-        if jar_path:
-            install_root = os.path.dirname(os.path.dirname(jar_path))
-            bundled_java = os.path.join(install_root, "runtime", "bin", "java.exe")
-            if not os.path.exists(bundled_java):
-                 bundled_java = os.path.join(install_root, "bin", "runtime", "bin", "java.exe")
-            final_java = bundled_java if os.path.exists(bundled_java) else "java"
-            return { "jar": jar_path, "root": install_root, "java_cmd": final_java }
-    raise RuntimeError("Audiveris를 찾을 수 없습니다.")
+    return tools.audiveris_info()
 
 def setup_music21():
-    try:
-        ms = find_musescore()
-        if ms:
-            us = music21.environment.UserSettings()
-            us['musicxmlPath'] = ms
-            us['musescoreDirectPNGPath'] = ms
-    except: pass
-
-setup_music21() 
+    tools.configure_music21()
 
 # =========================================================
 # MuseScore 변환기
 # =========================================================
+def _run_tool(tool: str, mode: str, cmd: List[str], timeout: float, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run + 실행 시간/타임아웃/실패 수 기록 (예외는 그대로 전달)"""
+    start = time.perf_counter()
+    reason = None
+    try:
+        return subprocess.run(
+            cmd, check=True, timeout=timeout,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False, **kwargs
+        )
+    except subprocess.TimeoutExpired:
+        reason = "timeout"
+        raise
+    except subprocess.CalledProcessError:
+        reason = "exit"
+        raise
+    except Exception:
+        reason = "error"
+        raise
+    finally:
+        metrics.record_subprocess(tool, mode, time.perf_counter() - start, reason)
+
+def _check_output(output_path: str) -> bool:
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 100:
+        return True
+    # 여러 페이지 PNG는 "이름-1.png" 형태로 나옴
+    base, ext = os.path.splitext(output_path)
+    alt = f"{base}-1{ext}"
+    if os.path.exists(alt):
+        shutil.move(alt, output_path)
+        return True
+    return False
+
+@tracing.traced()
 def convert_with_musescore(input_path: str, output_path: str) -> bool:
     ms_path = find_musescore()
     if not ms_path: return False
     cmd = [ms_path, "-o", output_path, input_path]
     try:
-        subprocess.run(
-            cmd, check=True, timeout=120, 
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False 
-        )
-        if os.path.exists(output_path) and os.path.getsize(output_path) > 100:
-            return True
-        base, ext = os.path.splitext(output_path)
-        alt = f"{base}-1{ext}"
-        if os.path.exists(alt):
-            shutil.move(alt, output_path)
-            return True
+        _run_tool("musescore", "single", cmd, timeout=120)
+        return _check_output(output_path)
     except: pass
     return False
 
+@tracing.traced()
+def convert_batch_with_musescore(jobs: List[Tuple[str, List[str]]], job_dir: Optional[str] = None) -> Dict[str, bool]:
+    """
+    여러 변환을 MuseScore 1번 실행으로 처리 (job 파일 모드: mscore -j job.json)
+    jobs = [(입력 경로, [출력 경로, ...]), ...]  →  {출력 경로: 성공 여부}
+    job_dir = job 파일을 둘 폴더 (보통 요청의 scratch 폴더, 없으면 시스템 임시 폴더)
+    """
+    results = {out: False for _, outs in jobs for out in outs}
+    ms_path = find_musescore()
+    if not ms_path or not jobs: return results
+
+    # job 파일도 중간 파일이므로 결과 폴더(saved_results)가 아니라 scratch/임시 폴더에 둠
+    if job_dir: os.makedirs(job_dir, exist_ok=True)
+    fd, job_path = tempfile.mkstemp(prefix="msjob_", suffix=".json", dir=job_dir)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump([{"in": src, "out": outs} for src, outs in jobs], f, ensure_ascii=False)
+
+    batch_ok = True
+    try:
+        _run_tool("musescore", "batch", [ms_path, "-j", job_path], timeout=120 + 30 * len(jobs))
+    except Exception as e:
+        batch_ok = False
+        print(f"⚠️ MuseScore 일괄 변환 실패, 남은 파일만 개별 변환: {e}")
+    finally:
+        try: os.remove(job_path)
+        except OSError: pass
+
+    for src, outs in jobs:
+        for out in outs:
+            results[out] = _check_output(out)
+            # 일괄 실행이 중간에 죽었으면 빠진 것만 예전 방식으로 다시 시도
+            if not results[out] and not batch_ok:
+                results[out] = convert_with_musescore(src, out)
+    return results
+
+class MuseScoreBatcher:
+    """
+    동시에 들어온 요청들의 변환을 모아서 MuseScore 1번으로 처리
+    - 먼저 온 요청이 window 초 동안 기다렸다가 그동안 쌓인 변환을 한꺼번에 실행
+    - window <= 0 이면 모으지 않고 요청별로 바로 실행
+    """
+    def __init__(self, window: float):
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = []
+
+    @tracing.traced("musescore_batcher.convert")
+    def convert(self, jobs: List[Tuple[str, List[str]]], job_dir: Optional[str] = None) -> Dict[str, bool]:
+        if self.window <= 0:
+            return convert_batch_with_musescore(jobs, job_dir)
+
+        req = {"jobs": jobs, "job_dir": job_dir, "done": threading.Event(), "result": {}}
+        with self._lock:
+            self._pending.append(req)
+            is_leader = len(self._pending) == 1
+
+        if is_leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            all_jobs = [job for r in batch for job in r["jobs"]]
+            try:
+                # 묶음 전체의 job 파일은 먼저 온 요청(자기 변환이 끝날 때까지 대기 중)의 폴더에 둠
+                results = convert_batch_with_musescore(all_jobs, req["job_dir"])
+            except Exception as e:
+                print(f"❌ MuseScore 일괄 변환 오류: {e}")
+                results = {}
+            for r in batch:
+                r["result"] = {out: results.get(out, False) for _, outs in r["jobs"] for out in outs}
+                r["done"].set()
+
+        req["done"].wait()
+        return req["result"]
+
+# 동시 요청 묶음 대기 시간 (초, 기본 0 = 묶지 않음)
+# - 켜면 모든 변환이 window만큼 늦어지므로(요청이 하나뿐일 때도) 동시 요청이 많은 서버에서만 사용
+#   export EASYSCORE_MUSESCORE_BATCH_WINDOW=0.2
+musescore_batcher = MuseScoreBatcher(float(os.getenv("EASYSCORE_MUSESCORE_BATCH_WINDOW", "0")))
+
 # =========================================================
 # 이미지 전처리
 # =========================================================
+@tracing.traced()
 def preprocess_image(image_bytes: bytes) -> bytes:
+    # NumPy 전처리 엔진 (적응형 이진화 + 기울기 보정 + 잡티 제거) → preprocess.py
+    try:
+        processed, timings = preprocess.preprocess(image_bytes, PIPELINE_PARAMS["preprocess"])
+        print(f"🖼️ 전처리 완료: {timings}")
+        return processed
+    except Exception as e:
+        print(f"⚠️ 전처리 실패, 원본 사용: {e}")
+        return image_bytes
+
+def preprocess_image_legacy(image_bytes: bytes) -> bytes:
+    # 예전 방식 (고정 임계값 140) - 비교/벤치마크용으로 남겨둠
     try:
         img = Image.open(io.BytesIO(image_bytes)).convert("L")
         target_width = 2500
@@ -135,15 +222,18 @@ def preprocess_image(image_bytes: bytes) -> bytes:
 # =========================================================
 # 박자 및 편곡 로직 (기존 로직 유지)
 # =========================================================
+@tracing.traced()
 def _force_clean_durations(score):
     try: score.quantize(quarterLengthDivisors=(4, 12), processOffsets=True, processDurations=True, inPlace=True)
     except: pass
     return score
+@tracing.traced()
 def _clean_omr_artifacts(score):
     try: score.quantize(quarterLengthDivisors=(4, 12, 16), processOffsets=True, processDurations=True, inPlace=True)
     except: pass
     return score
 def _transpose_smart(score):
+    # 예전 방식 (악보 전체 복사) - _simplify_vertical_legacy용, 지금은 key_analysis.transpose_smart 사용
     try:
         key = score.analyze("key")
         target = music21.key.Key("C") if key.mode == "major" else music21.key.Key("a")
@@ -157,7 +247,60 @@ def _transpose_smart(score):
     except: pass
     return score
 
+# =========================================================
+# 🎚️ 정규화 (입력 악보당 1번)
+# - 예전: 난이도마다 양자화 2번 + 조 분석 + 이조를 같은 악보에 반복
+# - 지금: 정리 → 음표 배열 추출 → 조 분석/이조를 1번만 하고 읽기 전용 NoteTable로 고정
+#   → 세 난이도가 같은 배열을 공유 (프로세스 풀에도 배열 그대로 전달)
+# - 결과는 run 폴더에 normalized_score.npz로 저장 (캐시 일부 적중 시 악보 파싱부터 건너뜀)
+# =========================================================
+NORMALIZED_NAME = "normalized_score.npz"
+
+def _normalize_params() -> dict:
+    # 저장된 정규화 결과를 다시 써도 되는지 확인하는 값 (바뀌면 새로 정규화)
+    return {"key_profile": key_analysis.KEY_PROFILE, "dtype": str(arrange.NOTE_DTYPE.descr)}
+
+@tracing.traced()
+def normalize_score(score_in) -> arrange.NoteTable:
+    """정리된 music21 Score → 이조까지 끝난 읽기 전용 NoteTable (+ info: 조, 박자, 음역, 파트)"""
+    score_in = _clean_omr_artifacts(score_in)
+    score_in = _force_clean_durations(score_in)
+    table = arrange.extract(score_in)
+    analysis = key_analysis.transpose_smart(table)
+    table.info = dict(
+        arrange.describe(table),
+        key=analysis.to_dict() if analysis else None,
+        params=_normalize_params(),
+    )
+    return table.freeze()
+
+@tracing.traced()
+def load_normalized(run_dir: str) -> Optional[arrange.NoteTable]:
+    """run 폴더에 저장된 정규화 결과 (없거나 설정이 바뀌었으면 None)"""
+    path = os.path.join(run_dir, NORMALIZED_NAME)
+    if not os.path.isfile(path):
+        return None
+    try:
+        table = arrange.NoteTable.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ 정규화 결과를 읽을 수 없음, 다시 계산: {e}")
+        return None
+    return table if table.info.get("params") == _normalize_params() else None
+
+def _arrange_table(table: arrange.NoteTable, mode: str):
+    # 음표 규칙은 NumPy 배열 엔진에서 한 번에 처리 → arrange.py
+    with tracing.span("simplify_vertical", mode=mode):
+        with tracing.span("arrange.simplify", mode=mode):
+            simplified = arrange.simplify(table, mode)
+        with tracing.span("arrange.to_score", mode=mode):
+            new_score = arrange.to_score(simplified, beams=(mode == "hard"))
+        return _force_clean_durations(new_score)
+
 def _simplify_vertical(score_in, mode="easy"):
+    return _arrange_table(normalize_score(score_in), mode)
+
+def _simplify_vertical_legacy(score_in, mode="easy"):
+    # 예전 방식 (음표마다 music21 객체 생성) - 비교/벤치마크용으로 남겨둠
     score_in = _clean_omr_artifacts(score_in)
     score_in = _force_clean_durations(score_in)
     score_in = _transpose_smart(score_in)
@@ -247,17 +390,28 @@ def _simplify_vertical(score_in, mode="easy"):
 # =========================================================
 # 🔥 [핵심 수정] Audiveris 실행 (영구 저장 모드)
 # =========================================================
-def run_audiveris(image_bytes: bytes) -> str:
-    # 1. 오늘 날짜/시간으로 폴더 생성
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    save_dir = os.path.join(BASE_OUTPUT_DIR, f"run_{timestamp}")
-    os.makedirs(save_dir, exist_ok=True)
-    
-    print(f"📂 작업 폴더 생성됨: {save_dir}")
+@tracing.traced()
+def _run_omr(
+    image_bytes: bytes,
+    workspace: Workspace,
+    page: Optional[int] = None,
+    wait_for_pool: bool = True,
+) -> str:
+    """
+    전처리 + Audiveris 실행 후, Audiveris가 내보낸 MusicXML/MXL 경로 반환
+    - page: 여러 페이지 입력일 때 페이지 번호 (페이지마다 page_001/ 같은 하위 폴더 사용)
+    - wait_for_pool=False: 워커 풀이 모두 바쁘면 기다리지 않고 1회성 실행으로 바로 처리
+    """
+    # 1. 요청별 작업 폴더 (Audiveris 내부 파일은 scratch 쪽에 생김)
+    input_name = "input.png" if page is None else os.path.join(f"page_{page:03d}", "input.png")
+    stage_info = {} if page is None else {"page": page}
+    save_dir = os.path.dirname(workspace.scratch(input_name))
+    print(f"📂 작업 폴더: {workspace.id}" + ("" if page is None else f" (페이지 {page})"))
 
     # 2. 전처리된 이미지 저장
-    input_image_path = os.path.join(save_dir, "input.png")
-    processed_bytes = preprocess_image(image_bytes)
+    input_image_path = workspace.scratch(input_name)
+    with workspace.stage("preprocess", **stage_info):
+        processed_bytes = preprocess_image(image_bytes)
     with open(input_image_path, "wb") as f:
         f.write(processed_bytes)
     
@@ -265,142 +419,431 @@ def run_audiveris(image_bytes: bytes) -> str:
     # with open(os.path.join(save_dir, "original_input.png"), "wb") as f:
     #     f.write(image_bytes)
         
-    info = find_audiveris_info()
-    separator = ";" if IS_WINDOWS else ":"
-    cp_list = [
-        info["jar"],
-        os.path.join(info["root"], "lib", "*"),
-        os.path.join(info["root"], "app", "*"),
-        os.path.join(info["root"], "*")
-    ]
-    
-    command = [
-        info["java_cmd"], "-cp", separator.join(cp_list), "org.audiveris.omr.Main",
-        "-batch", "-output", save_dir, "-export", input_image_path
-    ]
+    with workspace.stage("omr", **stage_info):
+        info = find_audiveris_info()
+        separator = ";" if IS_WINDOWS else ":"
+        cp_list = [
+            info["jar"],
+            os.path.join(info["root"], "lib", "*"),
+            os.path.join(info["root"], "app", "*"),
+            os.path.join(info["root"], "*")
+        ]
     
-    print("⚙️ Audiveris 엔진 가동...")
+        pool = omr_pool.get_pool(info["java_cmd"], cp_list, separator)
+        used_pool = False
+        if pool:
+            # 상주 JVM 워커에 이미지 전달 (JVM 기동 비용 없음)
+            print("☕ Audiveris 워커 풀로 인식 중...")
+            try:
+                pool.recognize(input_image_path, save_dir, timeout=180, wait=wait_for_pool)
+                used_pool = True
+            except omr_pool.PoolBusy:
+                print("☕ 워커가 모두 사용 중 → 이 페이지는 1회성 실행으로 처리")
+            except omr_pool.WorkerError as e:
+                print(f"⚠️ Audiveris 워커 실패, 1회성 실행으로 재시도: {e}")
+
+        if not used_pool:
+            command = [
+                info["java_cmd"], "-cp", separator.join(cp_list), "org.audiveris.omr.Main",
+                "-batch", "-output", save_dir, "-export", input_image_path
+            ]
+
+            print("⚙️ Audiveris 엔진 가동...")
+            try:
+                _run_tool("audiveris", "oneshot", command, timeout=180, text=True)
+            except subprocess.CalledProcessError as e:
+                if "JavaFX" not in e.stderr: print(f"⚠️ Audiveris 경고: {e.stderr}")
+
+        found_file = None
+        for root, _, files in os.walk(save_dir):
+            for file in files:
+                if file.endswith(".musicxml") or file.endswith(".mxl"):
+                    found_file = os.path.join(root, file)
+                    break
+            if found_file: break
+
+        if not found_file: raise RuntimeError("변환된 악보 파일을 찾을 수 없습니다.")
+    # 입력 이미지와 OMR 결과만 run 폴더에 남김
+    workspace.keep(input_image_path)
+    return workspace.keep(found_file)
+
+# =========================================================
+# OMR 결과 정리 (메모리 안에서 바로 처리)
+# - 예전: MXL → MuseScore → MIDI → music21 → XML 저장 → 다시 파싱
+# - 지금: MXL을 music21로 1번만 읽고, MIDI 변환이 해주던 정리를 직접 수행
+# =========================================================
+def _normalize_omr_score(score):
+    # MIDI를 거치면 저절로 되던 것: 실제 소리 나는 음높이(옥타브 기호 8va/8vb, 이조 악기)와
+    # 반복 기호 펼치기 → 지우기 전에 먼저 적용
+    try:
+        score = score.toSoundingPitch(inPlace=False)
+    except Exception as e:
+        print(f"⚠️ 실음 변환 실패 (표기 음높이 그대로 사용): {e}")
     try:
-        subprocess.run(command, check=True, timeout=180, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=False)
-    except subprocess.CalledProcessError as e:
-        if "JavaFX" not in e.stderr: print(f"⚠️ Audiveris 경고: {e.stderr}")
-
-    found_file = None
-    for root, _, files in os.walk(save_dir):
-        for file in files:
-            if file.endswith(".musicxml") or file.endswith(".mxl"):
-                found_file = os.path.join(root, file)
-                break
-        if found_file: break
-
-    if not found_file: raise RuntimeError("변환된 악보 파일을 찾을 수 없습니다.")
-
-    # MIDI 및 XML 저장 (영구 보존)
-    midi_path = os.path.join(save_dir, "clean_score.mid")
-    if convert_with_musescore(found_file, midi_path):
+        score = score.expandRepeats()
+    except Exception as e:
+        # 반복 기호가 짝이 맞지 않는 등 잘못 인식된 경우는 펼치지 않음
+        print(f"⚠️ 반복 기호 펼치기 실패 (그대로 사용): {e}")
+    # 소리에 영향이 없는 레이아웃/텍스트 요소만 제거 (슬러, 옥타브 선 등 스패너는 유지)
+    junk = list(score.recurse().getElementsByClass(
+        [music21.layout.LayoutBase, music21.expressions.TextExpression]
+    ))
+    for el in junk:
+        site = el.activeSite
+        if site is not None:
+            site.remove(el)
+    # 음표가 하나도 없는 파트(인식 잡음) 제거
+    for part in list(score.parts):
+        if not part.recurse().notes:
+            score.remove(part)
+    return _force_clean_durations(score)
+
+@tracing.traced()
+def load_omr_score(omr_path: str):
+    """Audiveris 결과(.mxl/.musicxml)를 읽어서 정리된 Score 객체로 반환"""
+    try:
+        with metrics.timed("music21_parse"), tracing.span("music21_parse"):
+            score = music21.converter.parse(omr_path)
+    except Exception as e:
+        raise RuntimeError(f"OMR 결과를 읽을 수 없습니다: {e}")
+    if not isinstance(score, music21.stream.Score):
+        wrapper = music21.stream.Score()
+        wrapper.insert(0, score)
+        score = wrapper
+    return _normalize_omr_score(score)
+
+@tracing.traced()
+def recognize_score(image_bytes: bytes, workspace: Optional[Workspace] = None):
+    """이미지 → 정리된 music21 Score (simplify_and_generate에 바로 전달)"""
+    workspace = workspace or Workspace(BASE_OUTPUT_DIR)
+    omr_path = _run_omr(image_bytes, workspace)
+    with workspace.stage("load_score"):
+        return load_omr_score(omr_path)
+
+# =========================================================
+# 📄 여러 페이지 악보 (PDF / 이미지 여러 장)
+# - 페이지마다 Audiveris를 동시에 실행 (워커 풀이 바쁘면 남는 페이지는 1회성 실행)
+#   → 전체 시간이 페이지 수의 합이 아니라 대략 한 페이지 시간
+# - 페이지별 결과를 파트 순서대로 이어 붙여 하나의 악보로 만든 뒤 편곡
+#   동시 실행 페이지 수:  export EASYSCORE_OMR_PAGE_WORKERS=4
+# =========================================================
+OMR_PAGE_WORKERS = int(os.getenv("EASYSCORE_OMR_PAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+def _rest_measure(reference: music21.stream.Measure) -> music21.stream.Measure:
+    # 어떤 페이지에서 파트가 인식되지 않았을 때 채워 넣을 쉼표 마디
+    measure = music21.stream.Measure()
+    measure.append(music21.note.Rest(quarterLength=reference.duration.quarterLength or 4.0))
+    return measure
+
+@tracing.traced()
+def merge_page_scores(scores: List[music21.stream.Score]) -> music21.stream.Score:
+    """페이지별 Score → 마디 번호가 이어지는 하나의 Score"""
+    if len(scores) == 1:
+        return scores[0]
+    part_count = max(len(s.parts) for s in scores)
+    merged = music21.stream.Score()
+    merged_parts = [music21.stream.Part() for _ in range(part_count)]
+    # 파트 이름/악기는 그 파트가 처음 나온 페이지 기준
+    for i, part in enumerate(merged_parts):
+        first = next(s.parts[i] for s in scores if len(s.parts) > i)
+        part.id = first.id
+        part.partName = first.partName
+
+    number = 0
+    for score in scores:
+        page_measures = [list(p.getElementsByClass(music21.stream.Measure)) for p in score.parts]
+        length = max((len(m) for m in page_measures), default=0)
+        for i, part in enumerate(merged_parts):
+            measures = page_measures[i] if i < len(page_measures) else []
+            for j in range(length):
+                if j < len(measures):
+                    measure = measures[j]
+                else:
+                    reference = next(m[j] for m in page_measures if len(m) > j)
+                    measure = _rest_measure(reference)
+                measure.number = number + j + 1
+                part.append(measure)
+        number += length
+
+    for part in merged_parts:
+        merged.insert(0, part)
+    return merged
+
+@tracing.traced()
+def recognize_pages(pages: List[bytes], workspace: Optional[Workspace] = None):
+    """페이지 이미지 목록 → 이어 붙인 music21 Score (1장이면 recognize_score와 동일)"""
+    workspace = workspace or Workspace(BASE_OUTPUT_DIR)
+    if len(pages) == 1:
+        return recognize_score(pages[0], workspace)
+
+    print(f"📄 {len(pages)}페이지 동시 인식 시작 (최대 {OMR_PAGE_WORKERS}개 동시)")
+    with workspace.stage("omr_pages", pages=len(pages)):
+        with ThreadPoolExecutor(max_workers=max(1, min(OMR_PAGE_WORKERS, len(pages))),
+                                thread_name_prefix="easyscore-page") as ex:
+            # 페이지 스레드에도 요청의 추적 정보(contextvars)를 넘김
+            futures = [
+                ex.submit(contextvars.copy_context().run, _run_omr, page_bytes, workspace, page=i + 1, wait_for_pool=False)
+                for i, page_bytes in enumerate(pages)
+            ]
+            omr_paths = [f.result() for f in futures]
+
+    with workspace.stage("load_score", pages=len(pages)):
+        merged = merge_page_scores([load_omr_score(path) for path in omr_paths])
+        # 합친 악보를 저장해두면 캐시에서 다른 난이도만 다시 만들 때 OMR을 건너뛸 수 있음
+        merged.write("musicxml", fp=workspace.path(MERGED_OMR_NAME))
+    return merged
+
+@tracing.traced()
+def run_audiveris(image_bytes: bytes, workspace: Optional[Workspace] = None) -> str:
+    """이미지 → 정리된 MusicXML 문자열 (테스트/호환성용)"""
+    workspace = workspace or Workspace(BASE_OUTPUT_DIR)
+    found_file = _run_omr(image_bytes, workspace)
+    score = load_omr_score(found_file)
+    clean_xml_output = workspace.path("final_output.musicxml")
+    score.write('musicxml', fp=clean_xml_output)
+    print(f"✅ 최종 XML 저장됨: {clean_xml_output}")
+    with open(clean_xml_output, "r", encoding="utf-8") as f:
+        return f.read()
+
+# =========================================================
+# 🧩 난이도별 병렬 처리 (프로세스 풀)
+# - HARD / EASY / SUPER_EASY 편곡 + XML 저장, PNG 후처리를 동시에 실행
+# - 워커는 music21을 미리 import 해둔 상태로 대기 (첫 작업부터 빠름)
+# - 워커 수:  export EASYSCORE_LEVEL_WORKERS=3   (0 또는 1이면 순차 실행)
+# =========================================================
+LEVEL_WORKERS = int(os.getenv("EASYSCORE_LEVEL_WORKERS", str(min(3, os.cpu_count() or 1))))
+_level_pool: Optional[ProcessPoolExecutor] = None
+_level_pool_lock = threading.Lock()
+
+def _init_level_worker():
+    # music21 내부 모듈들을 미리 한 번 써서 로딩해둠
+    music21.stream.Score().append(music21.note.Note("C4"))
+
+def _level_worker_pid() -> int:
+    return os.getpid()
+
+def get_level_pool() -> Optional[ProcessPoolExecutor]:
+    global _level_pool
+    if LEVEL_WORKERS <= 1: return None
+    with _level_pool_lock:
+        if _level_pool is None:
+            # fork 대신 spawn: 스레드가 많은 서버 프로세스에서도 안전하고 Windows와 동작이 같음
+            _level_pool = ProcessPoolExecutor(
+                max_workers=LEVEL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_level_worker,
+            )
+            # 워커 프로세스를 미리 전부 띄워둠
+            for f in [_level_pool.submit(_level_worker_pid) for _ in range(LEVEL_WORKERS)]: f.result()
+            print(f"🧩 난이도 처리 워커 {LEVEL_WORKERS}개 준비 완료")
+        return _level_pool
+
+def shutdown_level_pool():
+    global _level_pool
+    with _level_pool_lock:
+        if _level_pool is not None:
+            _level_pool.shutdown(wait=False, cancel_futures=True)
+            _level_pool = None
+
+def _level_paths(workspace: Workspace, suffix: str, keep_midi: bool = True) -> dict:
+    # 파일명 구분: hard / easy / super_easy
+    # (MuseScore가 뽑은 투명 PNG는 중간 파일이라 scratch에 둠, MIDI도 요청하지 않았으면 scratch)
+    base_name = f"result_{suffix}"
+    return {
+        "xml": workspace.path(f"{base_name}.musicxml"),
+        "midi": workspace.path(f"{base_name}.mid") if keep_midi else workspace.scratch(f"{base_name}.mid"),
+        "png": workspace.scratch(f"{base_name}.png"),
+        "final_png": workspace.path(f"{base_name}_final.png"),
+    }
+
+@tracing.traced()
+def _arrange_level(table: arrange.NoteTable, mode: str, xml_path: str) -> str:
+    score_obj = _arrange_table(table, mode)
+    score_obj.write("musicxml", xml_path)
+    return xml_path
+
+@tracing.traced()
+def _composite_png(png_path: str, final_png_path: str) -> str:
+    # 배경 투명화 처리
+    img = Image.open(png_path).convert("RGBA")
+    white = Image.new("RGBA", img.size, (255, 255, 255, 255))
+    merged = Image.alpha_composite(white, img).convert("RGB")
+    merged.save(final_png_path, "PNG")
+    return final_png_path
+
+def _timed_call(fn, *args) -> float:
+    # 워커 프로세스 안에서 실행 시간을 재서 돌려줌 (지표는 서버 프로세스에서 기록)
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def _run_level_tasks(fn, tasks: Dict[str, tuple], on_done=None, task: str = "level") -> Dict[str, bool]:
+    """
+    {suffix: 인자 튜플} 을 풀에서 동시에 실행 → {suffix: 성공 여부}
+    on_done(suffix, 성공 여부)는 끝나는 순서대로 바로 호출됨
+    task: 난이도별 소요 시간 지표에 쓰는 작업 이름 (arrange / composite)
+    프로파일링 중인 요청은 이 프로세스에서 순차 실행 (워커 프로세스의 스택은 샘플링할 수 없음)
+    """
+    results = {}
+    pool = get_level_pool() if len(tasks) > 1 and not tracing.profiling() else None
+    futures = {}
+    if pool:
         try:
-            score = music21.converter.parse(midi_path)
-            score = _force_clean_durations(score)
-            
-            clean_xml_output = os.path.join(save_dir, "final_output.musicxml")
-            score.write('musicxml', fp=clean_xml_output)
-            print(f"✅ 최종 XML 저장됨: {clean_xml_output}")
-            
-            with open(clean_xml_output, "r", encoding="utf-8") as f:
-                return f.read()
+            futures = {pool.submit(_timed_call, fn, *args): suffix for suffix, args in tasks.items()}
         except Exception as e:
-            raise RuntimeError(f"{e}")
-    else:
-         raise RuntimeError("MuseScore MIDI 변환 실패")
+            print(f"⚠️ 프로세스 풀 사용 불가, 순차 실행: {e}")
+            futures = {}
+
+    def run_here(suffix: str) -> bool:
+        try:
+            elapsed = _timed_call(fn, *tasks[suffix])
+        except Exception as e:
+            print(f"❌ [{suffix}] 처리 중 오류: {e}")
+            return False
+        metrics.LEVEL_TASK_SECONDS.labels(task=task, level=suffix).observe(elapsed)
+        return True
+
+    def finish(suffix: str, ok: bool) -> None:
+        results[suffix] = ok
+        if not ok:
+            metrics.LEVEL_TASK_FAILURES.labels(task=task, level=suffix).inc()
+        if on_done: on_done(suffix, ok)
+
+    if not futures:
+        for suffix in tasks:
+            finish(suffix, run_here(suffix))
+        return results
+    for future in as_completed(futures):
+        suffix = futures[future]
+        try:
+            elapsed = future.result()
+            metrics.LEVEL_TASK_SECONDS.labels(task=task, level=suffix).observe(elapsed)
+            tracing.record(task, elapsed, level=suffix, process="level_pool")
+            ok = True
+        except BrokenProcessPool:
+            # 워커가 죽은 경우 이 프로세스에서 다시 실행
+            shutdown_level_pool()
+            ok = run_here(suffix)
+        except Exception as e:
+            print(f"❌ [{suffix}] 처리 중 오류: {e}")
+            ok = False
+        finish(suffix, ok)
+    return results
 
 # =========================================================
 # 🔥 [핵심 수정] 편곡 및 결과 생성 (영구 저장 모드)
 # =========================================================
-def simplify_and_generate(music_xml_content: str) -> dict:
+@tracing.traced()
+def simplify_and_generate(
+    music_xml_content: Union[str, bytes, music21.stream.Score, arrange.NoteTable],
+    workspace: Optional[Workspace] = None,
+    levels: Optional[List[str]] = None,
+    formats: Optional[List[str]] = None,
+) -> dict:
+    """
+    levels: 만들 난이도 (예: ["EASY", "SUPER_EASY"]), None이면 전부
+    formats: 만들 파일 형식 ("midi", "png"), None이면 전부
+    → 요청하지 않은 난이도는 편곡하지 않고, 요청하지 않은 형식은 MuseScore 변환도 하지 않음
+    music_xml_content에 정규화된 NoteTable(load_normalized)을 주면 파싱/정규화를 건너뜀
+    """
     setup_music21()
-    
-    # 작업 폴더는 가장 최근에 생성된 폴더를 사용 (run_audiveris에서 만든 폴더)
-    latest_dirs = sorted([d for d in os.listdir(BASE_OUTPUT_DIR) if d.startswith("run_")], reverse=True)
-    if latest_dirs:
-        work_dir = os.path.join(BASE_OUTPUT_DIR, latest_dirs[0])
+    # 작업 폴더는 호출한 쪽(main.simplify_score)에서 만든 Workspace를 그대로 사용
+    workspace = workspace or Workspace(BASE_OUTPUT_DIR)
+    selected = [(mode, suffix) for mode, suffix in LEVEL_MODES if levels is None or suffix in levels]
+    formats = list(FORMATS) if formats is None else [f for f in FORMATS if f in formats]
+    want_midi, want_png = "midi" in formats, "png" in formats
+
+    if isinstance(music_xml_content, arrange.NoteTable):
+        score_in = None
+    elif isinstance(music_xml_content, music21.stream.Score):
+        # recognize_score에서 이미 정리된 Score → 다시 쓰고 읽을 필요 없음
+        score_in = music_xml_content
     else:
-        # 만약 폴더가 없으면 새로 생성 (비상용)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_fallback")
-        work_dir = os.path.join(BASE_OUTPUT_DIR, f"run_{timestamp}")
-        os.makedirs(work_dir, exist_ok=True)
-
-    if isinstance(music_xml_content, bytes):
-        try: music_xml_content = music_xml_content.decode('utf-8')
-        except: music_xml_content = music_xml_content.decode('latin-1')
-
-    # 입력 XML 파일로 저장
-    input_xml_path = os.path.join(work_dir, "source_input.musicxml")
-    with open(input_xml_path, "w", encoding='utf-8') as f:
-        f.write(music_xml_content)
-        
-    score_in = music21.converter.parse(input_xml_path)
-    
-    print("🌿 [Processing] 3단계 난이도 생성 중...")
-    
-    hard_score = _simplify_vertical(score_in, mode="hard")
-    normal_score = _simplify_vertical(score_in, mode="easy")
-    super_score = _simplify_vertical(score_in, mode="super_easy")
-    
-    def _generate_outputs(score_obj, suffix):
-        out_midi = None
-        out_png = None
-        
-        # 파일명 구분: hard / easy / super_easy
-        base_name = f"result_{suffix}"
-        xml_path = os.path.join(work_dir, f"{base_name}.musicxml")
-        midi_path = os.path.join(work_dir, f"{base_name}.mid")
-        png_path = os.path.join(work_dir, f"{base_name}.png")
-        final_png_path = os.path.join(work_dir, f"{base_name}_final.png")
-        
-        try:
-            # 1. XML 저장
-            score_obj.write("musicxml", xml_path)
-            
-            # 2. MIDI 변환 및 저장
-            if convert_with_musescore(xml_path, midi_path):
-                with open(midi_path, "rb") as f:
-                    out_midi = base64.b64encode(f.read()).decode()
-            
-            # 3. PNG 변환 및 저장
-            success = convert_with_musescore(xml_path, png_path)
-            if not success and out_midi:
-                # MIDI 백업본으로 시도
-                midi_temp = os.path.join(work_dir, f"{base_name}_temp.mid")
-                with open(midi_temp, "wb") as f:
-                    f.write(base64.b64decode(out_midi))
-                success = convert_with_musescore(midi_temp, png_path)
-
-            if success:
-                # 배경 투명화 처리
-                img = Image.open(png_path).convert("RGBA")
-                white = Image.new("RGBA", img.size, (255, 255, 255, 255))
-                merged = Image.alpha_composite(white, img).convert("RGB")
-                merged.save(final_png_path, "PNG")
-                
-                print(f"   ✨ [{suffix}] 변환 완료: {final_png_path}")
-                with open(final_png_path, "rb") as f:
-                    out_png = base64.b64encode(f.read()).decode()
-        except Exception as e:
-            print(f"❌ [{suffix}] 생성 중 오류: {e}")
-            pass
-        return out_midi, out_png
+        if isinstance(music_xml_content, bytes):
+            try: music_xml_content = music_xml_content.decode('utf-8')
+            except: music_xml_content = music_xml_content.decode('latin-1')
+
+        # 입력 XML 파일로 저장
+        input_xml_path = workspace.path("source_input.musicxml")
+        with open(input_xml_path, "w", encoding='utf-8') as f:
+            f.write(music_xml_content)
+
+        with metrics.timed("music21_parse"), tracing.span("music21_parse"):
+            score_in = music21.converter.parse(input_xml_path)
+
+    # 0. 정규화 (정리 + 조 분석 + 이조를 세 난이도 공통으로 1번)
+    if score_in is None:
+        table = music_xml_content
+    else:
+        with workspace.stage("normalize"):
+            table = normalize_score(score_in)
+            table.save(workspace.path(NORMALIZED_NAME))
+        key = table.info.get("key")
+        print(f"🎼 정규화 완료: {key['key'] if key else '조 판정 없음'} / {table.time_signature} / 음 {len(table)}개")
+
+    print(f"🌿 [Processing] 난이도 생성 중... ({', '.join(s for _, s in selected)} / {', '.join(formats)})")
+    paths = {suffix: _level_paths(workspace, suffix, keep_midi=want_midi) for _, suffix in selected}
+
+    outputs = {suffix: {"midi": None, "png": None} for _, suffix in selected}
+
+    def level_ready(suffix: str) -> None:
+        # 난이도 하나가 끝날 때마다 바로 알림 (프론트가 먼저 끝난 결과부터 보여줄 수 있음)
+        workspace.emit("level", level=suffix, run_id=workspace.id, files=dict(outputs[suffix]))
+
+    # 1. 난이도별 편곡 + XML 저장 (병렬)
+    with workspace.stage("arrange", levels=[s for _, s in selected]):
+        arranged = _run_level_tasks(_arrange_level, {
+            suffix: (table, mode, paths[suffix]["xml"]) for mode, suffix in selected
+        }, on_done=lambda sfx, ok: workspace.emit("level_arranged", level=sfx, ok=ok), task="arrange")
+    written = [suffix for _, suffix in selected if arranged[suffix]]
+
+    # 2. 요청한 형식만 MuseScore 1번 실행으로 변환
+    targets = [kind for kind in ("midi", "png") if kind in formats]
+    with workspace.stage("musescore", formats=targets):
+        converted = musescore_batcher.convert(
+            [(paths[sfx]["xml"], [paths[sfx][kind] for kind in targets]) for sfx in written],
+            workspace.scratch_dir,
+        ) if targets else {}
+    for suffix in written:
+        if want_midi and converted.get(paths[suffix]["midi"]):
+            outputs[suffix]["midi"] = paths[suffix]["midi"]
+        if not want_png:
+            level_ready(suffix)
+
+    # 3. PNG 실패한 난이도만 MIDI 백업본으로 다시 시도 (역시 한 번에)
+    if want_png:
+        retry = [sfx for sfx in written if not converted[paths[sfx]["png"]]]
+        if not want_midi and retry:
+            # MIDI를 요청하지 않았으면 백업용 MIDI를 먼저 scratch에 만듦
+            converted.update(musescore_batcher.convert(
+                [(paths[sfx]["xml"], [paths[sfx]["midi"]]) for sfx in retry], workspace.scratch_dir
+            ))
+        retry = [sfx for sfx in retry if converted.get(paths[sfx]["midi"])]
+        if retry:
+            converted.update(musescore_batcher.convert(
+                [(paths[sfx]["midi"], [paths[sfx]["png"]]) for sfx in retry], workspace.scratch_dir
+            ))
+
+    # 4. PNG 배경 처리 (병렬, 끝나는 난이도부터 결과 알림)
+    # 결과 파일은 run 폴더에 그대로 두고 경로만 반환
+    # (main.py가 /results/{run_id}/{level}.png|.mid URL로 바꿔서 내려줌)
+    def png_done(suffix: str, ok: bool) -> None:
+        if ok:
+            print(f"   ✨ [{suffix}] 변환 완료: {paths[suffix]['final_png']}")
+            outputs[suffix]["png"] = paths[suffix]["final_png"]
+        level_ready(suffix)
+
+    if want_png:
+        with workspace.stage("composite"):
+            pending = [sfx for sfx in written if converted.get(paths[sfx]["png"])]
+            for sfx in written:
+                if sfx not in pending: level_ready(sfx)
+            _run_level_tasks(_composite_png, {
+                sfx: (paths[sfx]["png"], paths[sfx]["final_png"]) for sfx in pending
+            }, on_done=png_done, task="composite")
 
-    hard_midi, hard_png = _generate_outputs(hard_score, "HARD")
-    norm_midi, norm_png = _generate_outputs(normal_score, "EASY")
-    super_midi, super_png = _generate_outputs(super_score, "SUPER_EASY")
-    
     return {
-        "hard_midi_base64": hard_midi,
-        "hard_image_base64": hard_png,
-        "easy_midi_base64": norm_midi,
-        "easy_image_base64": norm_png,
-        "super_easy_midi_base64": super_midi,
-        "super_easy_image_base64": super_png,
-        "simplified_midi_base64": norm_midi,
-        "simplified_image_base64": norm_png
-    }
\ No newline at end of file
+        "run_dir": workspace.run_dir,
+        "run_id": workspace.id,
+        "levels": outputs,
+    }
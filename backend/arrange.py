@@ -0,0 +1,403 @@
+# backend/arrange.py
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import music21
+import numpy as np
+
+# =========================================================
+# 🎼 편곡 엔진 (NumPy 음표 배열)
+# - 악보를 음 1개 = 행 1개인 구조화 배열(NOTE_DTYPE)로 펼침
+#   (화음은 같은 event 번호를 가진 여러 행, 화음 안 순서는 악보 그대로)
+# - HARD / EASY / SUPER_EASY 규칙을 배열 연산으로 한 번에 적용
+#   (예전 _simplify_vertical: 음표마다 music21 객체를 deepcopy → 새 Note/Chord 생성)
+# - music21 객체는 마지막에 XML로 쓸 때만 만듦 (to_score)
+# =========================================================
+NOTE_DTYPE = np.dtype([
+    ("event", np.int32),     # 같은 음표/화음에 속한 행은 같은 번호
+    ("source", np.int32),    # 원본 악보의 event 번호 (아티큘레이션 복사용)
+    ("part", np.int16),
+    ("onset", np.float64),   # 파트 처음부터의 위치 (quarterLength)
+    ("duration", np.float64),  # 꾸밈음은 표기 길이 (실제 길이는 0)
+    ("midi", np.int16),
+    ("step", np.int8),       # 원본 철자: C=0 ... B=6
+    ("alter", np.int8),      # 원본 철자: -1 = 플랫, 1 = 샤프
+    ("flags", np.uint8),
+])
+
+CHORD = 1      # music21 Chord (음이 1개여도 화음으로 씀)
+GRACE = 2      # 꾸밈음
+RESPELL = 4    # music21이 정한 철자 (pitch.midi = ... 로 옮긴 음, spellingIsInferred) → 이조하면 기본 철자로
+
+STEPS = "CDEFGAB"
+STEP_PC = np.array([0, 2, 4, 5, 7, 9, 11], dtype=np.int16)
+# pitch.midi = ... 로 정한 음의 철자 (음높이 클래스 → (step, alter))
+DEFAULT_STEP = np.array([0, 0, 1, 2, 2, 3, 3, 4, 4, 5, 6, 6], dtype=np.int8)
+DEFAULT_ALTER = np.array([0, 1, 0, -1, 0, 0, 1, 0, 1, 0, -1, 0], dtype=np.int8)
+
+
+class NoteTable:
+    """
+    악보 1개의 음표 배열 + 음표가 아닌 요소들 (전부 music21 객체가 아닌 일반 값 → 프로세스 풀/파일로 바로 전달)
+    - parts: 파트별 (offset, 음자리표/조표 정보) 목록 → element_from_data
+    - time_signature: 박자표 문자열 (예: "3/4")
+    - articulations: 원본 event 번호 → [아티큘레이션 이름, 손가락 번호] 목록 (있는 음표만)
+    - info: 정규화 때 붙이는 요약 정보 (조, 음역, 파트별 음표 수 등)
+    """
+    def __init__(
+        self,
+        notes: np.ndarray,
+        parts: List[List[Tuple[float, list]]],
+        time_signature: str = "4/4",
+        articulations: Optional[Dict[int, list]] = None,
+        info: Optional[dict] = None,
+    ):
+        self.notes = notes
+        self.parts = parts
+        self.time_signature = time_signature
+        self.articulations = articulations or {}
+        self.info = info or {}
+
+    def __len__(self) -> int:
+        return len(self.notes)
+
+    def freeze(self) -> "NoteTable":
+        """음표 배열을 읽기 전용으로 (여러 난이도가 같은 배열을 공유해도 안전)"""
+        self.notes.setflags(write=False)
+        return self
+
+    def save(self, path: str) -> str:
+        meta = {
+            "parts": self.parts,
+            "time_signature": self.time_signature,
+            "articulations": {str(k): v for k, v in self.articulations.items()},
+            "info": self.info,
+        }
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, notes=self.notes, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "NoteTable":
+        with np.load(path, allow_pickle=False) as data:
+            notes = data["notes"]
+            meta = json.loads(str(data["meta"]))
+        if notes.dtype != NOTE_DTYPE:
+            raise ValueError(f"음표 배열 형식이 다릅니다: {notes.dtype}")
+        parts = [[(offset, item) for offset, item in part] for part in meta["parts"]]
+        articulations = {int(k): v for k, v in meta["articulations"].items()}
+        return cls(notes, parts, meta["time_signature"], articulations, meta["info"]).freeze()
+
+
+# =========================================================
+# 음자리표 / 조표 / 아티큘레이션 ↔ 일반 값
+# =========================================================
+def element_to_data(el: music21.base.Music21Object) -> list:
+    if isinstance(el, music21.key.Key):
+        return ["key", el.sharps, el.tonic.name, el.mode]
+    if isinstance(el, music21.key.KeySignature):
+        return ["key", el.sharps, None, None]
+    return ["clef", el.sign, el.line, el.octaveChange]
+
+
+def element_from_data(data: list) -> Optional[music21.base.Music21Object]:
+    kind, *values = data
+    if kind == "key":
+        sharps, tonic, mode = values
+        return music21.key.Key(tonic, mode) if tonic else music21.key.KeySignature(sharps)
+    sign, line, octave_change = values
+    for name in (f"{sign}{line or ''}", sign):
+        try: return music21.clef.clefFromString(name, octaveShift=octave_change)
+        except music21.clef.ClefException: pass
+    return None
+
+
+def _articulation_data(arts) -> list:
+    return [[type(a).__name__, getattr(a, "fingerNumber", None)] for a in arts]
+
+
+def _make_articulations(data: list) -> list:
+    arts = []
+    for name, finger in data:
+        cls = getattr(music21.articulations, name, None)
+        if cls is None:
+            continue
+        arts.append(cls(finger) if finger is not None else cls())
+    return arts
+
+
+# =========================================================
+# music21 → 배열
+# =========================================================
+def _spelling(p: music21.pitch.Pitch) -> Tuple[int, int, int]:
+    alter = int(round(p.accidental.alter)) if p.accidental is not None else 0
+    return p.midi, STEPS.index(p.step), alter
+
+
+def extract(score: music21.stream.Score) -> NoteTable:
+    """파트별 음표/화음을 NOTE_DTYPE 배열로 (Note, Chord만 사용 - 타악기 등은 예전처럼 버림)"""
+    ts = score.recurse().getElementsByClass(music21.meter.TimeSignature).first()
+    ts = ts.ratioString if ts else "4/4"
+
+    rows = []
+    parts = []
+    articulations = {}
+    event = 0
+    for i, part in enumerate(score.parts):
+        flat = part.flatten()
+        parts.append([
+            (float(el.offset), element_to_data(el))
+            for el in flat.getElementsByClass([music21.clef.Clef, music21.key.KeySignature])
+        ])
+        for el in flat.notes:
+            if isinstance(el, music21.chord.Chord):
+                flags, pitches = CHORD, el.pitches
+            elif isinstance(el, music21.note.Note):
+                flags, pitches = 0, (el.pitch,)
+            else:
+                continue
+            if not pitches:
+                continue
+            duration = el.duration.quarterLength
+            if el.duration.isGrace:
+                flags |= GRACE
+                duration = music21.duration.convertTypeToQuarterLength(el.duration.type, el.duration.dots)
+            if el.articulations:
+                articulations[event] = _articulation_data(el.articulations)
+            onset = float(el.offset)
+            for p in pitches:
+                row_flags = flags | RESPELL if p.spellingIsInferred else flags
+                rows.append((event, event, i, onset, float(duration)) + _spelling(p) + (row_flags,))
+            event += 1
+    notes = np.array(rows, dtype=NOTE_DTYPE) if rows else np.empty(0, dtype=NOTE_DTYPE)
+    return NoteTable(notes, parts, ts, articulations)
+
+
+def _pitch_range(midi: np.ndarray) -> Optional[List[int]]:
+    return [int(midi.min()), int(midi.max())] if len(midi) else None
+
+
+def describe(table: NoteTable) -> dict:
+    """요약 정보: 박자, 전체/파트별 음역 (MIDI), 파트별 음표(화음은 1개) 수"""
+    notes = table.notes
+    starts, _ = _groups(notes)
+    events = np.bincount(notes["part"][starts], minlength=len(table.parts)) if len(notes) else np.zeros(len(table.parts), int)
+    return {
+        "time_signature": table.time_signature,
+        "range": _pitch_range(notes["midi"]),
+        "events": int(len(starts)),
+        "parts": [
+            {"index": i, "events": int(events[i]), "range": _pitch_range(notes["midi"][notes["part"] == i])}
+            for i in range(len(table.parts))
+        ],
+    }
+
+
+# =========================================================
+# 난이도 규칙 (배열 연산)
+# =========================================================
+def _groups(notes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """event별 (첫 행, 마지막 행 + 1) 인덱스 - 같은 event의 행은 붙어 있어야 함"""
+    ev = notes["event"]
+    starts = np.flatnonzero(np.r_[True, ev[1:] != ev[:-1]]) if len(ev) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(ev)].astype(np.int64)
+    return starts, ends
+
+
+def _wrap_midi(midi: np.ndarray) -> np.ndarray:
+    # pitch.midi setter와 같은 범위 처리 (0~127 밖이면 옥타브를 접음)
+    high = 108 + midi % 12
+    high = np.where(high < 115, high + 12, high)
+    return np.where(midi > 127, high, np.where(midi < 0, midi % 12, midi))
+
+
+def _fold_octaves(midi: np.ndarray, low: int, high: Optional[int] = None) -> np.ndarray:
+    """while midi < low: += 12 / while midi > high: -= 12 를 한 번에"""
+    up = np.maximum(0, -((midi - low) // 12))
+    midi = midi + 12 * up
+    if high is not None:
+        down = np.maximum(0, (midi - high + 11) // 12)
+        midi = midi - 12 * down
+    return midi
+
+
+def _rows(base: np.ndarray, key: np.ndarray, midi=None, respell=None, onset=None, duration=None, flags=None) -> Tuple[np.ndarray, np.ndarray]:
+    """base 행을 복사해서 일부 필드만 바꾼 출력 행 + 정렬 키"""
+    out = base.copy()
+    if midi is not None: out["midi"] = _wrap_midi(np.asarray(midi))
+    if onset is not None: out["onset"] = onset
+    if duration is not None: out["duration"] = duration
+    if flags is not None: out["flags"] = flags
+    if respell is not None:
+        respell_rows(out, respell)
+    return out, key
+
+
+def respell_rows(notes: np.ndarray, mask: np.ndarray) -> None:
+    """mask인 행을 pitch.midi = ... 로 정한 것처럼 기본 철자로 (제자리)"""
+    pc = notes["midi"] % 12
+    notes["step"] = np.where(mask, DEFAULT_STEP[pc], notes["step"])
+    notes["alter"] = np.where(mask, DEFAULT_ALTER[pc], notes["alter"])
+    notes["flags"] = np.where(mask, notes["flags"] | RESPELL, notes["flags"])
+
+
+def _sort_rows(pieces: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+    """원본 순서(파트 → 원본 event → 출력 요소 → 화음 안 순서)로 모아서 event 번호를 다시 매김"""
+    if not pieces:
+        return np.empty(0, dtype=NOTE_DTYPE)
+    notes = np.concatenate([p for p, _ in pieces])
+    keys = np.concatenate([k for _, k in pieces])
+    order = np.lexsort((keys, notes["source"], notes["part"]))
+    notes = notes[order]
+    element = keys[order] // 4  # 화음 안 순서(0~3)를 뺀 출력 요소 번호
+    if len(notes):
+        changed = np.r_[True, (element[1:] != element[:-1]) | (notes["source"][1:] != notes["source"][:-1])]
+        notes["event"] = np.cumsum(changed) - 1
+    return notes
+
+
+def _simplify_hard(notes: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+    # 화음 안 최저음/최고음 (sorted(el.pitches)와 같은 순서: 높이 → 원래 순서)
+    order = np.lexsort((notes["midi"], notes["event"]))
+    bot = notes[order[starts]]
+    top = notes[order[ends - 1]]
+    grace = (bot["flags"] & GRACE) != 0
+    sounding = np.where(grace, 0.0, bot["duration"])
+    melody = bot["part"] == 0
+    arpeggio = ~melody & (sounding >= 1.0)
+    pieces = []
+
+    # 반주 파트의 긴 음: 근음-5도-옥타브-5도 분산화음
+    b = bot[arpeggio]
+    if len(b):
+        dur = b["duration"] / 4.0
+        intervals = (0, 7, 12, 7)
+        for k, interval in enumerate(intervals):
+            pieces.append(_rows(
+                b, np.full(len(b), k * 4), midi=b["midi"] + interval, respell=np.full(len(b), interval != 0),
+                onset=b["onset"] + dur * k, duration=dur, flags=np.zeros(len(b), np.uint8),
+            ))
+
+    # 멜로디 파트: 최고음 + 장3도 아래 + 옥타브 아래 화음
+    t = top[melody]
+    if len(t):
+        flags = CHORD | (t["flags"] & GRACE)
+        pieces.append(_rows(t, np.full(len(t), 0), midi=t["midi"] - 12, respell=np.ones(len(t), bool), flags=flags))
+        pieces.append(_rows(t, np.full(len(t), 1), midi=t["midi"] - 4, respell=np.ones(len(t), bool), flags=flags))
+        pieces.append(_rows(t, np.full(len(t), 2), flags=flags))
+
+    # 반주 파트의 짧은 음: 최저음 + 옥타브 아래
+    b = bot[~melody & ~arpeggio]
+    if len(b):
+        flags = CHORD | (b["flags"] & GRACE)
+        pieces.append(_rows(b, np.full(len(b), 0), midi=b["midi"] - 12, respell=np.ones(len(b), bool), flags=flags))
+        pieces.append(_rows(b, np.full(len(b), 1), flags=flags))
+    return pieces
+
+
+def _simplify_easy(notes: np.ndarray, starts: np.ndarray, ends: np.ndarray, mode: str) -> List[Tuple[np.ndarray, np.ndarray]]:
+    first = notes[starts]
+    last = notes[ends - 1]
+    size = ends - starts
+    is_chord = (first["flags"] & CHORD) != 0
+    melody = first["part"] == 0
+    pieces = []
+
+    # 멜로디 파트: 화음이면 맨 위 음 (EASY는 3음 이상 화음이면 바로 아래 음까지 2음 화음)
+    two_notes = melody & is_chord & (size >= 3) if mode == "easy" else np.zeros(len(first), bool)
+    if two_notes.any():
+        harmony = notes[ends[two_notes] - 2]
+        top = last[two_notes]
+        pieces.append(_rows(harmony, np.zeros(len(top), np.int64), flags=harmony["flags"] | CHORD))
+        pieces.append(_rows(top, np.ones(len(top), np.int64), flags=top["flags"] | CHORD))
+    single = melody & ~two_notes
+    if single.any():
+        m = last[single]
+        # 단음은 가운데 도(60) 이상으로
+        midi = _fold_octaves(m["midi"].astype(np.int64), 60)
+        pieces.append(_rows(m, np.zeros(len(m), np.int64), midi=midi, respell=midi != m["midi"],
+                            flags=m["flags"] & ~np.uint8(CHORD)))
+
+    # 반주 파트: 최저음 1개, 36~60 사이로 (SUPER_EASY는 정박 음만, 전부 4분음표)
+    accomp = ~melody
+    if mode == "super_easy":
+        accomp &= (first["onset"] % 1.0) == 0
+    if accomp.any():
+        b = first[accomp]
+        midi = _fold_octaves(b["midi"].astype(np.int64), 36, 60)
+        flags = b["flags"] & ~np.uint8(CHORD | GRACE) if mode == "super_easy" else b["flags"] & ~np.uint8(CHORD)
+        duration = 1.0 if mode == "super_easy" else None
+        pieces.append(_rows(b, np.zeros(len(b), np.int64), midi=midi, respell=midi != b["midi"],
+                            duration=duration, flags=flags))
+    return pieces
+
+
+def simplify(table: NoteTable, mode: str = "easy") -> NoteTable:
+    """난이도 규칙 적용 → 새 NoteTable (입력은 바꾸지 않음)"""
+    notes = table.notes
+    starts, ends = _groups(notes)
+    if mode == "hard":
+        pieces = _simplify_hard(notes, starts, ends)
+        articulations = {}  # HARD는 예전에도 아티큘레이션을 옮기지 않았음
+    else:
+        pieces = _simplify_easy(notes, starts, ends, mode)
+        articulations = table.articulations
+    return NoteTable(_sort_rows(pieces), table.parts, table.time_signature, articulations)
+
+
+# =========================================================
+# 배열 → music21 (XML로 쓸 때만)
+# =========================================================
+def _pitch_name(midi: int, step: int, alter: int) -> str:
+    octave = (midi - alter - int(STEP_PC[step])) // 12 - 1
+    accidental = ("#" if alter > 0 else "-") * abs(alter)
+    return f"{STEPS[step]}{accidental}{octave}"
+
+
+def _make_pitch(midi: int, step: int, alter: int, flags: int) -> music21.pitch.Pitch:
+    p = music21.pitch.Pitch(_pitch_name(midi, step, alter))
+    if flags & RESPELL:
+        p.spellingIsInferred = True
+    return p
+
+
+def to_score(table: NoteTable, beams: bool = False) -> music21.stream.Score:
+    score = music21.stream.Score()
+    notes = table.notes
+    starts, ends = _groups(notes)
+    part_of = notes["part"][starts] if len(notes) else np.empty(0, dtype=np.int16)
+
+    # tolist()로 한 번에 파이썬 값으로 바꿔서 행마다 numpy 스칼라를 만들지 않음
+    midi, step, alter = notes["midi"].tolist(), notes["step"].tolist(), notes["alter"].tolist()
+    flags = notes["flags"].tolist()
+    onset, duration, source = notes["onset"].tolist(), notes["duration"].tolist(), notes["source"].tolist()
+
+    for i, meta in enumerate(table.parts):
+        part = music21.stream.Part()
+        part.insert(0, music21.meter.TimeSignature(table.time_signature))
+        for offset, data in meta:
+            el = element_from_data(data)
+            if el is not None: part.insert(offset, el)
+        for start, end in zip(starts[part_of == i].tolist(), ends[part_of == i].tolist()):
+            pitches = [_make_pitch(midi[r], step[r], alter[r], flags[r]) for r in range(start, end)]
+            if flags[start] & CHORD:
+                element = music21.chord.Chord(pitches, quarterLength=duration[start])
+            else:
+                element = music21.note.Note(pitches[0], quarterLength=duration[start])
+            if flags[start] & GRACE:
+                element.getGrace(inPlace=True)
+            arts = table.articulations.get(source[start])
+            if arts:
+                element.articulations = _make_articulations(arts)
+            part.coreInsert(onset[start], element)
+        part.coreElementsChanged()
+        try:
+            if beams: part.makeBeams(inPlace=True)
+        except Exception: pass
+        score.insert(0, part)
+    return score
+
@@ -11,20 +11,21 @@ from pydantic import BaseModel
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 
+import db
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 # =====================================================
 # DB 경로 (backend 폴더에 고정) - Windows/Mac 모두 OK
+# 연결은 db.py의 풀에서 빌려 씀 (WAL + 연결/문장 재사용)
 # =====================================================
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "users.db")
+BASE_DIR = db.BASE_DIR
+DB_PATH = db.DB_PATH
 
 
-def get_db() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+def get_db():
+    """with get_db() as conn: ... (풀에서 빌린 연결, 블록이 끝나면 commit 후 반납)"""
+    return db.get_pool().connection()
 
 
 # =====================================================
@@ -44,15 +45,18 @@ SECRET_KEY = os.getenv("EASYSCORE_SECRET_KEY", "LOCAL_DEV_SECRET_CHANGE_ME")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
+# 관리자 계정 = 사용자 id (쉼표로 구분):  export EASYSCORE_ADMIN_USER_IDS="1,7"
+# - 아이디(username)로 지정하면 아직 가입하지 않은 이름을 다른 사람이 먼저 가입해서
+#   관리자 권한을 얻을 수 있으므로, 가입 후 GET /auth/me 로 확인한 id를 적음
+ADMIN_USER_IDS = {int(u) for u in os.getenv("EASYSCORE_ADMIN_USER_IDS", "").split(",") if u.strip()}
+
 
 # =====================================================
 # 테이블 생성
 # =====================================================
 def create_tables() -> None:
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    with get_db() as conn:
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -62,14 +66,30 @@ def create_tables() -> None:
             )
             """
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 create_tables()
 
 
+# =====================================================
+# 사용자 조회/추가 (SQL 문자열은 고정 → 연결마다 준비된 문장 재사용)
+# =====================================================
+_INSERT_USER = "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)"
+_SELECT_USER = "SELECT id, password_hash FROM users WHERE username = ?"
+
+
+def insert_user(username: str, password_hash: str) -> int:
+    """새 사용자 id (이미 있으면 sqlite3.IntegrityError)"""
+    with get_db() as conn:
+        cur = conn.execute(_INSERT_USER, (username, password_hash, datetime.utcnow().isoformat()))
+        return int(cur.lastrowid)
+
+
+def find_user(username: str) -> Optional[sqlite3.Row]:
+    with get_db() as conn:
+        return conn.execute(_SELECT_USER, (username,)).fetchone()
+
+
 # =====================================================
 # 유틸
 # =====================================================
@@ -118,6 +138,16 @@ def get_current_user(authorization: Optional[str] = Header(default=None)) -> Dic
     return {"id": uid, "username": username}
 
 
+def is_admin(user: Dict[str, Any]) -> bool:
+    return int(user["id"]) in ADMIN_USER_IDS
+
+
+def require_admin(user=Depends(get_current_user)) -> Dict[str, Any]:
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="관리자만 사용할 수 있습니다.")
+    return user
+
+
 # =====================================================
 # 요청/응답 모델
 # =====================================================
@@ -155,18 +185,10 @@ def register(req: RegisterRequest):
     if len(password) < 6:
         raise HTTPException(status_code=400, detail="비밀번호는 최소 6자 이상이어야 합니다.")
 
-    conn = get_db()
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
-            (username, hash_password(password), datetime.utcnow().isoformat()),
-        )
-        conn.commit()
+        insert_user(username, hash_password(password))
     except sqlite3.IntegrityError:
         raise HTTPException(status_code=400, detail="이미 존재하는 사용자입니다.")
-    finally:
-        conn.close()
 
     return {"message": "회원가입 성공"}
 
@@ -179,14 +201,7 @@ def login(req: LoginRequest):
     username = (req.username or "").strip()
     password = req.password or ""
 
-    conn = get_db()
-    try:
-        cur = conn.cursor()
-        cur.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
-        row = cur.fetchone()
-    finally:
-        conn.close()
-
+    row = find_user(username)
     if not row:
         raise HTTPException(status_code=401, detail="아이디 또는 비밀번호 오류")
 
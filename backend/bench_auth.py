@@ -0,0 +1,178 @@
+# bench_auth.py
+# 로그인 처리량 비교: 예전 방식(요청마다 sqlite3.connect, rollback journal) vs 연결 풀(db.py, WAL)
+# 임시 폴더의 DB에 사용자를 만들어 두고, 여러 스레드가 동시에 로그인(+ 일부 회원가입)을 보냄
+# 실행: cd backend && python bench_auth.py [--threads 32] [--requests 2000] [--write-ratio 0.05] [--no-hash]
+#   --no-hash: 비밀번호 해시 검증을 빼고 DB 접근 비용만 비교
+import argparse
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# auth를 import 하기 전에 DB 경로를 임시 파일로 바꿔야 backend/users.db를 건드리지 않음
+_TMP_DIR = tempfile.mkdtemp(prefix="easyscore_bench_auth_")
+os.environ["EASYSCORE_DB_PATH"] = os.path.join(_TMP_DIR, "users.db")
+
+import auth  # noqa: E402
+import db  # noqa: E402
+
+PASSWORD = "bench-password"
+
+
+# ---------- 예전 방식 (auth.py의 이전 구현과 같음) ----------
+def _legacy_connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def legacy_login(path: str, username: str, check_hash: bool) -> bool:
+    conn = _legacy_connect(path)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id, password_hash FROM users WHERE username = ?", (username,))
+        row = cur.fetchone()
+    finally:
+        conn.close()
+    return bool(row) and (not check_hash or auth.verify_password(PASSWORD, row["password_hash"]))
+
+
+def legacy_register(path: str, username: str, password_hash: str) -> None:
+    conn = _legacy_connect(path)
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+            (username, password_hash, datetime.utcnow().isoformat()),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# ---------- 연결 풀 (지금 auth.py) ----------
+def pool_login(username: str, check_hash: bool) -> bool:
+    row = auth.find_user(username)
+    return bool(row) and (not check_hash or auth.verify_password(PASSWORD, row["password_hash"]))
+
+
+def pool_register(username: str, password_hash: str) -> None:
+    auth.insert_user(username, password_hash)
+
+
+# ---------- 측정 ----------
+def _prepare(path: str, users: int, password_hash: str, wal: bool) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+    conn.execute(
+        """
+        CREATE TABLE users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """
+    )
+    now = datetime.utcnow().isoformat()
+    conn.executemany(
+        "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+        [(f"student{i:05d}", password_hash, now) for i in range(users)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_case(name: str, login, register, args, password_hash: str) -> dict:
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    write_every = int(1 / args.write_ratio) if args.write_ratio > 0 else 0
+
+    def one(i: int) -> None:
+        start = time.perf_counter()
+        try:
+            if write_every and i % write_every == 0:
+                register(f"new_{uuid.uuid4().hex[:12]}", password_hash)
+            else:
+                if not login(f"student{i % args.users:05d}", not args.no_hash):
+                    raise RuntimeError("login failed")
+        except Exception as e:
+            with lock:
+                errors.append(type(e).__name__ + ": " + str(e))
+            return
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as ex:
+        list(ex.map(one, range(args.requests)))
+    wall = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "name": name,
+        "throughput": len(latencies) / wall,
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p95": latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan"),
+        "max": latencies[-1] if latencies else float("nan"),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else "",
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="로그인 처리량 벤치마크 (예전 연결 방식 vs 연결 풀)")
+    parser.add_argument("--threads", type=int, default=32, help="동시 요청 스레드 수")
+    parser.add_argument("--requests", type=int, default=2000, help="전체 요청 수")
+    parser.add_argument("--users", type=int, default=500, help="미리 만들어 둘 사용자 수")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="회원가입(쓰기) 요청 비율")
+    parser.add_argument("--no-hash", action="store_true", help="비밀번호 검증 없이 DB 접근만 측정")
+    args = parser.parse_args(argv)
+
+    password_hash = auth.hash_password(PASSWORD)
+    path = db.DB_PATH
+    print(f"--- 로그인 벤치마크: 스레드 {args.threads}, 요청 {args.requests}, 쓰기 비율 {args.write_ratio}, "
+          f"해시 검증 {'끔' if args.no_hash else '켬'} (풀 크기 {db.POOL_SIZE}) ---")
+
+    results = []
+    # auth import 때 만든 연결은 닫고 시작 (DB 파일을 새로 만듦)
+    db.close_pool()
+    _prepare(path, args.users, password_hash, wal=False)
+    results.append(run_case(
+        "legacy (connect/close, rollback journal)",
+        lambda u, h: legacy_login(path, u, h), lambda u, p: legacy_register(path, u, p), args, password_hash,
+    ))
+
+    db.close_pool()
+    _prepare(path, args.users, password_hash, wal=True)
+    results.append(run_case("pool (WAL, 연결/문장 재사용)", pool_login, pool_register, args, password_hash))
+    stats = db.get_pool().stats()
+    db.close_pool()
+
+    print(f"{'방식':<44}{'login/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'오류':>6}")
+    for r in results:
+        print(f"{r['name']:<44}{r['throughput']:>10.1f}{r['p50']:>9.2f}{r['p95']:>9.2f}{r['max']:>9.1f}{r['errors']:>6}")
+        if r["first_error"]:
+            print(f"   ⚠️ {r['first_error']}")
+    print(f"배속: {results[1]['throughput'] / results[0]['throughput']:.2f}x   풀 상태: {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    finally:
+        shutil.rmtree(_TMP_DIR, ignore_errors=True)
@@ -0,0 +1,322 @@
+# bench_engine.py
+# ai_engine 핵심 경로 마이크로 벤치마크 (Audiveris / MuseScore 없이 실행 가능)
+# - 합성 MusicXML 악보 (마디 수 / 파트 수 / 화음 비율별)로 아래 단계를 각각 측정
+#   music21 파싱, _clean_omr_artifacts, _transpose_smart, 정규화, _simplify_vertical(난이도별),
+#   정규화된 NoteTable 편곡(난이도별), MusicXML 쓰기, preprocess_image
+# - 결과를 JSON 기준값(bench_baseline.json)과 비교해서 임계값보다 느려지면 종료 코드 1
+#
+# 실행: cd backend && python bench_engine.py                   (기준값과 비교)
+#       python bench_engine.py --update-baseline               (현재 결과를 기준값으로 저장)
+#       python bench_engine.py --quick --repeat 1              (작은 악보만 빠르게)
+#       python bench_engine.py --legacy                        (예전 _simplify_vertical_legacy도 측정)
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import music21
+import numpy as np
+
+import ai_engine
+import key_analysis
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "bench_baseline.json")
+DEFAULT_THRESHOLD = 1.25   # 기준값보다 25% 넘게 느려지면 회귀
+DEFAULT_MIN_DELTA_MS = 5.0  # 이보다 작은 차이는 측정 잡음으로 보고 무시
+
+# 합성 악보 목록 (이름, 마디 수, 파트 수, 화음 비율) - 앞의 3개가 --quick
+CORPUS = [
+    {"name": "solo_32m", "measures": 32, "parts": 1, "chords": 0.0},
+    {"name": "piano_64m", "measures": 64, "parts": 2, "chords": 0.3},
+    {"name": "piano_64m_dense", "measures": 64, "parts": 2, "chords": 0.8},
+    {"name": "quartet_128m", "measures": 128, "parts": 4, "chords": 0.1},
+    {"name": "orchestra_128m", "measures": 128, "parts": 12, "chords": 0.3},
+]
+QUICK_CORPUS = 3
+
+SAMPLE_IMAGES = [
+    os.path.join(HERE, "ex.png"),
+    os.path.join(HERE, "..", "1.png"),
+]
+
+MODES = [mode for mode, _ in ai_engine.LEVEL_MODES]
+
+
+# =========================================================
+# 합성 MusicXML 생성 (music21을 거치지 않고 문자열로 바로 작성 → 빠르고 결과가 항상 같음)
+# =========================================================
+DIVISIONS = 12  # 4분음표 = 12 → 16분음표(3), 셋잇단 8분음표(4) 모두 정수
+# (길이, 음표 종류, 점 여부, 셋잇단 여부)
+_DURATIONS = [
+    (3, "16th", False, False),
+    (6, "eighth", False, False),
+    (12, "quarter", False, False),
+    (18, "quarter", True, False),
+    (24, "half", False, False),
+]
+_SHARP_NAMES = [("C", 0), ("C", 1), ("D", 0), ("D", 1), ("E", 0), ("F", 0), ("F", 1), ("G", 0), ("G", 1), ("A", 0), ("A", 1), ("B", 0)]
+_FLAT_NAMES = [("C", 0), ("D", -1), ("D", 0), ("E", -1), ("E", 0), ("F", 0), ("G", -1), ("G", 0), ("A", -1), ("A", 0), ("B", -1), ("B", 0)]
+_KEYS = [-3, -2, -1, 0, 1, 2, 3, 4]  # 조표 (fifths)
+
+
+def _pitch_xml(midi: int, fifths: int) -> str:
+    step, alter = (_FLAT_NAMES if fifths < 0 else _SHARP_NAMES)[midi % 12]
+    alter_xml = f"<alter>{alter}</alter>" if alter else ""
+    return f"<pitch><step>{step}</step>{alter_xml}<octave>{midi // 12 - 1}</octave></pitch>"
+
+
+def _note_xml(pitches, duration, kind, dotted, triplet, fifths, staccato) -> str:
+    out = []
+    for i, midi in enumerate(pitches):
+        parts = ["<note>"]
+        if i > 0:
+            parts.append("<chord/>")
+        parts.append(_pitch_xml(midi, fifths))
+        parts.append(f"<duration>{duration}</duration><type>{kind}</type>")
+        if dotted:
+            parts.append("<dot/>")
+        if triplet:
+            parts.append("<time-modification><actual-notes>3</actual-notes><normal-notes>2</normal-notes></time-modification>")
+        if staccato and i == 0:
+            parts.append("<notations><articulations><staccato/></articulations></notations>")
+        parts.append("</note>")
+        out.append("".join(parts))
+    return "".join(out)
+
+
+def make_score_xml(measures: int, parts: int, chords: float, seed: int = 0) -> str:
+    """마디 수 / 파트 수 / 화음 비율(0~1)로 MusicXML 문자열 생성 (seed가 같으면 항상 같은 악보)"""
+    rnd = random.Random(seed * 1000 + measures * 31 + parts * 7 + int(chords * 100))
+    fifths = rnd.choice(_KEYS)
+    beats = rnd.choice([3, 4])
+    measure_len = beats * DIVISIONS
+    part_list = "".join(
+        f'<score-part id="P{p + 1}"><part-name>Part {p + 1}</part-name></score-part>' for p in range(parts)
+    )
+    body = []
+    for p in range(parts):
+        # 첫 파트는 높은 음역(멜로디), 나머지는 점점 낮게
+        center = 74 - min(p, 4) * 7
+        clef = '<clef><sign>G</sign><line>2</line></clef>' if center >= 60 else '<clef><sign>F</sign><line>4</line></clef>'
+        measures_xml = []
+        for m in range(measures):
+            attrs = ""
+            if m == 0:
+                attrs = (
+                    f"<attributes><divisions>{DIVISIONS}</divisions><key><fifths>{fifths}</fifths></key>"
+                    f"<time><beats>{beats}</beats><beat-type>4</beat-type></time>{clef}</attributes>"
+                )
+            notes = []
+            filled = 0
+            while filled < measure_len:
+                left = measure_len - filled
+                if left >= DIVISIONS and rnd.random() < 0.1:
+                    # 셋잇단 8분음표 3개 = 4분음표 1박
+                    for _ in range(3):
+                        notes.append(_note_xml([center + rnd.randint(-9, 9)], 4, "eighth", False, True, fifths, False))
+                    filled += DIVISIONS
+                    continue
+                duration, kind, dotted, _ = rnd.choice([d for d in _DURATIONS if d[0] <= left])
+                root = center + rnd.randint(-9, 9)
+                if rnd.random() < chords:
+                    size = rnd.randint(2, 4)
+                    pitches = sorted({root} | {root + rnd.choice([3, 4, 7, 8, 9, 12]) for _ in range(size - 1)})
+                else:
+                    pitches = [root]
+                notes.append(_note_xml(pitches, duration, kind, dotted, False, fifths, rnd.random() < 0.1))
+                filled += duration
+            measures_xml.append(f'<measure number="{m + 1}">{attrs}{"".join(notes)}</measure>')
+        body.append(f'<part id="P{p + 1}">{"".join(measures_xml)}</part>')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<score-partwise version="3.1">'
+        f"<part-list>{part_list}</part-list>{''.join(body)}</score-partwise>"
+    )
+
+
+def _parse(xml: str):
+    # parseData: 파일 경로 파싱과 달리 music21의 디스크 캐시(pickle)를 쓰지 않음
+    return music21.converter.parseData(xml, format="musicxml")
+
+
+# =========================================================
+# 측정
+# =========================================================
+def _measure(fn, repeat: int, setup=None) -> dict:
+    """setup() 결과를 인자로 fn을 repeat번 실행 (setup 시간은 제외) → 최솟값/중앙값 ms"""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {"min_ms": round(min(samples), 2), "median_ms": round(statistics.median(samples), 2)}
+
+
+def bench_score(case: dict, repeat: int, legacy: bool, tmp_dir: str) -> dict:
+    xml = make_score_xml(case["measures"], case["parts"], case["chords"])
+    score = _parse(xml)
+
+    def fresh_score():
+        # 정규화는 악보를 제자리에서 정리하고 조 판정 결과를 캐시하므로
+        # 매 반복마다 원본 복사본 + 빈 캐시로 시작해야 두 번째부터 빨라지는 착시가 없음
+        key_analysis._cache.clear()
+        return copy.deepcopy(score)
+
+    results = {
+        "parse": _measure(lambda: _parse(xml), repeat),
+        "clean_omr_artifacts": _measure(ai_engine._clean_omr_artifacts, repeat, setup=fresh_score),
+        "transpose_smart": _measure(lambda: ai_engine._transpose_smart(score), repeat),
+        "normalize": _measure(ai_engine.normalize_score, repeat, setup=fresh_score),
+    }
+    table = ai_engine.normalize_score(copy.deepcopy(score))
+    for mode in MODES:
+        results[f"simplify_vertical[{mode}]"] = _measure(
+            lambda s: ai_engine._simplify_vertical(s, mode), repeat, setup=fresh_score
+        )
+        results[f"arrange_table[{mode}]"] = _measure(lambda: ai_engine._arrange_table(table, mode), repeat)
+        if legacy:
+            results[f"simplify_vertical_legacy[{mode}]"] = _measure(
+                lambda s: ai_engine._simplify_vertical_legacy(s, mode), repeat, setup=fresh_score
+            )
+    arranged = ai_engine._arrange_table(table, "easy")
+    out_path = os.path.join(tmp_dir, f"{case['name']}.musicxml")
+    results["write_musicxml"] = _measure(lambda: arranged.write("musicxml", out_path), repeat)
+    return {f"{case['name']}/{name}": value for name, value in results.items()}
+
+
+def bench_images(repeat: int) -> dict:
+    results = {}
+    for path in SAMPLE_IMAGES:
+        if not os.path.exists(path):
+            print(f"⚠️ 샘플 없음: {path}")
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        results[f"image:{os.path.basename(path)}/preprocess_image"] = _measure(lambda: ai_engine.preprocess_image(data), repeat)
+    return results
+
+
+def machine_info() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "music21": music21.__version__,
+        "numpy": np.__version__,
+    }
+
+
+# =========================================================
+# 기준값 비교
+# =========================================================
+def compare(results: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """기준값보다 threshold배 넘게 (그리고 min_delta_ms 넘게) 느려진 항목 목록"""
+    regressions = []
+    base_results = baseline.get("results", {})
+    for name, value in results.items():
+        base = base_results.get(name)
+        if not base:
+            continue
+        limit = base.get("threshold", threshold)
+        now, before = value["min_ms"], base["min_ms"]
+        if now > before * limit and now - before > min_delta_ms:
+            regressions.append((name, before, now, limit))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict) -> None:
+    base_results = baseline.get("results", {})
+    print(f"{'항목':<55}{'min ms':>10}{'median':>10}{'기준':>10}{'비율':>8}")
+    for name, value in results.items():
+        base = base_results.get(name)
+        if base:
+            ratio = value["min_ms"] / base["min_ms"] if base["min_ms"] else float("inf")
+            print(f"{name:<55}{value['min_ms']:>10.1f}{value['median_ms']:>10.1f}{base['min_ms']:>10.1f}{ratio:>7.2f}x")
+        else:
+            print(f"{name:<55}{value['min_ms']:>10.1f}{value['median_ms']:>10.1f}{'-':>10}{'-':>8}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ai_engine 마이크로 벤치마크")
+    parser.add_argument("--repeat", type=int, default=3, help="항목별 반복 횟수 (최솟값 기준 비교)")
+    parser.add_argument("--quick", action="store_true", help=f"앞의 {QUICK_CORPUS}개 합성 악보만")
+    parser.add_argument("--only", default=None, help="이름에 이 문자열이 들어간 합성 악보만")
+    parser.add_argument("--legacy", action="store_true", help="예전 _simplify_vertical_legacy도 측정 (느림)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="기준값 JSON 경로")
+    parser.add_argument("--update-baseline", action="store_true", help="현재 결과를 기준값으로 저장")
+    parser.add_argument("--threshold", type=float, default=None, help=f"회귀 판정 배수 (기본 {DEFAULT_THRESHOLD})")
+    parser.add_argument("--min-delta-ms", type=float, default=None, help=f"무시할 차이 (기본 {DEFAULT_MIN_DELTA_MS}ms)")
+    parser.add_argument("--output", default=None, help="이번 결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    threshold = args.threshold or baseline.get("threshold", DEFAULT_THRESHOLD)
+    min_delta_ms = args.min_delta_ms if args.min_delta_ms is not None else baseline.get("min_delta_ms", DEFAULT_MIN_DELTA_MS)
+
+    corpus = CORPUS[:QUICK_CORPUS] if args.quick else CORPUS
+    if args.only:
+        corpus = [case for case in corpus if args.only in case["name"]]
+
+    print(f"--- ai_engine 벤치마크 (각 {args.repeat}회, 합성 악보 {len(corpus)}개) ---")
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="easyscore_bench_") as tmp_dir:
+        for case in corpus:
+            print(f"🎼 {case['name']} (마디 {case['measures']}, 파트 {case['parts']}, 화음 {case['chords']:.0%})")
+            results.update(bench_score(case, args.repeat, args.legacy, tmp_dir))
+    results.update(bench_images(args.repeat))
+
+    info = machine_info()
+    if baseline and baseline.get("machine") != info:
+        print(f"⚠️ 기준값과 다른 환경에서 측정했습니다: {baseline.get('machine')}")
+    print_results(results, baseline)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "machine": info,
+        "repeat": args.repeat,
+        "threshold": threshold,
+        "min_delta_ms": min_delta_ms,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        # 기존 기준값에 항목별로 지정해둔 threshold는 유지
+        for name, value in results.items():
+            old = baseline.get("results", {}).get(name, {})
+            if "threshold" in old:
+                value["threshold"] = old["threshold"]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 기준값 저장: {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("ℹ️ 기준값이 없습니다. --update-baseline 으로 먼저 저장하세요.")
+        return 0
+    regressions = compare(results, baseline, threshold, min_delta_ms)
+    for name, before, now, limit in regressions:
+        print(f"❌ 느려짐: {name} {before:.1f}ms → {now:.1f}ms (허용 {limit:.2f}x)")
+    if regressions:
+        return 1
+    print(f"✅ 회귀 없음 (허용 {threshold:.2f}x, {min_delta_ms:.0f}ms 이하 차이 무시)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
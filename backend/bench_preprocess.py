@@ -0,0 +1,47 @@
+# bench_preprocess.py
+# 전처리 속도 비교: 예전 방식(preprocess_image_legacy) vs NumPy 엔진(preprocess.preprocess)
+# 실행: cd backend && python bench_preprocess.py [반복 횟수]
+import os
+import sys
+import time
+
+import ai_engine
+import preprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_IMAGES = [
+    os.path.join(HERE, "ex.png"),
+    os.path.join(HERE, "KakaoTalk_Photo_2026-01-19-16-22-22.jpeg"),
+    os.path.join(HERE, "..", "1.png"),
+    os.path.join(HERE, "..", "2.png"),
+    os.path.join(HERE, "..", "3.png"),
+]
+
+
+def _best_of(fn, data: bytes, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def run_benchmark(repeat: int = 3):
+    print(f"--- 전처리 벤치마크 (각 {repeat}회 중 최솟값, ms) ---")
+    print(f"{'파일':<45}{'legacy':>10}{'numpy':>10}{'배속':>8}   단계별(ms)")
+    for path in SAMPLE_IMAGES:
+        if not os.path.exists(path):
+            print(f"⚠️ 샘플 없음: {path}")
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        legacy_ms = _best_of(ai_engine.preprocess_image_legacy, data, repeat)
+        numpy_ms = _best_of(lambda b: preprocess.preprocess(b), data, repeat)
+        _, timings = preprocess.preprocess(data)
+        steps = ", ".join(f"{k}={v}" for k, v in timings.items() if k != "total")
+        print(f"{os.path.basename(path):<45}{legacy_ms:>10.1f}{numpy_ms:>10.1f}{legacy_ms / numpy_ms:>7.2f}x   {steps}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,7 @@
+# conftest.py
+import os
+import tempfile
+
+# 테스트는 backend/users.db 대신 임시 DB를 사용 (db.py가 import 될 때 경로를 읽으므로 먼저 설정)
+_TMP_DIR = tempfile.mkdtemp(prefix="easyscore_test_")
+os.environ.setdefault("EASYSCORE_DB_PATH", os.path.join(_TMP_DIR, "users.db"))
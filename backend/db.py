@@ -0,0 +1,153 @@
+# backend/db.py
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+# =========================================================
+# 🗄️ SQLite 연결 풀 (users.db)
+# - 예전: 회원가입/로그인마다 sqlite3.connect → 쿼리 1번 → close (기본 rollback journal)
+#   → 수업 시작 때 로그인이 몰리면 파일 잠금에서 줄을 섬
+# - 지금: 연결을 최대 POOL_SIZE개까지 만들어서 돌려 씀
+#   - WAL 모드: 읽기(로그인)가 쓰기(회원가입)를 기다리지 않음
+#   - 연결을 재사용하므로 sqlite3의 문장 캐시(cached_statements)가 그대로 유지됨
+#     → 같은 SQL은 다시 파싱하지 않음
+#   - 연결이 모두 사용 중이면 POOL_TIMEOUT초까지 기다렸다가 PoolTimeout
+#   export EASYSCORE_DB_POOL_SIZE=4
+#   export EASYSCORE_DB_POOL_TIMEOUT=5
+# - DB 파일 위치 (기본: backend/users.db, 벤치마크/테스트용으로 바꿀 수 있음)
+#   export EASYSCORE_DB_PATH=/path/to/users.db
+# =========================================================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.getenv("EASYSCORE_DB_PATH", os.path.join(BASE_DIR, "users.db"))
+
+POOL_SIZE = int(os.getenv("EASYSCORE_DB_POOL_SIZE", "4"))
+POOL_TIMEOUT = float(os.getenv("EASYSCORE_DB_POOL_TIMEOUT", "5"))
+# 연결마다 보관할 준비된 문장 수
+STATEMENT_CACHE = 64
+# 다른 연결이 쓰는 중일 때 기다리는 시간 (ms)
+BUSY_TIMEOUT_MS = 5000
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, path: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        # 마지막에 돌려받은 연결부터 다시 씀 (캐시가 따뜻한 연결)
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False, cached_statements=STATEMENT_CACHE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL에서는 NORMAL로도 충돌 시 DB가 깨지지 않음 (마지막 커밋만 잃을 수 있음)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._closed:
+                raise PoolTimeout("DB 연결 풀이 닫혔습니다.")
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"DB 연결을 {self.timeout}초 동안 얻지 못했습니다. (풀 크기 {self.size})")
+
+    def _release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            closed = self._closed
+        if closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        """with pool.connection() as conn: ... → 정상 종료면 commit, 예외면 rollback 후 풀에 반납"""
+        conn = self._acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                # 연결 상태를 알 수 없으면 버리고 다음에 새로 만듦
+                self._discard(conn)
+                raise
+            self._release(conn)
+            raise
+        self._release(conn)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """users.db 연결 풀 (프로세스마다 처음 쓸 때 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,235 @@
+# backend/jobs.py
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+import metrics
+import quotas
+from scheduler import FairScheduler
+
+# =========================================================
+# 🧵 변환 작업(Job) 관리
+# - 무거운 변환(Audiveris, MuseScore, music21)은 이벤트 루프 밖의
+#   워커 풀에서 실행 → /auth/login 같은 API가 멈추지 않음
+# - 워커 수는 환경변수로 조절:  export EASYSCORE_JOB_WORKERS=4
+# - 대기 중인 작업은 사용자별로 돌아가며 실행 (scheduler.py, 한도/가중치는 quotas.py)
+# =========================================================
+JOB_WORKERS = int(os.getenv("EASYSCORE_JOB_WORKERS", "2"))
+# 끝난 작업 정보를 메모리에 보관하는 시간 (초)
+JOB_TTL_SECONDS = int(os.getenv("EASYSCORE_JOB_TTL", "3600"))
+# 한 번의 일괄 변환 요청에 넣을 수 있는 최대 파일 수
+MAX_BATCH_FILES = int(os.getenv("EASYSCORE_MAX_BATCH_FILES", "50"))
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+FINISHED_STATUSES = (STATUS_DONE, STATUS_FAILED)
+
+
+class Job:
+    def __init__(self, owner_id: Any, filename: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.filename = filename
+        self.status = STATUS_QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        # 진행 이벤트 (상태 변경, 단계 시작/끝, 난이도별 결과) → GET /jobs/{id}/events 로 전달
+        self.events: List[dict] = []
+        self.stage: Optional[str] = None  # 지금 진행 중인 단계 (상태 조회용)
+        self.trace_id: Optional[str] = None  # 추적 기록 id (run 폴더의 traces/<id>.json)
+        self._events_lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def emit(self, event: str, **data) -> None:
+        if event == "stage_start":
+            self.stage = data.get("stage")
+        with self._events_lock:
+            self.events.append({"seq": len(self.events), "event": event, "at": time.time(), **data})
+
+    def events_since(self, after: int) -> List[dict]:
+        """seq가 after보다 큰 이벤트 (after=-1이면 전부)"""
+        with self._events_lock:
+            return self.events[after + 1:]
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "trace_id": self.trace_id,
+        }
+
+
+class Batch:
+    """여러 파일을 한 번에 올린 요청 = 파일마다 Job 1개 (업로드 단계에서 거부된 파일은 job_id 없음)"""
+    def __init__(self, owner_id: Any):
+        self.id = uuid.uuid4().hex
+        self.owner_id = owner_id
+        self.created_at = time.time()
+        self.items: List[dict] = []
+
+    def add(self, filename: Optional[str], job: Optional[Job] = None, error: Optional[str] = None) -> None:
+        self.items.append({
+            "index": len(self.items),
+            "filename": filename,
+            "job_id": job.id if job else None,
+            "error": error,
+        })
+
+
+class JobManager:
+    def __init__(self, max_workers: int = JOB_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._scheduler = FairScheduler(self.max_workers, limits=quotas.scheduling_limits)
+        self._jobs: Dict[str, Job] = {}
+        self._batches: Dict[str, Batch] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        fn: Callable[..., dict],
+        *args,
+        owner_id: Any = None,
+        filename: Optional[str] = None,
+        bind: Optional[Callable[[Job], None]] = None,
+        **kwargs,
+    ) -> Job:
+        """bind: 작업이 시작되기 전에 Job을 받아서 이벤트 구독 등을 연결할 함수"""
+        job = Job(owner_id, filename)
+        if bind:
+            bind(job)
+        job.emit("status", status=STATUS_QUEUED)
+        metrics.JOBS_IN_FLIGHT.labels(status=STATUS_QUEUED).inc()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        # 호출한 쪽의 contextvars(요청 추적 정보)를 작업 스레드에서도 그대로 사용
+        context = contextvars.copy_context()
+        try:
+            job.future = self._scheduler.submit(owner_id, context.run, self._run, job, fn, args, kwargs)
+        except Exception:
+            metrics.JOBS_IN_FLIGHT.labels(status=STATUS_QUEUED).dec()
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+        # 대기 중에 취소되면(종료 시 등) _run이 실행되지 않으므로 여기서 queued 지표를 내림
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        return job
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        if job.started_at is not None:
+            return
+        metrics.JOBS_IN_FLIGHT.labels(status=STATUS_QUEUED).dec()
+        if future.cancelled():
+            job.status = STATUS_FAILED
+            job.error = "작업이 취소되었습니다."
+            job.finished_at = time.time()
+            metrics.JOBS_FINISHED.labels(status=job.status).inc()
+            job.emit("status", status=job.status, error=job.error)
+
+    def _run(self, job: Job, fn: Callable[..., dict], args: tuple, kwargs: dict) -> dict:
+        metrics.JOBS_IN_FLIGHT.labels(status=STATUS_QUEUED).dec()
+        metrics.JOBS_IN_FLIGHT.labels(status=STATUS_RUNNING).inc()
+        job.status = STATUS_RUNNING
+        job.started_at = time.time()
+        job.emit("status", status=STATUS_RUNNING)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = STATUS_DONE
+            return job.result
+        except Exception as e:
+            job.error = str(e)
+            job.status = STATUS_FAILED
+            print(f"❌ [job {job.id[:8]}] 실패: {e}")
+            raise
+        finally:
+            job.finished_at = time.time()
+            metrics.JOBS_IN_FLIGHT.labels(status=STATUS_RUNNING).dec()
+            metrics.JOBS_FINISHED.labels(status=job.status).inc()
+            metrics.JOB_SECONDS.observe(job.finished_at - job.started_at)
+            job.emit("status", status=job.status, error=job.error,
+                     elapsed_ms=round((job.finished_at - job.started_at) * 1000, 1))
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def register_batch(self, batch: Batch) -> Batch:
+        with self._lock:
+            self._batches[batch.id] = batch
+        return batch
+
+    def get_batch(self, batch_id: str) -> Optional[Batch]:
+        with self._lock:
+            return self._batches.get(batch_id)
+
+    def batch_status(self, batch: Batch) -> dict:
+        """항목별 상태 + 전체 집계 (동시 실행 수는 워커 수로 제한됨)"""
+        items = []
+        counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for item in batch.items:
+            job = self.get(item["job_id"]) if item["job_id"] else None
+            if job:
+                entry = {**item, **job.to_dict(), "filename": item["filename"], "error": job.error}
+            else:
+                # 업로드 단계에서 거부됐거나, 보관 시간이 지나 정리된 작업
+                entry = {**item, "status": STATUS_FAILED, "error": item["error"] or "작업 정보가 만료되었습니다."}
+            counts[entry["status"]] += 1
+            items.append(entry)
+        return {
+            "batch_id": batch.id,
+            "created_at": batch.created_at,
+            "total": len(items),
+            "finished": counts[STATUS_DONE] + counts[STATUS_FAILED] == len(items),
+            **counts,
+            "items": items,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.max_workers, **counts, "scheduler": self._scheduler.stats()}
+
+    def _prune(self) -> None:
+        # 오래전에 끝난 작업은 메모리에서 제거
+        now = time.time()
+        expired = [
+            jid for jid, job in self._jobs.items()
+            if job.finished_at and now - job.finished_at > JOB_TTL_SECONDS
+        ]
+        for jid in expired:
+            del self._jobs[jid]
+        # 일괄 작업은 속한 작업이 모두 정리된 뒤에 제거
+        stale = [
+            bid for bid, batch in self._batches.items()
+            if now - batch.created_at > JOB_TTL_SECONDS
+            and not any(item["job_id"] in self._jobs for item in batch.items)
+        ]
+        for bid in stale:
+            del self._batches[bid]
+
+    def shutdown(self) -> None:
+        self._scheduler.shutdown(cancel_futures=True)
+
+
+job_manager = JobManager()
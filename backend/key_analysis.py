@@ -0,0 +1,197 @@
+# backend/key_analysis.py
+import hashlib
+import os
+import threading
+from typing import Dict, Optional
+
+import music21
+import numpy as np
+
+import arrange
+
+# =========================================================
+# 🔑 조성/음역 분석 + 이조 (NumPy)
+# - 예전 _transpose_smart: score.analyze("key") → score.transpose() (악보 전체 복사)
+#   → 평균 음높이 계산 후 옥타브 이조로 한 번 더 복사
+# - 지금: 음표 배열(arrange.NoteTable)에서 음높이 클래스 분포를 한 번에 만들고
+#   24개 조와의 상관계수를 행렬 곱 한 번으로 계산
+#   → C장조/a단조로 옮기는 음정 + 옥타브 보정을 합쳐서 배열에 한 번만 적용
+# - 같은 음표 배열이면 분석 결과를 재사용 (음표 내용 해시 기준)
+#   사용할 조 프로파일:  export EASYSCORE_KEY_PROFILE=aarden   (aarden | krumhansl)
+# =========================================================
+PROFILES = {
+    # music21 analyze("key") 기본값과 같은 가중치 → 예전과 같은 조 판정
+    "aarden": (
+        [17.7661, 0.145624, 14.9265, 0.160186, 19.8049, 11.3587, 0.291248, 22.062, 0.145624, 8.15494, 0.232998, 4.95122],
+        [18.2648, 0.737619, 14.0499, 16.8599, 0.702494, 14.4362, 0.702494, 18.6161, 4.56621, 1.93186, 7.37619, 1.75623],
+    ),
+    "krumhansl": (
+        [6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88],
+        [6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17],
+    ),
+}
+KEY_PROFILE = os.getenv("EASYSCORE_KEY_PROFILE", "aarden")
+if KEY_PROFILE not in PROFILES:
+    raise ValueError(f"EASYSCORE_KEY_PROFILE must be one of {sorted(PROFILES)}, not {KEY_PROFILE!r}")
+
+# 평균 음높이가 이 범위를 벗어나면 옥타브 이동
+HIGH_AVERAGE = 80
+LOW_AVERAGE = 50
+
+CACHE_SIZE = 64
+
+# 음높이 클래스 → 으뜸음 철자 (music21과 같은 선택: 장조의 G#은 A-로)
+_TONIC_MAJOR = ["C", "C#", "D", "E-", "E", "F", "F#", "G", "A-", "A", "B-", "B"]
+_TONIC_MINOR = ["C", "C#", "D", "E-", "E", "F", "F#", "G", "G#", "A", "B-", "B"]
+_TARGET = {"major": "C", "minor": "A"}
+
+
+def _rotations(weights) -> np.ndarray:
+    # rows[i] = 으뜸음이 i인 조의 프로파일
+    w = np.asarray(weights, dtype=np.float64)
+    return np.stack([np.roll(w, i) for i in range(12)])
+
+
+_PROFILE_MATRIX = {
+    name: np.concatenate([_rotations(major), _rotations(minor)]) for name, (major, minor) in PROFILES.items()
+}
+
+
+class KeyAnalysis:
+    """
+    조 판정 + 이조량
+    - semitones / steps: 합친 이조 음정 (반음 수, 오선 위 칸 수) - 옥타브 보정 포함
+    - key_interval: 조만 옮기는 music21 음정 (조표 이조용)
+    """
+    def __init__(self, tonic: str, mode: str, correlation: float, mean_midi: float, steps: int, semitones: int, octave_shift: int):
+        self.tonic = tonic
+        self.mode = mode
+        self.correlation = correlation
+        self.mean_midi = mean_midi
+        self.steps = steps
+        self.semitones = semitones
+        self.octave_shift = octave_shift
+
+    @property
+    def key_interval(self) -> music21.interval.Interval:
+        target = music21.pitch.Pitch(_TARGET[self.mode])
+        return music21.interval.Interval(music21.pitch.Pitch(self.tonic), target)
+
+    def to_dict(self) -> dict:
+        return {
+            "key": f"{self.tonic} {self.mode}",
+            "correlation": round(self.correlation, 4),
+            "mean_midi": round(self.mean_midi, 2),
+            "semitones": self.semitones,
+            "octave_shift": self.octave_shift,
+        }
+
+
+_cache: Dict[str, Optional[KeyAnalysis]] = {}
+_lock = threading.Lock()
+
+
+def _digest(midi: np.ndarray, weights: np.ndarray) -> str:
+    h = hashlib.sha1(KEY_PROFILE.encode())
+    h.update(np.ascontiguousarray(midi).tobytes())
+    h.update(np.ascontiguousarray(weights).tobytes())
+    return h.hexdigest()
+
+
+def _spelled_midi(name: str) -> int:
+    # 옥타브 없는 으뜸음은 music21처럼 4옥타브로 계산
+    return music21.pitch.Pitch(name + "4").midi
+
+
+def _diatonic(name: str) -> int:
+    return arrange.STEPS.index(name[0])
+
+
+def _analyze(midi: np.ndarray, weights: np.ndarray) -> Optional[KeyAnalysis]:
+    histogram = np.bincount(midi % 12, weights=weights, minlength=12)
+    if not histogram.any():
+        return None
+    profiles = _PROFILE_MATRIX[KEY_PROFILE]
+    # 24개 조 각각과의 피어슨 상관계수
+    p = profiles - profiles.mean(axis=1, keepdims=True)
+    h = histogram - histogram.mean()
+    correlation = (p @ h) / np.sqrt((p * p).sum(axis=1) * (h * h).sum())
+    best = int(np.argmax(correlation))
+    mode = "major" if best < 12 else "minor"
+    tonic = (_TONIC_MAJOR if mode == "major" else _TONIC_MINOR)[best % 12]
+
+    target = _TARGET[mode]
+    steps = _diatonic(target) - _diatonic(tonic)
+    semitones = _spelled_midi(target) - _spelled_midi(tonic)
+    mean_midi = float(midi.mean())
+    moved = mean_midi + semitones
+    octave_shift = -1 if moved > HIGH_AVERAGE else (1 if moved < LOW_AVERAGE else 0)
+    return KeyAnalysis(
+        tonic, mode, float(correlation[best]), mean_midi,
+        steps + 7 * octave_shift, semitones + 12 * octave_shift, octave_shift,
+    )
+
+
+def analyze(table: arrange.NoteTable) -> Optional[KeyAnalysis]:
+    """음표 배열 → 조 판정 + 이조량 (음표가 없으면 None)"""
+    notes = table.notes
+    if not len(notes):
+        return None
+    midi = notes["midi"].astype(np.int64)
+    # music21과 같이 음 길이로 가중 (꾸밈음은 0)
+    weights = np.where(notes["flags"] & arrange.GRACE, 0.0, notes["duration"])
+    key = _digest(midi, weights)
+    with _lock:
+        if key in _cache:
+            return _cache[key]
+    result = _analyze(midi, weights)
+    with _lock:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[key] = result
+    return result
+
+
+def transpose(table: arrange.NoteTable, steps: int, semitones: int) -> None:
+    """음표 배열 전체를 (오선 칸 수, 반음 수) 음정만큼 제자리 이조 - 철자는 music21 transpose와 같게"""
+    notes = table.notes
+    if not len(notes) or (steps == 0 and semitones == 0):
+        return
+    step = notes["step"].astype(np.int64)
+    alter = notes["alter"].astype(np.int64)
+    midi = notes["midi"].astype(np.int64)
+    octave = (midi - alter - arrange.STEP_PC[step]) // 12 - 1
+    diatonic = step + 7 * octave + steps
+    new_step = diatonic % 7
+    new_midi = midi + semitones
+    new_alter = new_midi - (12 * (diatonic // 7 + 1) + arrange.STEP_PC[new_step])
+    notes["midi"] = new_midi
+    notes["step"] = new_step
+    notes["alter"] = new_alter
+    # music21이 정한 철자였거나 겹샵/겹플랫보다 더 필요하면 music21처럼 기본 철자로
+    # (simplifyEnharmonic(mostCommon=True)는 G#/A-는 그대로 둠)
+    common_g_sharp = (new_midi % 12 == 8) & (np.abs(new_alter) == 1)
+    inferred = (notes["flags"] & arrange.RESPELL) != 0
+    arrange.respell_rows(notes, (inferred & ~common_g_sharp) | (np.abs(new_alter) > 4))
+
+
+def _transpose_element(data: list, interval: music21.interval.Interval) -> list:
+    if data[0] != "key":
+        return data
+    return arrange.element_to_data(arrange.element_from_data(data).transpose(interval))
+
+
+def transpose_smart(table: arrange.NoteTable) -> Optional[KeyAnalysis]:
+    """C장조/a단조로 이조 + 평균 음높이가 너무 높거나 낮으면 옥타브 이동 (한 번에, 제자리)"""
+    analysis = analyze(table)
+    if analysis is None:
+        return None
+    transpose(table, analysis.steps, analysis.semitones)
+    if analysis.semitones % 12 or analysis.steps % 7:
+        # 조표도 같이 옮김
+        interval = analysis.key_interval
+        table.parts = [
+            [(offset, _transpose_element(data, interval)) for offset, data in meta]
+            for meta in table.parts
+        ]
+    return analysis
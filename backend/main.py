@@ -1,13 +1,33 @@
 # backend/main.py
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
-from fastapi.responses import JSONResponse
+import asyncio
+import json
+import os
+import re
+import threading
+from typing import List, Optional, Tuple
+
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
 import uvicorn
 
 # 👇 동료의 auth.py를 가져옵니다 (이제 파일이 있으니 에러 안 남!)
 import ai_engine
-from auth import router as auth_router, get_current_user
+import db
+import metrics
+import omr_pool
+import pdf_pages
+import quotas
+import result_cache
+import results
+import tools
+import tracing
+from retention import RetentionManager
+from jobs import job_manager, Batch, MAX_BATCH_FILES, STATUS_DONE, FINISHED_STATUSES
+from workspace import Workspace
+from auth import router as auth_router, get_current_user, require_admin, is_admin
 
 app = FastAPI(title="EasyScore AI Backend")
 
@@ -27,52 +47,549 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(db.PoolTimeout)
+def _db_busy(request, exc):
+    # DB 연결이 모두 사용 중 → 잠시 후 다시 시도하도록 503
+    return JSONResponse(status_code=503, content={"detail": "요청이 많아 잠시 후 다시 시도해 주세요."},
+                        headers={"Retry-After": "1"})
+
 # ✅ 로그인/회원가입 기능 활성화
 app.include_router(auth_router)
+# 📦 변환 결과 파일 다운로드 (/results/{run_id}/{level}.png|.mid)
+app.include_router(results.router)
 
 @app.get("/")
 def read_root():
     return {"status": "ok", "message": "EasyScore Backend is ready!"}
 
+
+@app.get("/health/tools")
+def tools_health():
+    """외부 프로그램 준비 상태 (readiness 체크용, 필수 프로그램이 없으면 503)"""
+    status = tools.registry.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+# =========================================================
+# 변환 파이프라인 (워커 스레드에서 실행됨)
+# =========================================================
+def convert_image(pages: List[bytes], workspace: Workspace, levels: List[str], formats: List[str], user_id=None) -> dict:
+    # user_id: 결과 파일(/results)을 받을 수 있는 사용자로 run 폴더에 기록
+    # 추적 기록은 결과가 있는 run 폴더에 저장 (캐시 적중이면 캐시된 run 폴더, 실패해도 폴더가 있으면 저장)
+    trace = tracing.current_trace()
+    result_files = None
+    try:
+        with tracing.profile_session(), tracing.span("convert_image", run_id=workspace.id, pages=len(pages)):
+            result_files = _convert_image(pages, workspace, levels, formats, user_id)
+        return result_files
+    finally:
+        run_dir = result_files["run_dir"] if result_files else workspace.run_dir
+        if trace and os.path.isdir(run_dir):
+            trace.save(run_dir)
+
+
+def _convert_image(pages: List[bytes], workspace: Workspace, levels: List[str], formats: List[str], user_id=None) -> dict:
+    # 같은 이미지(페이지 목록)를 이미 변환한 적이 있으면 캐시에서 바로 반환
+    cache_key = result_cache.make_key(pages, ai_engine.PIPELINE_PARAMS)
+    # 같은 키의 요청이 동시에 오면 앞 요청이 끝날 때까지 기다렸다가 그 결과를 씀
+    # (같은 run 폴더에 두 요청이 동시에 쓰지 않도록)
+    with result_cache.key_lock(cache_key):
+        cached = result_cache.lookup(ai_engine.BASE_OUTPUT_DIR, cache_key)
+        if cached:
+            # 캐시된 run을 받는 사용자도 그 결과 파일을 받을 수 있어야 함
+            results.grant_access(cached["run_dir"], user_id)
+            missing = result_cache.missing(cached, levels, formats)
+            if not missing:
+                print(f"⚡ 캐시 적중: {cache_key[:12]}")
+                workspace.emit("cache", hit=True)
+                return result_cache.select(cached, levels, formats)
+            # 없는 결과물은 같은 run 폴더에 추가로 만들어서 캐시 항목 하나에 모음
+            workspace = workspace.reopen(cached["run_id"])
+            if cached["omr"]:
+                # 악보 인식 결과는 있으므로 없는 난이도/형식만 생성
+                print(f"⚡ 캐시 일부 적중: {cache_key[:12]} (추가 생성: {missing})")
+                workspace.emit("cache", hit="partial", run_id=cached["run_id"])
+                todo_levels = sorted({level for level, _ in missing}, key=levels.index)
+                todo_formats = sorted({kind for _, kind in missing}, key=formats.index)
+                with workspace:
+                    # 정규화 결과가 run 폴더에 있으면 OMR 결과를 다시 파싱하지 않음
+                    source = ai_engine.load_normalized(cached["run_dir"])
+                    if source is None:
+                        source = ai_engine.load_omr_score(cached["omr"])
+                    ai_engine.simplify_and_generate(source, workspace, levels=todo_levels, formats=todo_formats)
+                result_cache.store(ai_engine.BASE_OUTPUT_DIR, cache_key, cached["run_dir"], ai_engine.PIPELINE_PARAMS)
+                return result_cache.select(result_cache.lookup(ai_engine.BASE_OUTPUT_DIR, cache_key), levels, formats)
+
+        # AI 엔진 실행 (모든 단계가 같은 작업 공간을 사용)
+        print(f"⚙️ OMR 및 단순화 작업 시작... ({workspace.id})")
+        # 난이도별 결과 URL이 진행 이벤트로 먼저 나가므로 시작하기 전에 기록
+        results.grant_access(workspace.run_dir, user_id)
+        with workspace:
+            score = ai_engine.recognize_pages(pages, workspace)
+            result_files = ai_engine.simplify_and_generate(score, workspace, levels=levels, formats=formats)
+        result_cache.store(ai_engine.BASE_OUTPUT_DIR, cache_key, result_files["run_dir"], ai_engine.PIPELINE_PARAMS)
+        return result_files
+
+
+def build_result_content(filename: Optional[str], result_files: dict) -> dict:
+    # 파일 자체는 /results/{run_id}/{level}.png|.mid 에서 받아감 (JSON에는 URL과 메타데이터만)
+    run_id = result_files["run_id"]
+    return {
+        "status": "success",
+        "original_filename": filename,
+        "run_id": run_id,
+        "levels": {
+            level.lower(): _level_content(run_id, level, files)
+            for level, files in result_files["levels"].items()
+        },
+    }
+
+
+def _level_content(run_id: str, level: str, files: dict) -> dict:
+    name = level.lower()
+    return {
+        "image_url": results.artifact_url(run_id, name, "png") if files.get("png") else None,
+        "image_size": os.path.getsize(files["png"]) if files.get("png") else None,
+        "thumb_url": results.artifact_url(run_id, name, "thumb.png") if files.get("png") else None,
+        "midi_url": results.artifact_url(run_id, name, "mid") if files.get("midi") else None,
+        "midi_size": os.path.getsize(files["midi"]) if files.get("midi") else None,
+    }
+
+
+def _forward_events(workspace: Workspace):
+    """작업 공간의 진행 이벤트를 Job 이벤트로 전달 (파일 경로는 URL로 바꿔서)"""
+    def bind(job):
+        def forward(event: str, data: dict) -> None:
+            if event == "level":
+                data = {"level": data["level"].lower(), "run_id": data["run_id"],
+                        **_level_content(data["run_id"], data["level"], data["files"])}
+            job.emit(event, **data)
+        workspace.listen(forward)
+    return bind
+
+
+# 기본값: 화면에 보여주는 Easy / Super Easy 의 이미지 + MIDI (HARD는 요청할 때만 생성)
+DEFAULT_LEVELS = "easy,super_easy"
+DEFAULT_FORMATS = "png,midi"
+_FORMAT_ALIASES = {"png": "png", "midi": "midi", "mid": "midi"}
+
+
+def parse_selection(levels: str, formats: str) -> Tuple[List[str], List[str]]:
+    """'easy,super_easy' / 'png,midi' → (["EASY", "SUPER_EASY"], ["png", "midi"])"""
+    level_names = {name: suffix for name, suffix in ai_engine.LEVEL_MODES}
+    picked_levels, picked_formats = [], []
+    for raw in levels.split(","):
+        name = raw.strip().lower()
+        if not name: continue
+        if name not in level_names:
+            raise HTTPException(status_code=400, detail=f"알 수 없는 난이도: {raw} (hard, easy, super_easy 중 선택)")
+        if level_names[name] not in picked_levels: picked_levels.append(level_names[name])
+    for raw in formats.split(","):
+        name = raw.strip().lower()
+        if not name: continue
+        if name not in _FORMAT_ALIASES:
+            raise HTTPException(status_code=400, detail=f"알 수 없는 형식: {raw} (png, midi 중 선택)")
+        if _FORMAT_ALIASES[name] not in picked_formats: picked_formats.append(_FORMAT_ALIASES[name])
+    if not picked_levels or not picked_formats:
+        raise HTTPException(status_code=400, detail="난이도와 형식을 하나 이상 선택해야 합니다.")
+    return picked_levels, picked_formats
+
+
+async def _read_score_upload(file: UploadFile) -> List[bytes]:
+    """업로드 1개 → 페이지 이미지 목록 (이미지는 1장, PDF는 페이지 수만큼)"""
+    content_type = file.content_type or ""
+    data = await file.read()
+    if pdf_pages.is_pdf(content_type, data):
+        try:
+            # 렌더링은 CPU 작업이라 이벤트 루프 밖에서 실행
+            pages = await asyncio.to_thread(pdf_pages.render_pdf, data)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        print(f"📥 PDF 수신: {file.filename} ({len(data)} bytes, {len(pages)}페이지)")
+        return pages
+    if not content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="이미지 또는 PDF 파일만 업로드할 수 있습니다.")
+    print(f"📥 파일 수신: {file.filename} ({len(data)} bytes)")
+    return [data]
+
+
+async def _read_score_uploads(files: List[UploadFile]) -> List[bytes]:
+    """같은 요청에 여러 파일을 올리면 올린 순서대로 한 악보의 페이지로 취급"""
+    pages = []
+    for file in files:
+        pages.extend(await _read_score_upload(file))
+    if len(pages) > pdf_pages.MAX_PAGES:
+        raise HTTPException(status_code=400, detail=f"한 악보는 최대 {pdf_pages.MAX_PAGES}페이지까지 변환할 수 있습니다.")
+    return pages
+
+
+# =========================================================
+# 🔍 요청 추적 / 프로파일링
+# - 변환 요청마다 trace id → run 폴더의 traces/<id>.json (응답 헤더 X-Trace-Id, 작업 정보의 trace_id)
+#   클라이언트가 X-Request-ID 헤더를 보내면 그 값을 trace id로 사용
+# - 프로파일링 (그 요청만): 관리자가 "X-EasyScore-Profile: 1" 헤더를 붙여서 요청하거나,
+#   POST /admin/profiling?requests=N 으로 다음 N개의 변환 요청을 프로파일링
+#   → traces/<id>.folded (music21 파싱, 편곡, 양자화 등 파이썬 구간의 샘플링 스택)
+# =========================================================
+PROFILE_HEADER = "X-EasyScore-Profile"
+_TRACE_ID_RE = re.compile(r"^[0-9A-Za-z_-]{1,64}$")
+_profile_lock = threading.Lock()
+_profile_remaining = 0
+
+
+def _new_trace(user: dict, request_id: Optional[str] = None, profile_header: Optional[str] = None) -> tracing.Trace:
+    global _profile_remaining
+    profile = profile_header == "1" and is_admin(user)
+    if not profile:
+        with _profile_lock:
+            if _profile_remaining > 0:
+                _profile_remaining -= 1
+                profile = True
+    # trace id는 파일 이름으로 쓰므로 안전한 문자만 허용
+    trace_id = request_id if request_id and _TRACE_ID_RE.match(request_id) else None
+    return tracing.Trace(trace_id, profile=profile)
+
+
+# =========================================================
+# 🎫 사용자별 하루 변환 한도 (quotas.py, 관리자는 제한 없음)
+# - 변환 요청을 접수할 때 1회 차감, 한도를 넘으면 429 + Retry-After(자정까지 남은 초)
+# - 변환이 실패하거나(Audiveris/MuseScore 오류 등) 취소되면 차감한 1회를 되돌림
+# - 접수된 작업은 사용자별 대기열에서 돌아가며 실행됨 (scheduler.py)
+# =========================================================
+def _consume_quota(user: dict) -> Optional[str]:
+    """차감한 날짜 반환 (관리자는 차감하지 않으므로 None)"""
+    if is_admin(user):
+        return None
+    day = quotas.today()
+    try:
+        quotas.consume(user["id"], day=day)
+    except quotas.QuotaExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(quotas.seconds_until_reset())})
+    return day
+
+
+def _refund_quota(user_id, day: Optional[str]) -> None:
+    if day is None:
+        return
+    try:
+        quotas.refund(user_id, day)
+    except Exception as e:
+        print(f"⚠️ 변환 한도 되돌리기 실패 (user {user_id}): {e}")
+
+
+def _refund_on_failure(user_id, day: Optional[str]):
+    def callback(future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            _refund_quota(user_id, day)
+    return callback
+
+
+def _submit_conversion(pages: List[bytes], selection: Tuple[List[str], List[str]], user: dict, filename: Optional[str], trace: tracing.Trace):
+    # 요청마다 새 작업 공간을 만들고, 진행 이벤트를 Job으로 전달하도록 연결
+    day = _consume_quota(user)
+    workspace = Workspace(ai_engine.BASE_OUTPUT_DIR)
+    # 작업 스레드는 제출 시점의 contextvars를 이어받으므로 여기서 trace를 활성화
+    try:
+        with tracing.activate(trace):
+            job = job_manager.submit(
+                convert_image, pages, workspace, *selection, user_id=user["id"],
+                owner_id=user["id"], filename=filename, bind=_forward_events(workspace),
+            )
+    except Exception:
+        _refund_quota(user["id"], day)
+        raise
+    job.future.add_done_callback(_refund_on_failure(user["id"], day))
+    job.trace_id = trace.id
+    return job
+
+
 @app.post("/simplify")
 async def simplify_score(
-    file: UploadFile = File(...),
+    # 여러 장(또는 PDF)을 올리면 한 악보의 페이지들로 처리
+    file: List[UploadFile] = File(...),
+    levels: str = Form(DEFAULT_LEVELS),
+    formats: str = Form(DEFAULT_FORMATS),
+    x_request_id: Optional[str] = Header(default=None),
+    profile: Optional[str] = Header(default=None, alias=PROFILE_HEADER),
     # 👇 이 부분이 핵심! 로그인한 사람(user)만 통과시킴
     user=Depends(get_current_user) 
 ):
-    if not file.content_type or not file.content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="이미지 파일만 업로드할 수 있습니다.")
+    # 로그인한 사용자 이름 출력 (동료 코드와 연동 확인용)
+    print(f"👤 요청 사용자: {user['username']}") 
+    selection = parse_selection(levels, formats)
+    trace = _new_trace(user, x_request_id, profile)
+    with tracing.activate(trace), tracing.span("simplify_score", user=user["username"]):
+        with tracing.span("read_upload"):
+            pages = await _read_score_uploads(file)
+        filename = file[0].filename
 
-    try:
-        # 로그인한 사용자 이름 출력 (동료 코드와 연동 확인용)
-        print(f"👤 요청 사용자: {user['username']}") 
-
-        image_bytes = await file.read()
-        print(f"📥 파일 수신: {file.filename} ({len(image_bytes)} bytes)")
-
-        # AI 엔진 실행
-        print("⚙️ OMR 및 단순화 작업 시작...")
-        music_xml_content = ai_engine.run_audiveris(image_bytes)
-        result_files = ai_engine.simplify_and_generate(music_xml_content)
-
-        return JSONResponse(
-            status_code=200,
-            content={
-                "status": "success",
-                "original_filename": file.filename,
-                "easy_image_base64": result_files.get("easy_image_base64"),
-                "easy_midi_base64": result_files.get("easy_midi_base64"),
-                "super_easy_image_base64": result_files.get("super_easy_image_base64"),
-                "super_easy_midi_base64": result_files.get("super_easy_midi_base64"),
-                # 호환성용
-                "simplified_image_base64": result_files.get("simplified_image_base64"),
-                "simplified_midi_base64": result_files.get("simplified_midi_base64"),
-            },
-        )
+        try:
+            # 변환은 워커 풀에서 실행하고, 여기서는 결과만 기다림 (이벤트 루프는 계속 동작)
+            job = _submit_conversion(pages, selection, user, filename, trace)
+            result_files = await asyncio.wrap_future(job.future)
+            # 응답 만들기(결과 파일 정보 + JSON 직렬화)도 단계 지표로 기록
+            with metrics.timed("encode_response"), tracing.span("encode_response"):
+                response = JSONResponse(status_code=200, content=build_result_content(filename, result_files),
+                                        headers={"X-Trace-Id": trace.id})
+        except HTTPException:
+            # 한도 초과(429) 등은 그대로 전달
+            raise
+        except Exception as e:
+            print(f"❌ 에러 발생: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e), headers={"X-Trace-Id": trace.id})
+    # 요청 전체(업로드 읽기 ~ 응답 만들기)가 들어간 기록으로 다시 저장
+    trace.save(result_files["run_dir"])
+    return response
 
-    except Exception as e:
-        print(f"❌ 에러 발생: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+# =========================================================
+# 일괄 변환
+# - POST /simplify/batch      : 이미지 여러 장을 한 번에 업로드 → batch_id + 항목별 job_id
+#   (파일마다 작업 풀에 들어가서 워커 수만큼 동시에 처리됨, PDF는 파일 하나 = 악보 하나)
+# - GET  /simplify/batch/{id} : 항목별 상태, 끝난 항목은 결과 포함
+# =========================================================
+@app.post("/simplify/batch", status_code=202)
+async def simplify_batch(
+    files: List[UploadFile] = File(...),
+    levels: str = Form(DEFAULT_LEVELS),
+    formats: str = Form(DEFAULT_FORMATS),
+    user=Depends(get_current_user),
+):
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {MAX_BATCH_FILES}개까지 올릴 수 있습니다.")
+    selection = parse_selection(levels, formats)
+    batch = Batch(user["id"])
+    for file in files:
+        try:
+            pages = await _read_score_upload(file)
+            job = _submit_conversion(pages, selection, user, file.filename, _new_trace(user))
+        except HTTPException as e:
+            # 잘못된 파일(또는 한도 초과) 하나 때문에 전체를 거부하지 않고 그 항목만 실패 처리
+            batch.add(file.filename, error=e.detail)
+            continue
+        batch.add(file.filename, job)
+    job_manager.register_batch(batch)
+    print(f"🗂️ 일괄 변환 등록: {batch.id} ({len(files)}개, {user['username']})")
+    # 캐시 적중한 항목은 이미 끝났을 수 있으므로 결과까지 포함
+    return _batch_content(batch)
+
+
+@app.get("/simplify/batch/{batch_id}")
+def get_batch(batch_id: str, user=Depends(get_current_user)):
+    batch = job_manager.get_batch(batch_id)
+    if not batch or batch.owner_id != user["id"]:
+        raise HTTPException(status_code=404, detail="일괄 작업을 찾을 수 없습니다.")
+    return _batch_content(batch)
+
+
+def _batch_content(batch: Batch) -> dict:
+    content = job_manager.batch_status(batch)
+    for item in content["items"]:
+        job = job_manager.get(item["job_id"]) if item["job_id"] else None
+        if job and job.status == STATUS_DONE:
+            item["result"] = build_result_content(job.filename, job.result)
+    return content
+
+
+# =========================================================
+# 비동기 작업 API
+# - POST /jobs      : 업로드 후 바로 job_id 반환
+# - GET  /jobs/{id} : 상태 조회, 끝났으면 결과 포함
+# =========================================================
+@app.post("/jobs", status_code=202)
+async def create_job(
+    file: List[UploadFile] = File(...),
+    levels: str = Form(DEFAULT_LEVELS),
+    formats: str = Form(DEFAULT_FORMATS),
+    x_request_id: Optional[str] = Header(default=None),
+    profile: Optional[str] = Header(default=None, alias=PROFILE_HEADER),
+    user=Depends(get_current_user),
+):
+    selection = parse_selection(levels, formats)
+    pages = await _read_score_uploads(file)
+    trace = _new_trace(user, x_request_id, profile)
+    job = _submit_conversion(pages, selection, user, file[0].filename, trace)
+    print(f"🧾 작업 등록: {job.id} ({user['username']})")
+    return job.to_dict()
+
+
+def _get_own_job(job_id: str, user: dict):
+    job = job_manager.get(job_id)
+    # 다른 사용자의 작업은 존재 여부도 알려주지 않음
+    if not job or job.owner_id != user["id"]:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str, user=Depends(get_current_user)):
+    job = _get_own_job(job_id, user)
+    content = job.to_dict()
+    if job.status == STATUS_DONE:
+        content["result"] = build_result_content(job.filename, job.result)
+    return content
+
+
+# =========================================================
+# 진행 상황 스트리밍 (Server-Sent Events)
+# - GET /jobs/{id}/events
+#   status(queued/running/done/failed), stage_start/stage_end(소요 시간),
+#   level(난이도 하나가 끝나면 바로 결과 URL), 마지막에 result(전체 결과)
+# - 연결이 끊기면 Last-Event-ID 헤더로 이어서 받을 수 있음
+# - 이벤트가 없어도 주기적으로 keep-alive 주석을 보내서 프록시/클라이언트 타임아웃 방지
+# =========================================================
+SSE_POLL_SECONDS = 0.25
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _sse(event: str, data: dict, event_id: Optional[int] = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(
+    job_id: str,
+    last_event_id: Optional[str] = Header(default=None),
+    user=Depends(get_current_user),
+):
+    job = _get_own_job(job_id, user)
+    after = int(last_event_id) if last_event_id and last_event_id.isdigit() else -1
+
+    async def stream():
+        seq = after
+        idle = 0.0
+        while True:
+            events = job.events_since(seq)
+            for ev in events:
+                seq = ev["seq"]
+                yield _sse(ev["event"], ev, seq)
+                if ev["event"] == "status" and ev["status"] in FINISHED_STATUSES:
+                    if ev["status"] == STATUS_DONE:
+                        yield _sse("result", build_result_content(job.filename, job.result))
+                    return
+            if events:
+                idle = 0.0
+            elif idle >= SSE_KEEPALIVE_SECONDS:
+                yield ": keep-alive\n\n"
+                idle = 0.0
+            await asyncio.sleep(SSE_POLL_SECONDS)
+            idle += SSE_POLL_SECONDS
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =========================================================
+# 📈 지표 (Prometheus 수집용)
+# - GET /metrics : 단계별 소요 시간, 외부 프로그램 실패/타임아웃, 진행 중인 작업 수
+# - 수집기만 접근하게 하려면 토큰 설정 → "Authorization: Bearer <토큰>" 필요
+#   export EASYSCORE_METRICS_TOKEN=...
+# =========================================================
+METRICS_TOKEN = os.getenv("EASYSCORE_METRICS_TOKEN", "")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics(authorization: Optional[str] = Header(default=None)):
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="지표 조회 토큰이 올바르지 않습니다.")
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# =========================================================
+# 저장소 용량 관리 (관리자 전용)
+# =========================================================
+retention_manager = RetentionManager(ai_engine.BASE_OUTPUT_DIR)
+
+
+@app.get("/admin/storage")
+def storage_usage(admin=Depends(require_admin)):
+    return retention_manager.usage()
+
+
+@app.post("/admin/storage/sweep")
+def storage_sweep(admin=Depends(require_admin)):
+    return retention_manager.sweep()
+
+
+# =========================================================
+# 🎫 변환 한도 조회/변경
+# - GET /quota                   : 내 오늘 사용량과 한도
+# - GET /admin/quotas            : 오늘 사용자별 사용량 + 대기열 상태
+# - PUT /admin/quotas/{user_id}  : 사용자별 한도 변경 (null이면 기본값)
+# =========================================================
+class LimitsRequest(BaseModel):
+    daily_quota: Optional[int] = None
+    max_concurrent: Optional[int] = None
+    weight: Optional[int] = None
+
+
+@app.get("/quota")
+def my_quota(user=Depends(get_current_user)):
+    content = quotas.usage(user["id"])
+    if is_admin(user):
+        content.update(daily_quota=None, remaining=None)
+    return content
+
+
+@app.get("/admin/quotas")
+def quota_overview(admin=Depends(require_admin)):
+    return {"usage": quotas.usage_today(), "jobs": job_manager.stats()}
+
+
+@app.put("/admin/quotas/{user_id}")
+def update_quota(user_id: int, req: LimitsRequest, admin=Depends(require_admin)):
+    for name, value in (("daily_quota", req.daily_quota), ("max_concurrent", req.max_concurrent), ("weight", req.weight)):
+        if value is not None and value < 0:
+            raise HTTPException(status_code=400, detail=f"{name}는 0 이상이어야 합니다.")
+    return quotas.set_limits(user_id, req.daily_quota, req.max_concurrent, req.weight)
+
+
+@app.get("/admin/profiling")
+def profiling_status(admin=Depends(require_admin)):
+    return {"remaining": _profile_remaining, "header": PROFILE_HEADER}
+
+
+@app.post("/admin/profiling")
+def arm_profiling(requests: int = 1, admin=Depends(require_admin)):
+    """다음 requests개의 변환 요청을 프로파일링 (0이면 해제)"""
+    global _profile_remaining
+    if requests < 0:
+        raise HTTPException(status_code=400, detail="requests는 0 이상이어야 합니다.")
+    with _profile_lock:
+        _profile_remaining = requests
+    return {"remaining": requests, "header": PROFILE_HEADER}
+
+
+@app.on_event("startup")
+def _warm_workers():
+    # 난이도 처리 프로세스를 미리 띄워서 첫 요청이 느려지지 않게 함
+    threading.Thread(target=ai_engine.get_level_pool, daemon=True).start()
+    # 외부 프로그램 경로/버전도 미리 찾아둠 (첫 업로드에서 설치 폴더를 뒤지지 않도록)
+    threading.Thread(target=_discover_tools, daemon=True).start()
+    retention_manager.start()
+
+
+def _discover_tools():
+    status = tools.registry.status()
+    print(f"🧰 외부 프로그램 확인 (결과 저장: {ai_engine.BASE_OUTPUT_DIR})")
+    for name, info in status["tools"].items():
+        if info["found"]:
+            print(f"   ✅ {name} {info['version'] or ''}: {info['path']}")
+        else:
+            print(f"   ❌ {name}: {info['error']}")
+    tools.configure_music21()
+
+
+@app.on_event("shutdown")
+def _shutdown_jobs():
+    job_manager.shutdown()
+    retention_manager.stop()
+    omr_pool.shutdown()
+    ai_engine.shutdown_level_pool()
+    db.close_pool()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
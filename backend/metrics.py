@@ -0,0 +1,266 @@
+# backend/metrics.py
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# =========================================================
+# 📈 처리 시간/실패 지표 (Prometheus 텍스트 형식, GET /metrics)
+# - 외부 라이브러리 없이 Counter / Gauge / Histogram만 직접 구현
+# - 값은 이 서버 프로세스 메모리에만 있음 (재시작하면 0부터)
+#   → uvicorn 워커를 여러 개 띄우면 워커마다 따로 수집됨
+# - 단계별 시간은 workspace.stage()가 자동으로 기록
+#   그 밖의 구간은 `with metrics.timed("music21_parse"):` 처럼 감싸면 됨
+# =========================================================
+# 초 단위 버킷 (전처리 수십 ms ~ Audiveris 수 분)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, **values):
+        if set(values) != set(self.label_names):
+            raise ValueError(f"{self.name}: 라벨은 {self.label_names} 이어야 합니다 (받은 값: {sorted(values)})")
+        key = tuple(str(values[name]) for name in self.label_names)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        # 라벨 없는 지표는 labels() 없이 바로 사용
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in self._samples():
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(child.get())}"]
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self._value = float(value)
+
+    def get(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default().dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            if index < len(self.counts):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        counts, total, count = child.snapshot()
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts + [count - sum(counts)]):
+            cumulative += n
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+        labels = _format_labels(self.label_names, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"이미 등록된 지표입니다: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labels))
+
+
+def gauge(name: str, help_text: str, labels: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labels))
+
+
+def histogram(name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# =========================================================
+# 서비스 지표
+# =========================================================
+STAGE_SECONDS = histogram(
+    "easyscore_stage_seconds", "변환 단계별 소요 시간 (초)", ["stage"])
+STAGE_FAILURES = counter(
+    "easyscore_stage_failures_total", "예외로 끝난 변환 단계 수", ["stage"])
+
+# 난이도별 작업 (편곡 모드별 _simplify_vertical + XML 저장, PNG 배경 합성)
+LEVEL_TASK_SECONDS = histogram(
+    "easyscore_level_task_seconds", "난이도별 작업 소요 시간 (초)", ["task", "level"])
+LEVEL_TASK_FAILURES = counter(
+    "easyscore_level_task_failures_total", "실패한 난이도별 작업 수", ["task", "level"])
+
+# 외부 프로그램 (MuseScore 1회/일괄, Audiveris 워커 풀/1회성)
+SUBPROCESS_SECONDS = histogram(
+    "easyscore_subprocess_seconds", "외부 프로그램 실행 시간 (초)", ["tool", "mode"])
+SUBPROCESS_FAILURES = counter(
+    "easyscore_subprocess_failures_total", "외부 프로그램 실패 수 (reason: timeout | exit | crash | error)",
+    ["tool", "mode", "reason"])
+
+JOBS_IN_FLIGHT = gauge(
+    "easyscore_jobs_in_flight", "대기 중이거나 실행 중인 변환 작업 수", ["status"])
+JOBS_FINISHED = counter(
+    "easyscore_jobs_finished_total", "끝난 변환 작업 수", ["status"])
+JOB_SECONDS = histogram(
+    "easyscore_job_seconds", "변환 작업 1건의 실행 시간 (대기 시간 제외, 초)")
+
+
+def observe_stage(stage: str, seconds: float, ok: bool = True) -> None:
+    STAGE_SECONDS.labels(stage=stage).observe(seconds)
+    if not ok:
+        STAGE_FAILURES.labels(stage=stage).inc()
+
+
+@contextmanager
+def timed(stage: str):
+    """workspace 없이 구간 시간만 기록 (예외가 나면 실패 수도 증가)"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        observe_stage(stage, time.perf_counter() - start, ok=False)
+        raise
+    observe_stage(stage, time.perf_counter() - start)
+
+
+def record_subprocess(tool: str, mode: str, seconds: float, reason: Optional[str] = None) -> None:
+    SUBPROCESS_SECONDS.labels(tool=tool, mode=mode).observe(seconds)
+    if reason:
+        SUBPROCESS_FAILURES.labels(tool=tool, mode=mode, reason=reason).inc()
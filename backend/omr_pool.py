@@ -0,0 +1,286 @@
+# backend/omr_pool.py
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from typing import List, Optional
+
+import metrics
+
+# =========================================================
+# ☕ Audiveris 상주 워커 풀
+# - 요청마다 java를 새로 띄우지 않고, 미리 띄워둔 JVM에 이미지를 넘김
+#   (JVM 기동 + 분류기 로딩 비용을 서버 시작 후 1번만 냄)
+# - stdin/stdout 한 줄 프로토콜 (omr_worker/EasyScoreOmrWorker.java 참고)
+# - 주기적인 PING 헬스체크, 응답이 없거나 죽으면 자동 재시작
+# - 워커 수:  export EASYSCORE_OMR_WORKERS=2   (0이면 풀 사용 안 함)
+# =========================================================
+OMR_WORKERS = int(os.getenv("EASYSCORE_OMR_WORKERS", "1"))
+HEALTH_INTERVAL = 30
+STARTUP_TIMEOUT = 180
+PING_TIMEOUT = 10
+
+WORKER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "omr_worker")
+WORKER_CLASS = "EasyScoreOmrWorker"
+MARK = "@@EASYSCORE "
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+class WorkerCrashed(WorkerError):
+    """응답 없음/프로세스 종료 → 워커를 다시 띄워야 하는 경우"""
+
+
+class WorkerTimeout(WorkerCrashed):
+    """정해진 시간 안에 응답이 없는 경우"""
+
+
+class PoolBusy(WorkerError):
+    """wait=False로 요청했는데 놀고 있는 워커가 없는 경우"""
+
+
+def _find_javac(java_cmd: str) -> Optional[str]:
+    # 번들 런타임 옆의 javac 먼저, 없으면 PATH
+    java_dir = os.path.dirname(java_cmd)
+    if java_dir:
+        for name in ("javac", "javac.exe"):
+            candidate = os.path.join(java_dir, name)
+            if os.path.exists(candidate):
+                return candidate
+    return shutil.which("javac")
+
+
+def compile_worker(java_cmd: str) -> str:
+    """워커 클래스를 컴파일하고 클래스 폴더 경로를 반환 (이미 있으면 재사용)"""
+    source = os.path.join(WORKER_DIR, f"{WORKER_CLASS}.java")
+    classes_dir = os.path.join(WORKER_DIR, "classes")
+    class_file = os.path.join(classes_dir, f"{WORKER_CLASS}.class")
+    if os.path.exists(class_file) and os.path.getmtime(class_file) >= os.path.getmtime(source):
+        return classes_dir
+
+    javac = _find_javac(java_cmd)
+    if not javac:
+        raise WorkerError("javac를 찾을 수 없어 Audiveris 워커를 만들 수 없습니다.")
+    os.makedirs(classes_dir, exist_ok=True)
+    subprocess.run(
+        [javac, "-d", classes_dir, source],
+        check=True, timeout=120, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False
+    )
+    return classes_dir
+
+
+class AudiverisWorker:
+    def __init__(self, java_cmd: str, classpath: str, name: str):
+        self.java_cmd = java_cmd
+        self.classpath = classpath
+        self.name = name
+        self.proc: Optional[subprocess.Popen] = None
+        self._replies: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.jobs_done = 0
+
+    # ---------- 프로세스 관리 ----------
+    def start(self) -> None:
+        self.proc = subprocess.Popen(
+            [self.java_cmd, "-cp", self.classpath, WORKER_CLASS],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1, shell=False,
+        )
+        self._replies = queue.Queue()
+        threading.Thread(target=self._read_loop, args=(self.proc, self._replies), daemon=True).start()
+        self._expect("READY", STARTUP_TIMEOUT)
+        print(f"☕ [{self.name}] Audiveris 워커 준비 완료 (pid {self.proc.pid})")
+
+    @staticmethod
+    def _read_loop(proc: subprocess.Popen, replies: "queue.Queue[Optional[str]]") -> None:
+        # 프로토콜 응답만 골라서 큐에 넣고, Audiveris 로그 줄은 버림
+        for line in proc.stdout:
+            if line.startswith(MARK):
+                replies.put(line[len(MARK):].rstrip("\n"))
+        replies.put(None)  # EOF = 프로세스 종료
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def stop(self) -> None:
+        if not self.proc:
+            return
+        try:
+            if self.alive():
+                self.proc.stdin.write("QUIT\n")
+                self.proc.stdin.flush()
+                self.proc.wait(timeout=5)
+        except Exception:
+            pass
+        if self.alive():
+            self.proc.kill()
+        self.proc = None
+
+    def restart(self) -> None:
+        print(f"♻️ [{self.name}] Audiveris 워커 재시작")
+        self.stop()
+        self.start()
+
+    # ---------- 통신 ----------
+    def _send(self, line: str) -> None:
+        if not self.alive():
+            raise WorkerCrashed(f"{self.name}: 워커 프로세스가 종료됨")
+        try:
+            self.proc.stdin.write(line + "\n")
+            self.proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            # alive() 확인 직후에 죽으면 BrokenPipe, stop()과 겹치면 닫힌 파이프(ValueError)
+            raise WorkerCrashed(f"{self.name}: 워커에 쓸 수 없음 ({e})")
+
+    def _expect(self, prefix: str, timeout: float) -> str:
+        try:
+            reply = self._replies.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerTimeout(f"{self.name}: {timeout}초 동안 응답 없음")
+        if reply is None:
+            raise WorkerCrashed(f"{self.name}: 워커 프로세스가 종료됨")
+        if reply.startswith("ERR"):
+            raise WorkerError(reply.partition("\t")[2] or reply)
+        if not reply.startswith(prefix):
+            raise WorkerCrashed(f"{self.name}: 예상치 못한 응답 {reply!r}")
+        return reply.partition("\t")[2]
+
+    def ping(self) -> bool:
+        # 헬스체크용: 어떤 실패든 False (ERR 응답이나 파이프 오류도 재시작 대상)
+        try:
+            self._send("PING")
+            self._expect("PONG", PING_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    def recognize(self, image_path: str, output_dir: str, timeout: float) -> str:
+        self._send(f"RUN\t{os.path.abspath(image_path)}\t{os.path.abspath(output_dir)}")
+        exported = self._expect("OK", timeout)
+        self.jobs_done += 1
+        return exported
+
+
+class AudiverisPool:
+    def __init__(self, size: int, java_cmd: str, classpath: List[str], separator: str):
+        classes_dir = compile_worker(java_cmd)
+        full_cp = separator.join([classes_dir] + classpath)
+        self.size = size
+        self._all = [AudiverisWorker(java_cmd, full_cp, f"omr-{i}") for i in range(size)]
+        self._idle: "queue.Queue[AudiverisWorker]" = queue.Queue()
+        try:
+            for worker in self._all:
+                worker.start()
+                self._idle.put(worker)
+        except Exception:
+            for worker in self._all:
+                worker.stop()
+            raise
+        self._stop = threading.Event()
+        threading.Thread(target=self._health_loop, daemon=True).start()
+
+    def recognize(self, image_path: str, output_dir: str, timeout: float = 180, wait: bool = True) -> str:
+        """wait=False면 바로 쓸 수 있는 워커가 없을 때 기다리지 않고 PoolBusy 발생"""
+        try:
+            worker = self._idle.get(block=wait)
+        except queue.Empty:
+            raise PoolBusy("모든 Audiveris 워커가 사용 중입니다.")
+        start = time.perf_counter()
+        reason = None
+        try:
+            return worker.recognize(image_path, output_dir, timeout)
+        except WorkerCrashed as e:
+            reason = "timeout" if isinstance(e, WorkerTimeout) else "crash"
+            raise
+        except WorkerError:
+            reason = "error"
+            raise
+        finally:
+            metrics.record_subprocess("audiveris", "pool", time.perf_counter() - start, reason)
+            if reason in ("timeout", "crash"):
+                # 타임아웃/크래시 → 프로세스 상태를 알 수 없으니 새로 띄움
+                # JVM 기동(최대 STARTUP_TIMEOUT초)을 요청 스레드에서 기다리지 않도록 백그라운드에서 재시작
+                self._restart_in_background(worker)
+            else:
+                self._idle.put(worker)
+
+    def _safe_restart(self, worker: AudiverisWorker) -> None:
+        try:
+            worker.restart()
+        except Exception as e:
+            print(f"❌ [{worker.name}] 재시작 실패: {e}")
+
+    def _restart_in_background(self, worker: AudiverisWorker) -> None:
+        # 재시작이 끝난 뒤에야 idle 큐로 돌려보냄 (실패해도 돌려보내고 헬스체크가 다시 시도)
+        def run() -> None:
+            try:
+                self._safe_restart(worker)
+            finally:
+                self._idle.put(worker)
+
+        threading.Thread(target=run, name=f"{worker.name}-restart", daemon=True).start()
+
+    def _health_loop(self) -> None:
+        while not self._stop.wait(HEALTH_INTERVAL):
+            try:
+                self._check_idle_workers()
+            except Exception as e:
+                # 점검 중 예외가 나도 헬스체크 스레드는 계속 돌아야 함
+                print(f"⚠️ Audiveris 헬스체크 오류: {e}")
+
+    def _check_idle_workers(self) -> None:
+        # 놀고 있는 워커만 꺼내서 점검 (작업 중인 워커는 건드리지 않음)
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if not worker.alive() or not worker.ping():
+                    self._safe_restart(worker)
+            finally:
+                self._idle.put(worker)
+
+    def status(self) -> list:
+        return [
+            {"name": w.name, "alive": w.alive(), "pid": w.proc.pid if w.proc else None, "jobs_done": w.jobs_done}
+            for w in self._all
+        ]
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        for worker in self._all:
+            worker.stop()
+
+
+# =========================================================
+# 모듈 단위 싱글턴 (첫 사용 시 생성, 실패하면 기존 1회성 실행으로 폴백)
+# =========================================================
+_pool: Optional[AudiverisPool] = None
+_pool_failed = False
+_pool_lock = threading.Lock()
+
+
+def get_pool(java_cmd: str, classpath: List[str], separator: str) -> Optional[AudiverisPool]:
+    global _pool, _pool_failed
+    if OMR_WORKERS <= 0 or _pool_failed:
+        return None
+    with _pool_lock:
+        if _pool is None and not _pool_failed:
+            try:
+                _pool = AudiverisPool(OMR_WORKERS, java_cmd, classpath, separator)
+            except Exception as e:
+                _pool_failed = True
+                print(f"⚠️ Audiveris 워커 풀을 사용할 수 없어 1회성 실행으로 전환합니다: {e}")
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
@@ -0,0 +1,157 @@
+// backend/omr_worker/EasyScoreOmrWorker.java
+//
+// Audiveris를 한 번만 띄워두고 계속 재사용하기 위한 상주 워커.
+// omr_pool.py가 이 클래스를 javac로 컴파일해서 실행하고, stdin/stdout 한 줄 프로토콜로 통신합니다.
+//
+//   요청:  PING
+//          RUN<TAB>입력 이미지 경로<TAB>출력 폴더
+//          QUIT
+//   응답:  @@EASYSCORE READY
+//          @@EASYSCORE PONG
+//          @@EASYSCORE OK<TAB>내보낸 파일 경로
+//          @@EASYSCORE ERR<TAB>메시지
+//
+// Audiveris 자체 로그도 stdout으로 나오기 때문에 응답에는 항상 "@@EASYSCORE " 접두어를 붙입니다.
+// 컴파일할 때 Audiveris jar가 필요 없도록 Audiveris API는 전부 리플렉션으로 호출합니다.
+// (Audiveris 5.x 버전마다 메서드 시그니처가 조금씩 달라서 여러 후보를 순서대로 시도)
+
+import java.io.BufferedReader;
+import java.io.File;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.lang.reflect.Field;
+import java.lang.reflect.Method;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.ArrayList;
+import java.util.Collections;
+
+public final class EasyScoreOmrWorker {
+
+    private static final String MARK = "@@EASYSCORE ";
+    private static PrintStream out;
+
+    public static void main(String[] args) throws Exception {
+        // 프로토콜 응답 전용 스트림 (Audiveris 로그와 섞이지 않도록 System.out은 stderr로 돌림)
+        out = new PrintStream(System.out, true, "UTF-8");
+        System.setOut(System.err);
+
+        Object engine = initAudiveris();
+        reply("READY");
+
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        String line;
+        while ((line = in.readLine()) != null) {
+            if (line.equals("PING")) {
+                reply("PONG");
+            } else if (line.equals("QUIT")) {
+                break;
+            } else if (line.startsWith("RUN\t")) {
+                String[] parts = line.split("\t");
+                if (parts.length != 3) {
+                    reply("ERR\tbad request");
+                    continue;
+                }
+                try {
+                    reply("OK\t" + process(engine, Paths.get(parts[1]), Paths.get(parts[2])));
+                } catch (Throwable t) {
+                    Throwable cause = (t.getCause() != null) ? t.getCause() : t;
+                    reply("ERR\t" + String.valueOf(cause).replace('\n', ' '));
+                }
+            } else {
+                reply("ERR\tunknown command");
+            }
+        }
+        System.exit(0);
+    }
+
+    private static void reply(String msg) {
+        out.println(MARK + msg);
+        out.flush();
+    }
+
+    // =========================================================
+    // Audiveris 초기화 (JVM 당 1회) - 배치 모드와 같은 엔진을 준비
+    // =========================================================
+    private static Object initAudiveris() throws Exception {
+        System.setProperty("java.awt.headless", "true");
+        Class<?> omr = Class.forName("org.audiveris.omr.OMR");
+        Class<?> bookManager = Class.forName("org.audiveris.omr.sheet.BookManager");
+        Object engine = bookManager.getMethod("getInstance").invoke(null);
+        Field engineField = omr.getField("engine");
+        engineField.set(null, engine);
+
+        // 분류기(신경망) 미리 로딩 - 첫 요청에서 수 초씩 걸리던 부분
+        try {
+            Class<?> classifier = Class.forName("org.audiveris.omr.classifier.ShapeClassifier");
+            classifier.getMethod("getInstance").invoke(null);
+        } catch (Throwable ignored) {
+            // 버전에 따라 없을 수 있음 → 첫 요청에서 로딩됨
+        }
+        return engine;
+    }
+
+    // =========================================================
+    // 이미지 1장 인식 + MusicXML 내보내기
+    // =========================================================
+    private static String process(Object engine, Path input, Path outputDir) throws Exception {
+        outputDir.toFile().mkdirs();
+        Class<?> bookManager = Class.forName("org.audiveris.omr.sheet.BookManager");
+        invokeStatic(bookManager, "setBaseFolder", new Class<?>[]{Path.class}, outputDir);
+
+        Object book = engine.getClass().getMethod("loadInput", Path.class).invoke(engine, input);
+        try {
+            invokeFirst(book, "createStubs");
+            if (!invokeFirst(book, "transcribe")) {
+                throw new IllegalStateException("Book.transcribe not found");
+            }
+            if (!invokeFirst(book, "export")) {
+                // 5.3 이후: export(List<SheetStub>, Set<Integer>)
+                Method export = book.getClass().getMethod("export", java.util.List.class, java.util.Set.class);
+                Object stubs = book.getClass().getMethod("getValidStubs").invoke(book);
+                export.invoke(book, stubs, null);
+            }
+        } finally {
+            invokeFirst(book, "close");
+        }
+        return findExport(outputDir.toFile());
+    }
+
+    private static void invokeStatic(Class<?> cls, String name, Class<?>[] types, Object... args) {
+        try {
+            cls.getMethod(name, types).invoke(null, args);
+        } catch (Throwable ignored) {
+            // 없는 버전이면 기본 출력 폴더 사용
+        }
+    }
+
+    private static boolean invokeFirst(Object target, String name) throws Exception {
+        for (Method m : target.getClass().getMethods()) {
+            if (m.getName().equals(name) && m.getParameterCount() == 0) {
+                m.invoke(target);
+                return true;
+            }
+        }
+        return false;
+    }
+
+    private static String findExport(File dir) {
+        ArrayList<File> stack = new ArrayList<>(Collections.singletonList(dir));
+        while (!stack.isEmpty()) {
+            File current = stack.remove(stack.size() - 1);
+            File[] children = current.listFiles();
+            if (children == null) {
+                continue;
+            }
+            for (File f : children) {
+                if (f.isDirectory()) {
+                    stack.add(f);
+                } else if (f.getName().endsWith(".mxl") || f.getName().endsWith(".musicxml")) {
+                    return f.getAbsolutePath();
+                }
+            }
+        }
+        return "";
+    }
+}
@@ -0,0 +1,46 @@
+# backend/pdf_pages.py
+import io
+import os
+from typing import List
+
+import pypdfium2 as pdfium
+
+# =========================================================
+# 📄 여러 페이지 악보 입력
+# - PDF 업로드 → 페이지마다 흑백 PNG로 렌더링 (Audiveris에는 페이지 단위로 전달)
+# - 해상도/최대 페이지 수는 환경변수로 조절
+#   export EASYSCORE_PDF_DPI=300
+#   export EASYSCORE_MAX_PAGES=30
+# =========================================================
+PDF_DPI = int(os.getenv("EASYSCORE_PDF_DPI", "300"))
+MAX_PAGES = int(os.getenv("EASYSCORE_MAX_PAGES", "30"))
+
+PDF_CONTENT_TYPES = ("application/pdf", "application/x-pdf")
+
+
+def is_pdf(content_type: str, data: bytes) -> bool:
+    return content_type in PDF_CONTENT_TYPES or data[:5] == b"%PDF-"
+
+
+def render_pdf(data: bytes, dpi: int = PDF_DPI, max_pages: int = MAX_PAGES) -> List[bytes]:
+    """PDF 바이트 → 페이지 순서대로 PNG 바이트 목록"""
+    try:
+        pdf = pdfium.PdfDocument(data)
+    except pdfium.PdfiumError as e:
+        raise ValueError(f"PDF를 열 수 없습니다: {e}")
+    try:
+        if len(pdf) == 0:
+            raise ValueError("PDF에 페이지가 없습니다.")
+        if len(pdf) > max_pages:
+            raise ValueError(f"PDF는 최대 {max_pages}페이지까지 변환할 수 있습니다. (현재 {len(pdf)}페이지)")
+        pages = []
+        for page in pdf:
+            # PDF 기본 단위는 72dpi
+            bitmap = page.render(scale=dpi / 72, grayscale=True)
+            buf = io.BytesIO()
+            bitmap.to_pil().save(buf, format="PNG")
+            pages.append(buf.getvalue())
+            page.close()
+        return pages
+    finally:
+        pdf.close()
@@ -0,0 +1,151 @@
+# backend/preprocess.py
+import io
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+# =========================================================
+# 🖼️ OMR 전처리 엔진 (NumPy 벡터 연산)
+# 1. 흑백 변환 + 가로 2500px 업스케일
+# 2. 적응형 이진화 (Sauvola): 주변 밝기 기준으로 잘라서 조명이 고르지 않은 사진도 처리
+# 3. 기울기 보정: 오선이 가장 뚜렷해지는 각도를 찾아 회전
+# 4. 잡티 제거: 주변에 검은 점이 거의 없는 고립된 픽셀 삭제
+# 단계별 소요 시간(ms)을 timings dict에 기록
+# =========================================================
+DEFAULT_PARAMS = {
+    "target_width": 2500,
+    "window_ratio": 60,       # 이진화 창 크기 = 이미지 폭 / window_ratio
+    "sauvola_k": 0.2,
+    "max_skew_deg": 5.0,
+    "skew_step_deg": 0.25,
+    "min_neighbors": 2,       # 이보다 이웃 검은 점이 적으면 잡티로 판단
+}
+
+
+class _Timer:
+    def __init__(self, timings: Dict[str, float]):
+        self.timings = timings
+
+    def step(self, name: str, start: float) -> float:
+        now = time.perf_counter()
+        self.timings[name] = round((now - start) * 1000, 2)
+        return now
+
+
+def _box_mean(a: np.ndarray, r: int) -> np.ndarray:
+    """적분 영상으로 (2r+1)x(2r+1) 창의 평균을 한 번에 계산 (가장자리는 반사 패딩)"""
+    n = 2 * r + 1
+    padded = np.pad(a, ((r + 1, r), (r + 1, r)), mode="reflect")
+    padded[0, :] = 0
+    padded[:, 0] = 0
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    total = integral[n:, n:] - integral[:-n, n:] - integral[n:, :-n] + integral[:-n, :-n]
+    return total / (n * n)
+
+
+def adaptive_threshold(gray: np.ndarray, window: int, k: float, stats_scale: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sauvola 이진화 → (원래 크기, 1/stats_scale 크기) 흑백 배열, True = 검은색(음표/오선)
+    - 주변 평균/표준편차는 천천히 변하므로 1/stats_scale 크기에서 한 번만 계산
+    - 임계값 지도는 uint8로 바꿔서 PIL NEAREST로 확대 (창 크기가 stats_scale보다 훨씬 커서
+      인접 칸 값 차이가 작으므로 보간 없이도 결과가 거의 같고, float/BILINEAR 확대보다 훨씬 빠름)
+      정수 밝기에서는 gray < t 와 gray < ceil(t) 가 같으므로 올림해서 저장
+    - 작은 크기의 결과는 기울기 추정에 그대로 사용 (원래 크기에서 다시 줄이지 않음)
+    """
+    h, w = gray.shape
+    small = Image.fromarray(gray).reduce(stats_scale) if stats_scale > 1 else Image.fromarray(gray)
+    # 적분 영상은 값이 커서 float32로는 분산이 틀어짐 → 작은 배열이므로 float64 유지
+    g = np.asarray(small, dtype=np.float64)
+    r = max(1, window // (2 * stats_scale))
+    mean = _box_mean(g, r)
+    std = np.sqrt(np.maximum(_box_mean(g * g, r) - mean * mean, 0))
+    threshold = np.clip(np.ceil(mean * (1 + k * (std / 128.0 - 1))), 0, 255).astype(np.uint8)
+    small_ink = g < threshold
+    if stats_scale > 1:
+        threshold = np.asarray(Image.fromarray(threshold).resize((w, h), Image.Resampling.NEAREST))
+    return gray < threshold, small_ink
+
+
+def estimate_skew(ink: np.ndarray, max_deg: float, step_deg: float) -> float:
+    """
+    수평 투영 프로파일이 가장 뾰족해지는 각도(도) 추정
+    - 검은 점 좌표를 각도별로 기울여서 행별 개수(bincount)만 세면 되므로 회전이 필요 없음
+    """
+    # 속도를 위해 가로 800px 정도로 줄여서 계산 (이미 작은 배열이면 그대로)
+    factor = max(1, ink.shape[1] // 800)
+    small = ink[::factor, ::factor]
+    ys, xs = np.nonzero(small)
+    if ys.size < 100:
+        return 0.0
+    h = small.shape[0]
+
+    def score(angle: float) -> float:
+        rows = np.round(ys - xs * np.tan(np.radians(angle))).astype(np.int64)
+        rows -= rows.min()
+        hist = np.bincount(rows, minlength=h)
+        return float(np.dot(hist, hist))
+
+    # 1도 간격으로 대략 찾고, 그 주변만 step_deg 간격으로 다시 탐색
+    coarse = np.arange(-max_deg, max_deg + 1e-9, 1.0)
+    best = max(coarse, key=score)
+    fine = np.arange(best - 1.0 + step_deg, best + 1.0, step_deg)
+    return float(max(fine, key=score))
+
+
+def remove_specks(ink: np.ndarray, min_neighbors: int) -> np.ndarray:
+    """8방향 이웃 중 검은 점이 min_neighbors 미만인 검은 점 제거"""
+    padded = np.pad(ink, 1).astype(np.uint8)
+    h, w = ink.shape
+    neighbors = np.zeros((h, w), dtype=np.uint8)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            neighbors += padded[dy:dy + h, dx:dx + w]
+    return ink & (neighbors >= min_neighbors)
+
+
+def preprocess(image_bytes: bytes, params: Optional[dict] = None) -> Tuple[bytes, Dict[str, float]]:
+    """이미지 바이트 → (Audiveris용 흑백 PNG 바이트, 단계별 소요 시간 ms)"""
+    p = dict(DEFAULT_PARAMS, **(params or {}))
+    timings: Dict[str, float] = {}
+    timer = _Timer(timings)
+    t = time.perf_counter()
+
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft("L", img.size)  # JPEG는 디코딩 단계에서 바로 흑백으로 (PNG 등은 무시됨)
+    img = img.convert("L")
+    if img.width < p["target_width"]:
+        ratio = p["target_width"] / img.width
+        # 곧바로 이진화하므로 LANCZOS 대신 BICUBIC으로 충분 (결과 차이 거의 없음, 더 빠름)
+        img = img.resize((p["target_width"], int(img.height * ratio)), Image.Resampling.BICUBIC)
+    gray = np.asarray(img)
+    t = timer.step("load_resize", t)
+
+    window = max(15, (gray.shape[1] // p["window_ratio"]) | 1)
+    ink, small_ink = adaptive_threshold(gray, window, p["sauvola_k"])
+    t = timer.step("threshold", t)
+
+    angle = estimate_skew(small_ink, p["max_skew_deg"], p["skew_step_deg"])
+    if abs(angle) >= p["skew_step_deg"]:
+        rotated = Image.fromarray(ink.astype(np.uint8) * 255).rotate(
+            angle, resample=Image.Resampling.NEAREST, fillcolor=0
+        )
+        ink = np.asarray(rotated) > 127
+    timings["skew_deg"] = angle
+    t = timer.step("deskew", t)
+
+    ink = remove_specks(ink, p["min_neighbors"])
+    t = timer.step("denoise", t)
+
+    out = Image.fromarray(~ink)
+    if out.mode != "1":
+        out = out.convert("1")
+    buf = io.BytesIO()
+    # Audiveris가 바로 읽는 중간 파일이므로 압축보다 속도 우선
+    out.save(buf, format="PNG", compress_level=1)
+    timer.step("encode", t)
+    timings["total"] = round(sum(v for k, v in timings.items() if k != "skew_deg"), 2)
+    return buf.getvalue(), timings
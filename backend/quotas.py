@@ -0,0 +1,170 @@
+# backend/quotas.py
+import os
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import db
+
+# =========================================================
+# 🎫 사용자별 하루 변환 한도 / 동시 실행 한도 / 가중치 (users.db)
+# - user_limits: 사용자별로 기본값을 바꾸고 싶을 때만 한 줄 (NULL이면 기본값)
+# - quota_usage: (사용자, 날짜)별 변환 요청 수 → 날짜가 바뀌면 자동으로 0부터
+#   날짜는 서버 시간 기준, 변환 요청을 접수할 때 1 증가 (캐시 적중도 포함)
+#   변환이 실패하거나 취소되면 접수한 날짜의 사용량에서 되돌림 (refund)
+# - 기본값 (0이면 제한 없음):
+#   export EASYSCORE_DAILY_QUOTA=100
+#   export EASYSCORE_USER_CONCURRENCY=2
+# =========================================================
+DAILY_QUOTA = int(os.getenv("EASYSCORE_DAILY_QUOTA", "100"))
+USER_CONCURRENCY = int(os.getenv("EASYSCORE_USER_CONCURRENCY", "2"))
+DEFAULT_WEIGHT = 1
+# 동시 실행 한도를 0(제한 없음)으로 두었을 때 스케줄러에 넘기는 값
+UNLIMITED = 1 << 30
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, used: int, limit: int):
+        super().__init__(f"오늘 변환 가능 횟수({limit}회)를 모두 사용했습니다.")
+        self.used = used
+        self.limit = limit
+
+
+def create_tables() -> None:
+    with db.get_pool().connection() as conn:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_limits (
+                user_id INTEGER PRIMARY KEY REFERENCES users(id),
+                daily_quota INTEGER,
+                max_concurrent INTEGER,
+                weight INTEGER
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS quota_usage (
+                user_id INTEGER NOT NULL REFERENCES users(id),
+                day TEXT NOT NULL,
+                conversions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day)
+            )
+            """
+        )
+
+
+create_tables()
+
+_SELECT_LIMITS = "SELECT daily_quota, max_concurrent, weight FROM user_limits WHERE user_id = ?"
+_SELECT_USAGE = "SELECT conversions FROM quota_usage WHERE user_id = ? AND day = ?"
+# 한도 안일 때만 1 증가 (바뀐 행이 없으면 한도 초과) → 동시에 요청해도 한도를 넘지 않음
+_CONSUME = """
+    INSERT INTO quota_usage (user_id, day, conversions) VALUES (?, ?, 1)
+    ON CONFLICT (user_id, day) DO UPDATE SET conversions = conversions + 1 WHERE conversions < ?
+"""
+_REFUND = "UPDATE quota_usage SET conversions = MAX(conversions - ?, 0) WHERE user_id = ? AND day = ?"
+_UPSERT_LIMITS = """
+    INSERT INTO user_limits (user_id, daily_quota, max_concurrent, weight) VALUES (?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        daily_quota = excluded.daily_quota, max_concurrent = excluded.max_concurrent, weight = excluded.weight
+"""
+
+
+def today() -> str:
+    return date.today().isoformat()
+
+
+def seconds_until_reset() -> int:
+    tomorrow = datetime.combine(date.today() + timedelta(days=1), dtime.min)
+    return max(1, int((tomorrow - datetime.now()).total_seconds()))
+
+
+def _limits_row(conn, user_id: Any) -> Dict[str, Optional[int]]:
+    row = conn.execute(_SELECT_LIMITS, (user_id,)).fetchone()
+    if row is None:
+        return {"daily_quota": None, "max_concurrent": None, "weight": None}
+    return dict(row)
+
+
+def limits(user_id: Any) -> Dict[str, int]:
+    """사용자 한도 (user_limits에 없거나 NULL이면 기본값)"""
+    with db.get_pool().connection() as conn:
+        row = _limits_row(conn, user_id)
+    return {
+        "daily_quota": DAILY_QUOTA if row["daily_quota"] is None else row["daily_quota"],
+        "max_concurrent": USER_CONCURRENCY if row["max_concurrent"] is None else row["max_concurrent"],
+        "weight": DEFAULT_WEIGHT if row["weight"] is None else row["weight"],
+    }
+
+
+def scheduling_limits(user_id: Any) -> Tuple[int, int]:
+    """스케줄러용 (동시 실행 한도, 가중치)"""
+    if user_id is None:
+        return UNLIMITED, DEFAULT_WEIGHT
+    try:
+        user = limits(user_id)
+    except db.PoolTimeout:
+        # 한도를 못 읽어도 작업은 기본값으로 실행
+        user = {"max_concurrent": USER_CONCURRENCY, "weight": DEFAULT_WEIGHT}
+    return user["max_concurrent"] or UNLIMITED, max(1, user["weight"])
+
+
+def consume(user_id: Any, count: int = 1, day: Optional[str] = None) -> int:
+    """오늘(day) 사용량을 count만큼 늘리고 새 사용량 반환 (한도를 넘으면 QuotaExceeded, 사용량은 그대로)"""
+    quota = limits(user_id)["daily_quota"]
+    day = day or today()
+    with db.get_pool().connection() as conn:
+        if quota <= 0:
+            for _ in range(count):
+                conn.execute(_CONSUME, (user_id, day, UNLIMITED))
+        else:
+            for _ in range(count):
+                if conn.execute(_CONSUME, (user_id, day, quota)).rowcount == 0:
+                    used = conn.execute(_SELECT_USAGE, (user_id, day)).fetchone()["conversions"]
+                    # 같은 연결에서 앞서 늘린 것도 되돌림 (블록을 빠져나가면서 rollback)
+                    raise QuotaExceeded(used, quota)
+        return conn.execute(_SELECT_USAGE, (user_id, day)).fetchone()["conversions"]
+
+
+def refund(user_id: Any, day: str, count: int = 1) -> None:
+    """consume으로 늘린 사용량을 되돌림 (day: 차감했던 날짜, 자정을 넘겨 실패해도 그날 사용량에서)"""
+    with db.get_pool().connection() as conn:
+        conn.execute(_REFUND, (count, user_id, day))
+
+
+def usage(user_id: Any) -> dict:
+    user = limits(user_id)
+    with db.get_pool().connection() as conn:
+        row = conn.execute(_SELECT_USAGE, (user_id, today())).fetchone()
+    used = row["conversions"] if row else 0
+    quota = user["daily_quota"]
+    return {
+        "day": today(),
+        "used": used,
+        "daily_quota": quota or None,
+        "remaining": max(0, quota - used) if quota > 0 else None,
+        "max_concurrent": user["max_concurrent"] or None,
+        "weight": user["weight"],
+        "resets_in": seconds_until_reset(),
+    }
+
+
+def set_limits(user_id: Any, daily_quota: Optional[int], max_concurrent: Optional[int], weight: Optional[int]) -> dict:
+    """사용자별 한도 변경 (None이면 기본값 사용)"""
+    with db.get_pool().connection() as conn:
+        conn.execute(_UPSERT_LIMITS, (user_id, daily_quota, max_concurrent, weight))
+    return usage(user_id)
+
+
+def usage_today() -> list:
+    """오늘 사용 기록이 있는 사용자 목록 (관리자용)"""
+    with db.get_pool().connection() as conn:
+        rows = conn.execute(
+            """
+            SELECT u.id, u.username, q.conversions
+            FROM quota_usage q JOIN users u ON u.id = q.user_id
+            WHERE q.day = ? ORDER BY q.conversions DESC
+            """,
+            (today(),),
+        ).fetchall()
+    return [{"user_id": r["id"], "username": r["username"], "used": r["conversions"]} for r in rows]
@@ -0,0 +1,215 @@
+# backend/result_cache.py
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+# =========================================================
+# 🗃️ 결과 캐시 (이미지 해시 기반, 영구 저장)
+# - 같은 악보 이미지가 다시 올라오면 Audiveris/MuseScore를 건너뜀
+# - 키 = sha256(원본 이미지 바이트 + 파이프라인 버전/파라미터)
+# - 실제 파일은 run 폴더에 그대로 두고, 캐시는 그 위치만 기록
+# - 같은 키의 변환은 key_lock으로 한 번에 하나만 (같은 run 폴더에 동시에 쓰지 않도록)
+#   → 나중에 온 요청은 앞 요청이 끝난 뒤 캐시 적중으로 처리됨
+# =========================================================
+LEVELS = ("HARD", "EASY", "SUPER_EASY")
+
+_lock = threading.Lock()
+# 키 → [Lock, 기다리는/사용 중인 요청 수] (아무도 안 쓰면 제거)
+_key_locks: Dict[str, list] = {}
+_key_locks_guard = threading.Lock()
+
+
+@contextmanager
+def key_lock(key: str):
+    """with key_lock(key): 조회 → 변환 → 저장을 같은 키끼리 순서대로 실행"""
+    with _key_locks_guard:
+        holder = _key_locks.setdefault(key, [threading.Lock(), 0])
+        holder[1] += 1
+    try:
+        with holder[0]:
+            yield
+    finally:
+        with _key_locks_guard:
+            holder[1] -= 1
+            if holder[1] == 0:
+                del _key_locks[key]
+
+
+def _cache_dir(base_dir: str) -> str:
+    path = os.path.join(base_dir, "cache")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def make_key(image_bytes: Union[bytes, List[bytes]], params: dict) -> str:
+    """이미지 1장 또는 페이지 목록(순서 포함) + 파라미터 → 캐시 키"""
+    h = hashlib.sha256()
+    if not isinstance(image_bytes, bytes) and len(image_bytes) == 1:
+        image_bytes = image_bytes[0]  # 1장짜리는 예전 키와 같게
+    if isinstance(image_bytes, bytes):
+        h.update(image_bytes)
+    else:
+        for page in image_bytes:
+            h.update(len(page).to_bytes(8, "big"))
+            h.update(page)
+    # 파라미터가 바뀌면(버전 업 등) 자동으로 다른 키가 됨
+    h.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _index_path(base_dir: str, key: str) -> str:
+    return os.path.join(_cache_dir(base_dir), f"{key}.json")
+
+
+def _existing(path: str) -> Optional[str]:
+    return path if os.path.exists(path) else None
+
+
+def _read_entry(index_path: str) -> Optional[dict]:
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def lookup(base_dir: str, key: str) -> Optional[dict]:
+    """
+    캐시 적중 시 simplify_and_generate와 같은 형태의 dict 반환, 없으면 None
+    (저장된 모든 난이도/형식이 들어있음 → missing()/select()로 요청한 것과 비교)
+    """
+    index_path = _index_path(base_dir, key)
+    entry = _read_entry(index_path)
+    if entry is None:
+        return None
+
+    run_dir = os.path.join(base_dir, entry["run_dir"])
+    if not os.path.isdir(run_dir):
+        # run 폴더가 지워졌으면 캐시도 무효
+        invalidate(base_dir, key)
+        return None
+
+    levels = {}
+    for level in LEVELS:
+        files = entry["files"].get(level, {})
+        levels[level] = {
+            kind: _existing(os.path.join(run_dir, files[kind])) if files.get(kind) else None
+            for kind in ("midi", "png")
+        }
+    omr = entry["files"].get("omr")
+    result = {
+        "run_dir": run_dir,
+        "run_id": os.path.basename(run_dir),
+        "levels": levels,
+        # 일부 결과물만 없을 때 Audiveris를 다시 돌리지 않고 이 파일로 이어서 만듦
+        "omr": _existing(os.path.join(run_dir, omr)) if omr else None,
+    }
+
+    # 마지막 사용 시각 갱신 (retention.py가 오래 안 쓴 것부터 정리할 때 사용)
+    try:
+        os.utime(index_path, None)
+        os.utime(run_dir, None)
+    except OSError: pass
+    return result
+
+
+def missing(result: dict, levels, formats) -> List[Tuple[str, str]]:
+    """요청한 (난이도, 형식) 중 캐시에 없는 것"""
+    return [
+        (level, kind) for level in levels for kind in formats
+        if not result["levels"].get(level, {}).get(kind)
+    ]
+
+
+def select(result: dict, levels, formats) -> dict:
+    """요청한 난이도/형식만 남긴 결과"""
+    selected = dict(result)
+    selected["levels"] = {
+        level: {kind: (path if kind in formats else None) for kind, path in files.items()}
+        for level, files in result["levels"].items() if level in levels
+    }
+    return selected
+
+
+def _find_omr_file(run_dir: str) -> Optional[str]:
+    # XML로 받은 경우 source_input.musicxml, 여러 페이지는 합친 omr_merged.musicxml,
+    # 이미지 1장은 Audiveris가 내보낸 .mxl
+    for name in ("source_input.musicxml", "omr_merged.musicxml"):
+        if os.path.exists(os.path.join(run_dir, name)):
+            return name
+    for root, _, names in os.walk(run_dir):
+        for name in names:
+            if name.endswith(".mxl") or (name.endswith(".musicxml") and not name.startswith("result_")):
+                return os.path.relpath(os.path.join(root, name), run_dir)
+    return None
+
+
+def store(base_dir: str, key: str, run_dir: str, params: dict) -> None:
+    """
+    run 폴더에 생성된 결과물을 캐시에 등록
+    - 같은 run 폴더의 기존 항목이 있으면 난이도/형식별로 합침 (이번에 만들지 않은 결과도 유지)
+    - 다른 run 폴더를 가리키던 항목은 새 항목으로 교체
+    """
+    files = {"omr": _find_omr_file(run_dir)}
+    for level in LEVELS:
+        midi_name = f"result_{level}.mid"
+        png_name = f"result_{level}_final.png"
+        files[level] = {
+            "midi": midi_name if os.path.exists(os.path.join(run_dir, midi_name)) else None,
+            "png": png_name if os.path.exists(os.path.join(run_dir, png_name)) else None,
+        }
+    entry = {
+        "key": key,
+        "run_dir": os.path.relpath(run_dir, base_dir),
+        "params": params,
+        "created_at": datetime.now().isoformat(),
+        "files": files,
+    }
+    index_path = _index_path(base_dir, key)
+    tmp_path = f"{index_path}.tmp"
+    with _lock:
+        previous = _read_entry(index_path)
+        if previous and previous.get("run_dir") == entry["run_dir"]:
+            entry["created_at"] = previous.get("created_at", entry["created_at"])
+            old_files = previous.get("files", {})
+            files["omr"] = files["omr"] or old_files.get("omr")
+            for level in LEVELS:
+                for kind, name in old_files.get(level, {}).items():
+                    if not files[level].get(kind) and name and os.path.exists(os.path.join(run_dir, name)):
+                        files[level][kind] = name
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, index_path)
+
+
+def invalidate(base_dir: str, key: str) -> None:
+    try: os.remove(_index_path(base_dir, key))
+    except OSError: pass
+
+
+def _entries(base_dir: str):
+    cache_dir = _cache_dir(base_dir)
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(cache_dir, name), "r", encoding="utf-8") as f:
+                yield name[:-5], json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def referenced_runs(base_dir: str) -> set:
+    """캐시 항목이 가리키고 있는 run 폴더 이름들"""
+    return {entry.get("run_dir") for _, entry in _entries(base_dir)}
+
+
+def invalidate_run(base_dir: str, run_name: str) -> None:
+    """run 폴더가 삭제될 때 그 폴더를 가리키는 캐시 항목 제거"""
+    for key, entry in list(_entries(base_dir)):
+        if entry.get("run_dir") == run_name:
+            invalidate(base_dir, key)
@@ -0,0 +1,208 @@
+# backend/results.py
+import json
+import os
+import re
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from PIL import Image
+
+import ai_engine
+from auth import get_current_user
+
+# =========================================================
+# 📦 결과 파일 다운로드
+# - GET /results/{run_id}/{level}.png | .mid | .thumb.png
+#   run 폴더의 파일을 그대로 스트리밍 (JSON에 base64로 넣지 않음)
+#   썸네일은 처음 요청할 때 만들어서 run 폴더에 저장
+# - ETag / Last-Modified → 브라우저·프론트 캐시 재검증 시 304
+# - Range 헤더 → 206 부분 응답 (큰 PNG 이어받기, MIDI 플레이어 탐색)
+# - 접근 권한: run 폴더의 access.json에 기록된 사용자만 받을 수 있음
+#   (변환을 요청한 사용자 + 캐시 적중으로 같은 run을 받은 사용자, 그 외에는 404)
+# =========================================================
+router = APIRouter(prefix="/results", tags=["results"])
+
+CHUNK_SIZE = 64 * 1024
+MEDIA_TYPES = {"png": "image/png", "mid": "audio/midi", "thumb.png": "image/png"}
+# run 폴더 안의 실제 파일 이름 (ai_engine._level_paths와 동일)
+FILE_NAMES = {
+    "png": "result_{level}_final.png",
+    "mid": "result_{level}.mid",
+    "thumb.png": "result_{level}_thumb.png",
+}
+THUMB_WIDTH = 360
+LEVEL_NAMES = {"hard": "HARD", "easy": "EASY", "super_easy": "SUPER_EASY"}
+ACCESS_FILE = "access.json"
+
+_RUN_ID_RE = re.compile(r"^run_[0-9A-Za-z_]+$")
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def artifact_url(run_id: str, level: str, ext: str) -> str:
+    return f"/results/{run_id}/{level.lower()}.{ext}"
+
+
+def artifact_path(run_id: str, level: str, ext: str) -> Optional[str]:
+    """URL 조각 → run 폴더 안의 파일 경로 (없거나 잘못된 이름이면 None)"""
+    level_name = LEVEL_NAMES.get(level)
+    if not _RUN_ID_RE.match(run_id) or not level_name or ext not in FILE_NAMES:
+        return None
+    run_dir = os.path.join(ai_engine.BASE_OUTPUT_DIR, run_id)
+    path = os.path.join(run_dir, FILE_NAMES[ext].format(level=level_name))
+    if ext == "thumb.png" and not os.path.isfile(path):
+        source = os.path.join(run_dir, FILE_NAMES["png"].format(level=level_name))
+        return _make_thumbnail(source, path) if os.path.isfile(source) else None
+    return path if os.path.isfile(path) else None
+
+
+# ---------- 접근 권한 ----------
+_access_lock = threading.Lock()
+
+
+def _read_access(run_dir: str) -> set:
+    try:
+        with open(os.path.join(run_dir, ACCESS_FILE), "r", encoding="utf-8") as f:
+            return set(json.load(f).get("users", []))
+    except (OSError, ValueError):
+        return set()
+
+
+def grant_access(run_dir: str, user_id) -> None:
+    """run 폴더의 결과 파일을 user_id가 받을 수 있게 기록 (이미 있으면 그대로)"""
+    if user_id is None:
+        return
+    with _access_lock:
+        users = _read_access(run_dir)
+        if user_id in users:
+            return
+        users.add(user_id)
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, ACCESS_FILE)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"users": sorted(users)}, f)
+        os.replace(tmp, path)
+
+
+def has_access(run_id: str, user_id) -> bool:
+    if not _RUN_ID_RE.match(run_id):
+        return False
+    return user_id in _read_access(os.path.join(ai_engine.BASE_OUTPUT_DIR, run_id))
+
+
+def _make_thumbnail(source: str, target: str) -> Optional[str]:
+    try:
+        with Image.open(source) as img:
+            img.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 4))
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp, "PNG", optimize=True)
+        # 동시에 두 요청이 만들어도 완성된 파일만 보이도록 교체
+        os.replace(tmp, target)
+        return target
+    except OSError as e:
+        print(f"⚠️ 썸네일 생성 실패: {e}")
+        return None
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _not_modified(etag: str, mtime: float, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    if if_none_match is not None:
+        return etag in [t.strip() for t in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    'bytes=start-end' → (start, end) 포함 구간
+    - 헤더가 없거나 여러 구간을 요청하면 None (전체 파일로 응답)
+    - 만족할 수 없는 구간이면 ValueError
+    """
+    if not header:
+        return None
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        raise ValueError(header)
+    if not start:
+        # bytes=-500 → 마지막 500바이트
+        length = int(end)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    first = int(start)
+    last = min(int(end), size - 1) if end else size - 1
+    if first >= size or first > last:
+        raise ValueError(header)
+    return first, last
+
+
+def _iter_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.get("/{run_id}/{artifact}")
+def get_artifact(
+    run_id: str,
+    artifact: str,
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    if_none_match: Optional[str] = Header(default=None),
+    if_modified_since: Optional[str] = Header(default=None),
+    user=Depends(get_current_user),
+):
+    level, _, ext = artifact.partition(".")
+    # 권한이 없는 run은 존재 여부도 알려주지 않음
+    path = artifact_path(run_id, level, ext) if has_access(run_id, user["id"]) else None
+    if not path:
+        raise HTTPException(status_code=404, detail="결과 파일을 찾을 수 없습니다.")
+
+    stat = os.stat(path)
+    etag = _etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        # 같은 run의 결과 파일은 바뀌지 않음
+        "Cache-Control": "private, max-age=86400",
+    }
+    if _not_modified(etag, stat.st_mtime, if_none_match, if_modified_since):
+        return Response(status_code=304, headers=headers)
+
+    # 결과를 조회하면 run 폴더의 마지막 사용 시각 갱신 (retention.py의 LRU 기준)
+    try: os.utime(os.path.dirname(path), None)
+    except OSError: pass
+
+    try:
+        byte_range = parse_range(range_header, stat.st_size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{stat.st_size}"})
+
+    media_type = MEDIA_TYPES[ext]
+    if byte_range is None:
+        headers["Content-Length"] = str(stat.st_size)
+        return StreamingResponse(_iter_file(path, 0, stat.st_size), media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(_iter_file(path, start, length), status_code=206, media_type=media_type, headers=headers)
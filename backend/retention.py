@@ -0,0 +1,177 @@
+# backend/retention.py
+import os
+import shutil
+import threading
+import time
+import zipfile
+from typing import List, Optional
+
+import result_cache
+
+# =========================================================
+# 🧹 saved_results 용량 관리
+# - 전체 용량 한도(바이트)와 최대 보관 기간을 넘으면 오래 안 쓴 run 폴더부터 삭제 (LRU)
+# - 결과 캐시가 가리키는 run 폴더는 마지막까지 남김
+#   (그래도 한도를 넘으면 지우고 해당 캐시 항목도 같이 무효화)
+# - 오래된 run 폴더는 zip으로 압축 가능 (캐시가 가리키는 폴더는 압축 안 함)
+# - 백그라운드 스레드가 주기적으로 정리
+#
+#   export EASYSCORE_STORAGE_BUDGET_MB=2048
+#   export EASYSCORE_RETENTION_DAYS=7
+#   export EASYSCORE_COMPRESS_AFTER_HOURS=24    (0이면 압축 안 함)
+#   export EASYSCORE_SWEEP_INTERVAL=600         (초)
+# =========================================================
+STORAGE_BUDGET_BYTES = int(float(os.getenv("EASYSCORE_STORAGE_BUDGET_MB", "2048")) * 1024 * 1024)
+RETENTION_SECONDS = int(float(os.getenv("EASYSCORE_RETENTION_DAYS", "7")) * 86400)
+COMPRESS_AFTER_SECONDS = int(float(os.getenv("EASYSCORE_COMPRESS_AFTER_HOURS", "0")) * 3600)
+SWEEP_INTERVAL = int(os.getenv("EASYSCORE_SWEEP_INTERVAL", "600"))
+# 방금 만들어진 폴더는 변환이 진행 중일 수 있으므로 건드리지 않음
+IN_FLIGHT_GRACE_SECONDS = 30 * 60
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try: total += os.path.getsize(os.path.join(root, name))
+            except OSError: pass
+    return total
+
+
+class RunEntry:
+    def __init__(self, base_dir: str, name: str, referenced: bool):
+        self.name = name
+        self.path = os.path.join(base_dir, name)
+        self.is_archive = name.endswith(".zip")
+        self.size = os.path.getsize(self.path) if self.is_archive else _dir_size(self.path)
+        # 캐시 적중/결과 조회 시 폴더 mtime이 갱신됨 → 마지막 사용 시각으로 사용
+        self.last_used = os.path.getmtime(self.path)
+        self.referenced = referenced
+
+    @property
+    def run_id(self) -> str:
+        return self.name[:-4] if self.is_archive else self.name
+
+
+class RetentionManager:
+    def __init__(
+        self,
+        base_dir: str,
+        budget_bytes: int = STORAGE_BUDGET_BYTES,
+        max_age_seconds: int = RETENTION_SECONDS,
+        compress_after_seconds: int = COMPRESS_AFTER_SECONDS,
+    ):
+        self.base_dir = base_dir
+        self.budget_bytes = budget_bytes
+        self.max_age_seconds = max_age_seconds
+        self.compress_after_seconds = compress_after_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_sweep: Optional[dict] = None
+
+    # ---------- 조회 ----------
+    def scan(self) -> List[RunEntry]:
+        referenced = result_cache.referenced_runs(self.base_dir)
+        entries = []
+        for name in os.listdir(self.base_dir):
+            if not name.startswith("run_"):
+                continue
+            try:
+                entries.append(RunEntry(self.base_dir, name, name in referenced))
+            except OSError:
+                continue  # 스캔 중에 지워진 경우
+        return entries
+
+    def usage(self) -> dict:
+        entries = self.scan()
+        cache_dir = os.path.join(self.base_dir, "cache")
+        disk = shutil.disk_usage(self.base_dir)
+        return {
+            "total_bytes": sum(e.size for e in entries),
+            "budget_bytes": self.budget_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "compress_after_seconds": self.compress_after_seconds,
+            "runs": sum(1 for e in entries if not e.is_archive),
+            "archives": sum(1 for e in entries if e.is_archive),
+            "referenced_by_cache": sum(1 for e in entries if e.referenced),
+            "cache_entries": len(os.listdir(cache_dir)) if os.path.isdir(cache_dir) else 0,
+            "oldest_last_used": min((e.last_used for e in entries), default=None),
+            "disk_free_bytes": disk.free,
+            "last_sweep": self.last_sweep,
+        }
+
+    # ---------- 정리 ----------
+    def _remove(self, entry: RunEntry) -> None:
+        if entry.is_archive:
+            os.remove(entry.path)
+        else:
+            shutil.rmtree(entry.path, ignore_errors=True)
+        if entry.referenced:
+            result_cache.invalidate_run(self.base_dir, entry.run_id)
+
+    def _compress(self, entry: RunEntry) -> int:
+        archive_path = f"{entry.path}.zip"
+        with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for root, _, files in os.walk(entry.path):
+                for name in files:
+                    full = os.path.join(root, name)
+                    zf.write(full, os.path.relpath(full, entry.path))
+        # 압축본도 원래 폴더의 마지막 사용 시각을 유지
+        os.utime(archive_path, (entry.last_used, entry.last_used))
+        shutil.rmtree(entry.path, ignore_errors=True)
+        return os.path.getsize(archive_path)
+
+    def sweep(self) -> dict:
+        with self._lock:
+            now = time.time()
+            removed, compressed = [], []
+            entries = [e for e in self.scan() if now - e.last_used > IN_FLIGHT_GRACE_SECONDS]
+
+            # 1. 보관 기간이 지난 것 삭제 (캐시가 쓰는 폴더는 제외)
+            for e in list(entries):
+                if not e.referenced and now - e.last_used > self.max_age_seconds:
+                    self._remove(e); removed.append(e.name); entries.remove(e)
+
+            # 2. 오래된 폴더 압축
+            if self.compress_after_seconds > 0:
+                for e in entries:
+                    if not e.is_archive and not e.referenced and now - e.last_used > self.compress_after_seconds:
+                        e.size = self._compress(e); e.is_archive = True
+                        compressed.append(e.name); e.name = f"{e.name}.zip"; e.path = f"{e.path}.zip"
+
+            # 3. 용량 한도 초과분을 LRU 순서로 삭제 (캐시 참조 없는 것 먼저)
+            total = sum(e.size for e in self.scan())
+            for e in sorted(entries, key=lambda x: (x.referenced, x.last_used)):
+                if total <= self.budget_bytes:
+                    break
+                self._remove(e); removed.append(e.name); total -= e.size
+
+            self.last_sweep = {
+                "at": now,
+                "removed": removed,
+                "compressed": compressed,
+                "total_bytes": total,
+            }
+            if removed or compressed:
+                print(f"🧹 저장소 정리: 삭제 {len(removed)}개, 압축 {len(compressed)}개, 현재 {total / 1024 / 1024:.1f}MB")
+            return self.last_sweep
+
+    # ---------- 백그라운드 실행 ----------
+    def start(self, interval: int = SWEEP_INTERVAL) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, args=(interval,), daemon=True, name="easyscore-retention")
+        self._thread.start()
+
+    def _loop(self, interval: int) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ 저장소 정리 실패: {e}")
+            self._stop.wait(interval)
+
+    def stop(self) -> None:
+        self._stop.set()
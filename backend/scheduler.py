@@ -0,0 +1,138 @@
+# backend/scheduler.py
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+# =========================================================
+# ⚖️ 사용자별 공정 스케줄러
+# - 예전: ThreadPoolExecutor 하나에 먼저 온 순서대로 → 한 사람이 50장짜리 일괄 변환을
+#   올리면 그 뒤의 다른 사람 요청은 전부 끝날 때까지 대기
+# - 지금: 사용자(owner_id)마다 대기열을 따로 두고, 빈 워커가 생기면
+#   대기열들을 돌아가며(round-robin) 하나씩 꺼냄
+#   - weight: 한 번 차례가 왔을 때 연속으로 꺼낼 수 있는 개수 (가중 공정, 기본 1)
+#   - max_concurrent: 한 사용자가 동시에 실행할 수 있는 최대 작업 수
+#     (한도에 걸린 사용자는 건너뛰고 다음 사용자 차례)
+# - 사용자별 한도/가중치는 limits(owner_id) → (max_concurrent, weight) 로 받음 (quotas.py)
+# =========================================================
+
+
+class _Owner:
+    def __init__(self, max_concurrent: int, weight: int):
+        self.queue: Deque[Tuple[Future, Callable, tuple, dict]] = deque()
+        self.running = 0
+        self.max_concurrent = max_concurrent
+        self.weight = weight
+        # 이번 차례에 남은 연속 실행 수
+        self.credit = 0
+
+
+class FairScheduler:
+    def __init__(
+        self,
+        workers: int,
+        limits: Optional[Callable[[Any], Tuple[int, int]]] = None,
+        thread_name_prefix: str = "easyscore-job",
+    ):
+        self.workers = max(1, workers)
+        self._limits = limits or (lambda owner_id: (self.workers, 1))
+        self._owners: Dict[Any, _Owner] = {}
+        # 대기 중인 작업이 있는 사용자 (앞에서부터 차례)
+        self._turns: Deque[Any] = deque()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{thread_name_prefix}_{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, owner_id: Any, fn: Callable, *args, **kwargs) -> Future:
+        # 한도는 제출할 때마다 다시 읽음 (관리자가 바꾼 값이 다음 작업부터 반영)
+        max_concurrent, weight = self._limits(owner_id)
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("스케줄러가 종료되었습니다.")
+            owner = self._owners.get(owner_id)
+            if owner is None:
+                owner = self._owners[owner_id] = _Owner(max_concurrent, weight)
+            owner.max_concurrent = max(1, max_concurrent)
+            owner.weight = max(1, weight)
+            if not owner.queue:
+                self._turns.append(owner_id)
+            owner.queue.append((future, fn, args, kwargs))
+            self._cond.notify()
+        return future
+
+    def _next(self) -> Optional[Tuple[Any, Tuple[Future, Callable, tuple, dict]]]:
+        # self._cond를 잡은 상태에서 호출: 실행할 수 있는 첫 사용자의 작업 하나
+        for _ in range(len(self._turns)):
+            owner_id = self._turns[0]
+            owner = self._owners[owner_id]
+            if owner.running >= owner.max_concurrent:
+                # 동시 실행 한도 → 이번 차례는 넘김
+                owner.credit = 0
+                self._turns.rotate(-1)
+                continue
+            if owner.credit <= 0:
+                owner.credit = owner.weight
+            owner.credit -= 1
+            task = owner.queue.popleft()
+            owner.running += 1
+            if not owner.queue:
+                self._turns.popleft()
+                owner.credit = 0
+            elif owner.credit <= 0:
+                self._turns.rotate(-1)
+            return owner_id, task
+        return None
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                picked = self._next()
+                while picked is None and not self._shutdown:
+                    self._cond.wait()
+                    picked = self._next()
+                if picked is None:
+                    return
+            owner_id, (future, fn, args, kwargs) = picked
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._cond:
+                    owner = self._owners[owner_id]
+                    owner.running -= 1
+                    if not owner.queue and owner.running == 0:
+                        del self._owners[owner_id]
+                    # 한도에 걸려 있던 사용자의 작업이 실행될 수 있으므로 깨움
+                    self._cond.notify()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "owners": {
+                    str(owner_id): {"queued": len(o.queue), "running": o.running,
+                                    "max_concurrent": o.max_concurrent, "weight": o.weight}
+                    for owner_id, o in self._owners.items()
+                },
+            }
+
+    def shutdown(self, cancel_futures: bool = True) -> None:
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                for owner in self._owners.values():
+                    while owner.queue:
+                        owner.queue.popleft()[0].cancel()
+                self._turns.clear()
+            self._cond.notify_all()
@@ -0,0 +1,53 @@
+# test_arrange.py
+# NumPy 편곡/조 분석 엔진(arrange.py, key_analysis.py)이 예전 music21 방식
+# (_simplify_vertical_legacy)과 같은 악보를 만드는지 비교
+import copy
+
+import music21
+import pytest
+
+import ai_engine
+import arrange
+import bench_engine
+import key_analysis
+
+CASES = [
+    # (마디 수, 파트 수, 화음 비율, seed)
+    (16, 1, 0.0, 0),
+    (16, 2, 0.3, 1),
+    (16, 2, 0.8, 2),
+    (16, 4, 0.3, 3),
+]
+
+
+def _signature(score):
+    """파트별 (위치, 길이, 음 높이와 철자) 목록"""
+    return [
+        sorted(
+            (float(n.offset), float(n.duration.quarterLength),
+             tuple(sorted((p.midi, p.nameWithOctave) for p in n.pitches)))
+            for n in part.flatten().notes
+        )
+        for part in score.parts
+    ]
+
+
+@pytest.fixture(scope="module", params=CASES, ids=lambda c: f"{c[0]}m_{c[1]}p_{c[2]}c")
+def score(request):
+    measures, parts, chords, seed = request.param
+    xml = bench_engine.make_score_xml(measures, parts, chords, seed)
+    return music21.converter.parse(xml, format="musicxml")
+
+
+@pytest.mark.parametrize("mode", [mode for mode, _ in ai_engine.LEVEL_MODES])
+def test_matches_legacy(score, mode):
+    new = ai_engine._simplify_vertical(copy.deepcopy(score), mode)
+    legacy = ai_engine._simplify_vertical_legacy(copy.deepcopy(score), mode)
+    assert _signature(new) == _signature(legacy)
+
+
+def test_key_analysis_matches_music21(score):
+    cleaned = ai_engine._force_clean_durations(ai_engine._clean_omr_artifacts(copy.deepcopy(score)))
+    analysis = key_analysis.analyze(arrange.extract(cleaned))
+    expected = cleaned.analyze("key")
+    assert (analysis.tonic, analysis.mode) == (expected.tonic.name, expected.mode)
@@ -1,7 +1,7 @@
 # test_integration.py
 import ai_engine
-import base64
 import os
+import shutil
 import time
 
 # 테스트할 이미지 파일 이름 (고화질 파일!)
@@ -41,20 +41,19 @@ def run_full_process():
         # ==========================================
         print("\n--- 3단계: 결과 파일 저장 중... ---")
         
+        # 결과 파일은 run 폴더에 저장되어 있으므로 경로만 받아서 복사
+        easy = result_files["levels"]["EASY"]
+
         # 3-1. MIDI 파일 저장 (소리)
-        midi_b64 = result_files.get("simplified_midi_base64")
-        if midi_b64:
-            with open("RESULT_simple.mid", "wb") as f:
-                f.write(base64.b64decode(midi_b64))
+        if easy["midi"]:
+            shutil.copyfile(easy["midi"], "RESULT_simple.mid")
             print("🎹 MIDI 파일 저장 완료: RESULT_simple.mid (들어서 확인해보세요!)")
         else:
             print("⚠️ MIDI 파일이 생성되지 않았습니다.")
 
         # 3-2. PNG 파일 저장 (이미지)
-        png_b64 = result_files.get("simplified_image_base64")
-        if png_b64:
-            with open("RESULT_simple.png", "wb") as f:
-                f.write(base64.b64decode(png_b64))
+        if easy["png"]:
+            shutil.copyfile(easy["png"], "RESULT_simple.png")
             print("🖼️ PNG 파일 저장 완료: RESULT_simple.png (열어서 확인해보세요!)")
         else:
             print("⚠️ PNG 파일이 생성되지 않았습니다. (MuseScore 설정이 필요할 수 있음)")
@@ -0,0 +1,120 @@
+# test_pages.py
+# 여러 페이지 악보: PDF 렌더링, 페이지별 결과 합치기, 페이지 목록 캐시 키
+import io
+
+import music21
+import pypdfium2 as pdfium
+import pytest
+from PIL import Image
+
+import ai_engine
+import pdf_pages
+import result_cache
+from workspace import Workspace
+
+
+def _make_pdf(page_sizes) -> bytes:
+    pdf = pdfium.PdfDocument.new()
+    for width, height in page_sizes:
+        pdf.new_page(width, height)
+    buf = io.BytesIO()
+    pdf.save(buf)
+    pdf.close()
+    return buf.getvalue()
+
+
+def _page_score(part_pitches) -> music21.stream.Score:
+    """파트마다 마디 리스트 (마디 = 온음표 음 이름 1개)"""
+    score = music21.stream.Score()
+    for i, pitches in enumerate(part_pitches):
+        part = music21.stream.Part(id=f"P{i + 1}")
+        part.partName = f"Part {i + 1}"
+        for number, name in enumerate(pitches, start=1):
+            measure = music21.stream.Measure(number=number)
+            if number == 1:
+                measure.append(music21.meter.TimeSignature("4/4"))
+            measure.append(music21.note.Note(name, quarterLength=4))
+            part.append(measure)
+        score.insert(0, part)
+    return score
+
+
+def _measures(part):
+    return list(part.getElementsByClass(music21.stream.Measure))
+
+
+# ---------- PDF ----------
+def test_render_pdf_keeps_page_order():
+    # 페이지마다 폭을 다르게 해서 순서를 확인 (72pt = 1인치 → dpi 72면 72px)
+    data = _make_pdf([(72, 100), (144, 100)])
+    assert pdf_pages.is_pdf("application/octet-stream", data)
+    pages = pdf_pages.render_pdf(data, dpi=72)
+    assert len(pages) == 2
+    widths = [Image.open(io.BytesIO(page)).size[0] for page in pages]
+    assert widths == [72, 144]
+    assert all(page[:8] == b"\x89PNG\r\n\x1a\n" for page in pages)
+
+
+def test_render_pdf_respects_max_pages():
+    data = _make_pdf([(72, 72)] * 3)
+    with pytest.raises(ValueError):
+        pdf_pages.render_pdf(data, dpi=36, max_pages=2)
+    assert len(pdf_pages.render_pdf(data, dpi=36, max_pages=3)) == 3
+
+
+def test_render_pdf_rejects_broken_data():
+    with pytest.raises(ValueError):
+        pdf_pages.render_pdf(b"%PDF-1.4 not really a pdf")
+
+
+# ---------- 페이지 합치기 ----------
+def test_merge_fills_missing_part_with_rests():
+    page1 = _page_score([["C5", "D5"], ["C3", "D3"]])
+    # 2페이지에서는 둘째 파트가 인식되지 않음
+    page2 = _page_score([["E5", "F5", "G5"]])
+    merged = ai_engine.merge_page_scores([page1, page2])
+
+    assert len(merged.parts) == 2
+    for part in merged.parts:
+        assert [m.number for m in _measures(part)] == [1, 2, 3, 4, 5]
+    top, bottom = merged.parts
+    assert [n.nameWithOctave for n in top.recurse().notes] == ["C5", "D5", "E5", "F5", "G5"]
+    assert [n.nameWithOctave for n in bottom.recurse().notes] == ["C3", "D3"]
+    # 빈 마디는 쉼표로 채워서 길이가 같음
+    filler = _measures(bottom)[2:]
+    assert all(not m.notes and m.getElementsByClass(music21.note.Rest) for m in filler)
+    assert bottom.highestTime == top.highestTime
+
+
+def test_merge_single_page_is_unchanged():
+    page = _page_score([["C5"]])
+    assert ai_engine.merge_page_scores([page]) is page
+
+
+def test_recognize_pages_merges_in_page_order(tmp_path, monkeypatch):
+    names = {b"page-1": ["C5", "D5"], b"page-2": ["E5"], b"page-3": ["F5", "G5"]}
+
+    def fake_omr(image_bytes, workspace, page=None, wait_for_pool=True):
+        path = workspace.path(f"page_{page:03d}/omr.musicxml")
+        _page_score([names[image_bytes]]).write("musicxml", fp=path)
+        return path
+
+    monkeypatch.setattr(ai_engine, "_run_omr", fake_omr)
+    workspace = Workspace(str(tmp_path), scratch_root="")
+    merged = ai_engine.recognize_pages(list(names), workspace)
+
+    assert [n.nameWithOctave for n in merged.recurse().notes] == ["C5", "D5", "E5", "F5", "G5"]
+    assert [m.number for m in _measures(merged.parts[0])] == [1, 2, 3, 4, 5]
+    # 캐시 일부 적중 시 다시 쓸 합친 악보가 run 폴더에 저장됨
+    assert (tmp_path / workspace.id / ai_engine.MERGED_OMR_NAME).exists()
+
+
+# ---------- 캐시 키 ----------
+def test_cache_key_depends_on_page_order_and_boundaries():
+    params = {"version": 1}
+    assert result_cache.make_key([b"a", b"b"], params) != result_cache.make_key([b"b", b"a"], params)
+    # 페이지를 합친 바이트가 같아도 나누는 위치가 다르면 다른 키
+    assert result_cache.make_key([b"ab", b""], params) != result_cache.make_key([b"a", b"b"], params)
+    assert result_cache.make_key([b"a", b"b"], params) == result_cache.make_key([b"a", b"b"], dict(params))
+    # 1장짜리 목록은 이미지 1장과 같은 키 (예전 캐시 유지)
+    assert result_cache.make_key([b"a"], params) == result_cache.make_key(b"a", params)
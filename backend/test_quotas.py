@@ -0,0 +1,89 @@
+# test_quotas.py
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import auth
+import quotas
+
+
+def _new_user(daily_quota=None, max_concurrent=None, weight=None) -> int:
+    user_id = auth.insert_user(f"quota_{uuid.uuid4().hex[:10]}", "x")
+    quotas.set_limits(user_id, daily_quota, max_concurrent, weight)
+    return user_id
+
+
+def test_defaults_apply_when_not_set():
+    user_id = _new_user()
+    assert quotas.limits(user_id) == {
+        "daily_quota": quotas.DAILY_QUOTA,
+        "max_concurrent": quotas.USER_CONCURRENCY,
+        "weight": quotas.DEFAULT_WEIGHT,
+    }
+
+
+def test_consume_until_limit():
+    user_id = _new_user(daily_quota=2)
+    assert quotas.consume(user_id) == 1
+    assert quotas.consume(user_id) == 2
+    with pytest.raises(quotas.QuotaExceeded) as exc:
+        quotas.consume(user_id)
+    assert (exc.value.used, exc.value.limit) == (2, 2)
+    # 한도 초과는 사용량을 늘리지 않음
+    assert quotas.usage(user_id)["used"] == 2
+    assert quotas.usage(user_id)["remaining"] == 0
+
+
+def test_consume_is_atomic_under_concurrency():
+    user_id = _new_user(daily_quota=5)
+
+    def attempt(_):
+        try:
+            quotas.consume(user_id)
+            return True
+        except quotas.QuotaExceeded:
+            return False
+
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        accepted = sum(ex.map(attempt, range(20)))
+    assert accepted == 5
+    assert quotas.usage(user_id)["used"] == 5
+
+
+def test_zero_quota_means_unlimited():
+    user_id = _new_user(daily_quota=0)
+    for _ in range(5):
+        quotas.consume(user_id)
+    usage = quotas.usage(user_id)
+    assert usage["used"] == 5
+    assert usage["daily_quota"] is None and usage["remaining"] is None
+
+
+def test_usage_resets_on_a_new_day():
+    user_id = _new_user(daily_quota=1)
+    quotas.consume(user_id, day="2000-01-01")
+    with pytest.raises(quotas.QuotaExceeded):
+        quotas.consume(user_id, day="2000-01-01")
+    # 날짜가 바뀌면 0부터 다시 셈
+    assert quotas.consume(user_id) == 1
+    assert 0 < quotas.seconds_until_reset() <= 86400
+
+
+def test_refund_returns_the_charged_day():
+    user_id = _new_user(daily_quota=1)
+    day = quotas.today()
+    quotas.consume(user_id, day=day)
+    quotas.refund(user_id, day)
+    assert quotas.usage(user_id)["used"] == 0
+    # 사용량은 0 아래로 내려가지 않음
+    quotas.refund(user_id, day)
+    assert quotas.consume(user_id, day=day) == 1
+
+
+def test_scheduling_limits():
+    user_id = _new_user(max_concurrent=3, weight=2)
+    assert quotas.scheduling_limits(user_id) == (3, 2)
+    unlimited = _new_user(max_concurrent=0)
+    assert quotas.scheduling_limits(unlimited)[0] == quotas.UNLIMITED
+    assert quotas.scheduling_limits(None) == (quotas.UNLIMITED, quotas.DEFAULT_WEIGHT)
@@ -0,0 +1,87 @@
+# test_result_cache.py
+import os
+import threading
+import time
+
+import result_cache
+
+PARAMS = {"version": 1}
+
+
+def _make_run(base_dir, name, levels=(), omr=True):
+    run_dir = os.path.join(base_dir, name)
+    os.makedirs(run_dir, exist_ok=True)
+    if omr:
+        open(os.path.join(run_dir, "input.mxl"), "wb").close()
+    for level in levels:
+        open(os.path.join(run_dir, f"result_{level}.mid"), "wb").close()
+        open(os.path.join(run_dir, f"result_{level}_final.png"), "wb").close()
+    return run_dir
+
+
+def test_make_key():
+    key = result_cache.make_key(b"image", PARAMS)
+    assert key == result_cache.make_key(b"image", dict(PARAMS))
+    # 파라미터나 이미지가 바뀌면 다른 키
+    assert key != result_cache.make_key(b"image", {"version": 2})
+    assert key != result_cache.make_key(b"other", PARAMS)
+
+
+def test_store_and_lookup(tmp_path):
+    base = str(tmp_path)
+    run_dir = _make_run(base, "run_1", levels=["EASY"])
+    assert result_cache.lookup(base, "k") is None
+
+    result_cache.store(base, "k", run_dir, PARAMS)
+    cached = result_cache.lookup(base, "k")
+    assert cached["run_id"] == "run_1"
+    assert cached["omr"] == os.path.join(run_dir, "input.mxl")
+    assert cached["levels"]["EASY"]["png"] == os.path.join(run_dir, "result_EASY_final.png")
+    assert cached["levels"]["HARD"] == {"midi": None, "png": None}
+
+    assert result_cache.missing(cached, ["EASY"], ["png", "midi"]) == []
+    assert result_cache.missing(cached, ["EASY", "HARD"], ["png"]) == [("HARD", "png")]
+    selected = result_cache.select(cached, ["EASY"], ["png"])
+    assert list(selected["levels"]) == ["EASY"]
+    assert selected["levels"]["EASY"]["midi"] is None
+
+
+def test_store_merges_levels_of_the_same_run(tmp_path):
+    base = str(tmp_path)
+    run_dir = _make_run(base, "run_1", levels=["EASY"])
+    result_cache.store(base, "k", run_dir, PARAMS)
+    _make_run(base, "run_1", levels=["HARD"])
+    result_cache.store(base, "k", run_dir, PARAMS)
+    cached = result_cache.lookup(base, "k")
+    assert cached["levels"]["EASY"]["png"] and cached["levels"]["HARD"]["png"]
+
+
+def test_lookup_drops_entry_when_run_is_deleted(tmp_path):
+    base = str(tmp_path)
+    run_dir = _make_run(base, "run_1", levels=["EASY"])
+    result_cache.store(base, "k", run_dir, PARAMS)
+    assert result_cache.referenced_runs(base) == {"run_1"}
+    os.remove(os.path.join(run_dir, "result_EASY_final.png"))
+    # 일부 파일만 없으면 그 결과만 없는 것으로 취급
+    assert result_cache.lookup(base, "k")["levels"]["EASY"]["png"] is None
+    result_cache.invalidate_run(base, "run_1")
+    assert result_cache.lookup(base, "k") is None
+
+
+def test_key_lock_serializes_same_key():
+    inside = []
+    peak = []
+
+    def work(key):
+        with result_cache.key_lock(key):
+            inside.append(key)
+            peak.append(inside.count("same"))
+            time.sleep(0.02)
+            inside.remove(key)
+
+    threads = [threading.Thread(target=work, args=("same",)) for _ in range(4)]
+    threads.append(threading.Thread(target=work, args=("other",)))
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert max(peak) == 1
+    assert result_cache._key_locks == {}
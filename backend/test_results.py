@@ -0,0 +1,38 @@
+# test_results.py
+import pytest
+
+import ai_engine
+import results
+
+
+def test_parse_range():
+    assert results.parse_range(None, 100) is None
+    assert results.parse_range("bytes=0-9", 100) == (0, 9)
+    assert results.parse_range("bytes=90-", 100) == (90, 99)
+    # 끝이 파일 크기를 넘으면 마지막 바이트까지
+    assert results.parse_range("bytes=50-500", 100) == (50, 99)
+    # 뒤에서부터
+    assert results.parse_range("bytes=-10", 100) == (90, 99)
+    assert results.parse_range("bytes=-500", 100) == (0, 99)
+    # 여러 구간이나 다른 단위는 전체 파일로 응답
+    assert results.parse_range("bytes=0-1,5-6", 100) is None
+    assert results.parse_range("items=0-1", 100) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=10-5", "bytes=-0", "bytes=-"])
+def test_parse_range_unsatisfiable(header):
+    with pytest.raises(ValueError):
+        results.parse_range(header, 100)
+
+
+def test_access_is_granted_per_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_engine, "BASE_OUTPUT_DIR", str(tmp_path))
+    run_dir = tmp_path / "run_20260101_000000_abcd1234"
+    assert not results.has_access(run_dir.name, 1)
+    results.grant_access(str(run_dir), 1)
+    results.grant_access(str(run_dir), 2)
+    results.grant_access(str(run_dir), 1)
+    assert results.has_access(run_dir.name, 1) and results.has_access(run_dir.name, 2)
+    assert not results.has_access(run_dir.name, 3)
+    # run 폴더 이름이 아닌 경로는 거부
+    assert not results.has_access("../run_20260101_000000_abcd1234", 1)
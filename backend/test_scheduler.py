@@ -0,0 +1,89 @@
+# test_scheduler.py
+import threading
+import time
+
+from scheduler import FairScheduler
+
+
+def _run_in_order(scheduler: FairScheduler, submissions):
+    """워커를 잠시 막아둔 상태에서 작업을 모두 넣고, 실행된 순서를 반환"""
+    order = []
+    gate = threading.Event()
+    scheduler.submit("gate", gate.wait, 5)
+    time.sleep(0.05)
+    futures = [scheduler.submit(owner, order.append, f"{owner}{i}") for owner, i in submissions]
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    return order
+
+
+def test_round_robin_between_owners():
+    scheduler = FairScheduler(1)
+    try:
+        # A가 먼저 3개를 넣어도 B가 끝까지 기다리지 않음
+        order = _run_in_order(scheduler, [("A", 1), ("A", 2), ("A", 3), ("B", 1), ("B", 2), ("B", 3)])
+    finally:
+        scheduler.shutdown()
+    assert order == ["A1", "B1", "A2", "B2", "A3", "B3"]
+
+
+def test_weight_takes_consecutive_turns():
+    limits = {"A": (10, 2), "B": (10, 1)}
+    scheduler = FairScheduler(1, limits=lambda owner: limits.get(owner, (10, 1)))
+    try:
+        order = _run_in_order(scheduler, [("A", i) for i in range(1, 5)] + [("B", i) for i in range(1, 3)])
+    finally:
+        scheduler.shutdown()
+    assert order == ["A1", "A2", "B1", "A3", "A4", "B2"]
+
+
+def test_max_concurrent_per_owner():
+    scheduler = FairScheduler(3, limits=lambda owner: (1, 1) if owner == "A" else (3, 1))
+    running = {"A": 0}
+    peak = {"A": 0}
+    lock = threading.Lock()
+
+    def work_a():
+        with lock:
+            running["A"] += 1
+            peak["A"] = max(peak["A"], running["A"])
+        time.sleep(0.05)
+        with lock:
+            running["A"] -= 1
+
+    try:
+        futures = [scheduler.submit("A", work_a) for _ in range(4)]
+        # A가 한도에 걸려 있어도 B는 남는 워커에서 바로 실행됨
+        b = scheduler.submit("B", time.perf_counter)
+        b.result(timeout=1)
+        assert not all(f.done() for f in futures)
+        for future in futures:
+            future.result(timeout=5)
+    finally:
+        scheduler.shutdown()
+    assert peak["A"] == 1
+
+
+def test_exception_is_set_on_future_and_worker_survives():
+    scheduler = FairScheduler(1)
+    try:
+        failed = scheduler.submit("A", lambda: 1 / 0)
+        ok = scheduler.submit("A", lambda: "ok")
+        assert isinstance(failed.exception(timeout=5), ZeroDivisionError)
+        assert ok.result(timeout=5) == "ok"
+        assert scheduler.stats()["owners"] == {}
+    finally:
+        scheduler.shutdown()
+
+
+def test_shutdown_cancels_queued_work():
+    scheduler = FairScheduler(1)
+    gate = threading.Event()
+    running = scheduler.submit("A", gate.wait, 5)
+    time.sleep(0.05)
+    queued = scheduler.submit("B", lambda: "never")
+    scheduler.shutdown(cancel_futures=True)
+    gate.set()
+    assert queued.cancelled()
+    assert running.result(timeout=5) is True
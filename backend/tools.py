@@ -0,0 +1,256 @@
+# backend/tools.py
+import os
+import platform
+import re
+import shutil
+import subprocess
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, List, Optional
+
+# =========================================================
+# 🧰 외부 프로그램 (Audiveris / Java / MuseScore) 찾기
+# - 예전: 변환할 때마다 find_musescore(), 업로드마다 Audiveris 설치 폴더 os.walk,
+#   ai_engine을 import 하기만 해도 배너 출력 + music21 UserSettings 파일 쓰기
+# - 지금: 처음 쓸 때(또는 서버 시작 시 미리) 한 번만 찾아서 경로/버전을 캐시
+#   → ai_engine import는 가벼움 (워커 프로세스, 테스트)
+# - 못 찾은 결과도 잠시 캐시했다가 다시 찾음 (설치 후 서버 재시작 없이 인식)
+#   다시 찾기까지 기다리는 시간 (초):  export EASYSCORE_TOOL_RETRY_SECONDS=60
+# - GET /health/tools 에서 상태 확인 (필수 프로그램이 없으면 503)
+# =========================================================
+CURRENT_OS = platform.system()
+IS_WINDOWS = CURRENT_OS == "Windows"
+IS_MAC = CURRENT_OS == "Darwin"
+USER_MUSESCORE_PATH = r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe"
+
+RETRY_SECONDS = float(os.getenv("EASYSCORE_TOOL_RETRY_SECONDS", "60"))
+VERSION_TIMEOUT = 15
+
+# 변환에 꼭 필요한 프로그램 (하나라도 없으면 /health/tools 가 503)
+REQUIRED_TOOLS = ("audiveris", "java", "musescore")
+
+
+class ToolInfo:
+    def __init__(self, name: str, path: str = "", error: Optional[str] = None, **extra):
+        self.name = name
+        self.path = path
+        self.error = error
+        self.extra = extra
+        self.version: Optional[str] = None
+        self.version_checked = False
+        self.checked_at = time.time()
+
+    @property
+    def found(self) -> bool:
+        return bool(self.path)
+
+    def to_dict(self) -> dict:
+        return {
+            "found": self.found,
+            "path": self.path or None,
+            "version": self.version,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            **self.extra,
+        }
+
+
+# ---------- 찾기 ----------
+def _discover_musescore(registry: "ToolRegistry") -> ToolInfo:
+    if IS_WINDOWS and USER_MUSESCORE_PATH and os.path.exists(USER_MUSESCORE_PATH):
+        return ToolInfo("musescore", USER_MUSESCORE_PATH)
+    search_paths = []
+    if IS_WINDOWS:
+        search_paths = [
+            r"C:\Program Files\MuseScore 4\bin\MuseScore4.exe",
+            r"C:\Program Files (x86)\MuseScore 4\bin\MuseScore4.exe",
+            r"C:\Program Files\MuseScore Studio 4\bin\MuseScore4.exe",
+        ]
+    elif IS_MAC:
+        search_paths = [
+            '/Applications/MuseScore 4.app/Contents/MacOS/mscore',
+            '/Applications/MuseScore Studio 4.app/Contents/MacOS/mscore',
+        ]
+    for path in search_paths:
+        if os.path.exists(path):
+            return ToolInfo("musescore", path)
+    cmd = "MuseScore4" if IS_WINDOWS else "mscore"
+    path = shutil.which(cmd)
+    if path:
+        return ToolInfo("musescore", path)
+    return ToolInfo("musescore", error="MuseScore를 찾을 수 없습니다.")
+
+
+def _discover_audiveris(registry: "ToolRegistry") -> ToolInfo:
+    if IS_WINDOWS:
+        search_roots = [
+            r"C:\Program Files\Audiveris",
+            r"C:\Audiveris",
+            os.path.expanduser(r"~\AppData\Local\Audiveris")
+        ]
+    else:
+        search_roots = ["/Applications/Audiveris.app", "/usr/local/share/audiveris"]
+    for root_dir in search_roots:
+        if not os.path.exists(root_dir):
+            continue
+        for current_root, dirs, files in os.walk(root_dir):
+            if "audiveris.jar" in files:
+                jar_path = os.path.join(current_root, "audiveris.jar")
+                return ToolInfo("audiveris", jar_path, root=os.path.dirname(os.path.dirname(jar_path)))
+    return ToolInfo("audiveris", error="Audiveris를 찾을 수 없습니다.")
+
+
+def _discover_java(registry: "ToolRegistry") -> ToolInfo:
+    # Audiveris에 들어 있는 런타임을 먼저, 없으면 PATH의 java
+    audiveris = registry.get("audiveris")
+    if audiveris.found:
+        install_root = audiveris.extra["root"]
+        for candidate in (
+            os.path.join(install_root, "runtime", "bin", "java.exe"),
+            os.path.join(install_root, "bin", "runtime", "bin", "java.exe"),
+        ):
+            if os.path.exists(candidate):
+                return ToolInfo("java", candidate, bundled=True)
+    path = shutil.which("java")
+    if path:
+        return ToolInfo("java", path, bundled=False)
+    return ToolInfo("java", error="java를 찾을 수 없습니다.")
+
+
+# ---------- 버전 ----------
+_VERSION_RE = re.compile(r"\d+(?:\.\d+)+")
+
+
+def _run_version(cmd: List[str]) -> Optional[str]:
+    proc = subprocess.run(
+        cmd, timeout=VERSION_TIMEOUT,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, shell=False
+    )
+    # java -version은 stderr로 출력
+    for line in (proc.stdout + "\n" + proc.stderr).splitlines():
+        match = _VERSION_RE.search(line)
+        if match:
+            return match.group(0)
+    return None
+
+
+def _jar_version(jar_path: str) -> Optional[str]:
+    with zipfile.ZipFile(jar_path) as jar:
+        manifest = jar.read("META-INF/MANIFEST.MF").decode("utf-8", "replace")
+    for key in ("Implementation-Version", "Specification-Version"):
+        match = re.search(rf"^{key}:\s*(\S+)", manifest, re.MULTILINE)
+        if match:
+            return match.group(1)
+    return None
+
+
+_VERSION_PROBES: Dict[str, Callable[[ToolInfo], Optional[str]]] = {
+    "musescore": lambda info: _run_version([info.path, "--version"]),
+    "java": lambda info: _run_version([info.path, "-version"]),
+    "audiveris": lambda info: _jar_version(info.path),
+}
+
+_DISCOVERERS: Dict[str, Callable[["ToolRegistry"], ToolInfo]] = {
+    "audiveris": _discover_audiveris,
+    "java": _discover_java,
+    "musescore": _discover_musescore,
+}
+
+
+class ToolRegistry:
+    """이름 → ToolInfo 캐시 (처음 get 할 때 찾음, 스레드 안전)"""
+    def __init__(self, discoverers: Dict[str, Callable[["ToolRegistry"], ToolInfo]] = _DISCOVERERS):
+        self._discoverers = discoverers
+        self._tools: Dict[str, ToolInfo] = {}
+        # java 찾기가 audiveris를 다시 get 하므로 재진입 가능한 락
+        self._lock = threading.RLock()
+
+    def get(self, name: str) -> ToolInfo:
+        with self._lock:
+            info = self._tools.get(name)
+            if info is None or (not info.found and time.time() - info.checked_at > RETRY_SECONDS):
+                started = time.perf_counter()
+                info = self._discoverers[name](self)
+                info.extra["discover_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                self._tools[name] = info
+            return info
+
+    def path(self, name: str) -> str:
+        """찾은 경로 (없으면 빈 문자열)"""
+        return self.get(name).path
+
+    def version(self, name: str) -> Optional[str]:
+        """버전은 처음 물어볼 때 한 번만 확인 (프로그램 실행이 필요해서 경로 찾기와 분리)"""
+        info = self.get(name)
+        if info.found and not info.version_checked:
+            try:
+                info.version = _VERSION_PROBES[name](info)
+            except Exception as e:
+                info.extra["version_error"] = str(e)
+            info.version_checked = True
+        return info.version
+
+    def discover_all(self, versions: bool = True) -> Dict[str, ToolInfo]:
+        for name in self._discoverers:
+            if versions:
+                self.version(name)
+            else:
+                self.get(name)
+        with self._lock:
+            return dict(self._tools)
+
+    def refresh(self) -> None:
+        """캐시를 비움 (다음 get에서 다시 찾음)"""
+        with self._lock:
+            self._tools.clear()
+
+    def status(self) -> dict:
+        tools = {name: info.to_dict() for name, info in self.discover_all().items()}
+        missing = [name for name in REQUIRED_TOOLS if not tools[name]["found"]]
+        return {"ready": not missing, "missing": missing, "tools": tools}
+
+
+registry = ToolRegistry()
+
+
+def musescore_path() -> str:
+    return registry.path("musescore")
+
+
+def audiveris_info() -> dict:
+    """예전 find_audiveris_info()와 같은 형식: {jar, root, java_cmd}"""
+    audiveris = registry.get("audiveris")
+    if not audiveris.found:
+        raise RuntimeError(audiveris.error)
+    java = registry.get("java")
+    return {"jar": audiveris.path, "root": audiveris.extra["root"], "java_cmd": java.path or "java"}
+
+
+# =========================================================
+# music21 설정 (MuseScore 경로가 바뀔 때만, 메모리에만)
+# - 예전 setup_music21()은 import/요청마다 UserSettings 파일(~/.music21rc)을 다시 씀
+# - 마지막으로 설정에 성공한 경로를 기억 → 처음에 못 찾았거나(나중에 설치) registry가
+#   다른 경로를 다시 찾으면 그때 다시 설정
+# =========================================================
+_music21_musescore = ""
+_music21_lock = threading.Lock()
+
+
+def configure_music21() -> None:
+    global _music21_musescore
+    ms = musescore_path()
+    if not ms or ms == _music21_musescore:
+        return
+    with _music21_lock:
+        if ms == _music21_musescore:
+            return
+        import music21
+        try:
+            env = music21.environment.Environment()
+            env["musicxmlPath"] = ms
+            env["musescoreDirectPNGPath"] = ms
+        except Exception as e:
+            print(f"⚠️ music21 MuseScore 경로 설정 실패: {e}")
+            return
+        _music21_musescore = ms
@@ -0,0 +1,290 @@
+# backend/tracing.py
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# =========================================================
+# 🔍 요청별 추적 (trace id + 중첩 구간)
+# - 요청마다 Trace 하나 → main.simplify_score / 작업 스레드 / ai_engine 함수들이
+#   contextvars로 같은 Trace에 구간(span)을 쌓음 (스레드를 넘길 때는 copy_context 사용)
+# - 작업이 끝나면 run 폴더의 traces/<trace_id>.json 으로 저장
+#   (캐시 적중이면 캐시된 run 폴더에 저장 → 같은 악보의 요청 기록이 한곳에 모임)
+# - 프로파일링 (그 요청만): 샘플링 스레드가 이 Trace의 구간이 열려 있는 스레드의
+#   파이썬 스택을 주기적으로 수집 → traces/<trace_id>.folded
+#   (flamegraph.pl, speedscope 등에서 바로 열 수 있는 folded stack 형식)
+#   샘플 간격:  export EASYSCORE_PROFILE_INTERVAL_MS=5
+# - Trace가 없으면 span()/traced()는 아무것도 하지 않음 (평소 비용 거의 없음)
+# =========================================================
+TRACE_DIR_NAME = "traces"
+PROFILE_INTERVAL_MS = float(os.getenv("EASYSCORE_PROFILE_INTERVAL_MS", "5"))
+# 이 파일 자체의 프레임은 프로파일에서 뺌
+_THIS_FILE = os.path.abspath(__file__)
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar("easyscore_trace", default=None)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("easyscore_span", default=None)
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attrs: dict):
+        self.trace = trace
+        self.id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+        # 이벤트 루프 스레드는 다른 요청도 같이 처리하므로 프로파일 샘플링 대상에서 뺌
+        try:
+            asyncio.get_running_loop()
+            self.sampled = False
+        except RuntimeError:
+            self.sampled = True
+
+    def to_dict(self) -> dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "id": self.id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "thread": self.thread,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "open": self.end is None,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    def __init__(self, trace_id: Optional[str] = None, profile: bool = False):
+        self.id = trace_id or uuid.uuid4().hex
+        self.profile = profile
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        # 지금 이 Trace의 구간이 열려 있는 스레드 → 열린 구간 수 (프로파일 대상)
+        self._threads: Dict[int, int] = {}
+        self._sampler: Optional["_Sampler"] = None
+
+    def _enter(self, span: Span) -> None:
+        ident = threading.get_ident()
+        with self._lock:
+            self.spans.append(span)
+            if span.sampled:
+                self._threads[ident] = self._threads.get(ident, 0) + 1
+
+    def _exit(self, span: Span) -> None:
+        if not span.sampled:
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            depth = self._threads.get(ident, 0) - 1
+            if depth > 0:
+                self._threads[ident] = depth
+            else:
+                self._threads.pop(ident, None)
+
+    def active_threads(self) -> List[int]:
+        with self._lock:
+            return list(self._threads)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+            samples = sum(self.samples.values())
+        return {
+            "trace_id": self.id,
+            "started_at": self.started_at,
+            "profiled": self.profile,
+            "samples": samples,
+            "spans": [span.to_dict() for span in spans],
+        }
+
+    def save(self, run_dir: str) -> Optional[str]:
+        """run 폴더의 traces/<id>.json (+ 프로파일이면 .folded) 에 저장, 실패해도 요청은 계속"""
+        try:
+            trace_dir = os.path.join(run_dir, TRACE_DIR_NAME)
+            os.makedirs(trace_dir, exist_ok=True)
+            path = os.path.join(trace_dir, f"{self.id}.json")
+            _write_atomic(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=1))
+            folded = self.folded()
+            if folded:
+                _write_atomic(os.path.join(trace_dir, f"{self.id}.folded"), folded)
+            return path
+        except OSError as e:
+            print(f"⚠️ 추적 기록 저장 실패 ({self.id[:8]}): {e}")
+            return None
+
+    def folded(self) -> str:
+        with self._lock:
+            items = sorted(self.samples.items())
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    # ---------- 프로파일링 ----------
+    def start_profiler(self) -> None:
+        with self._lock:
+            if self._sampler is None:
+                self._sampler = _Sampler(self, PROFILE_INTERVAL_MS / 1000)
+                self._sampler.start()
+
+    def stop_profiler(self) -> None:
+        with self._lock:
+            sampler, self._sampler = self._sampler, None
+        if sampler:
+            sampler.stop()
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler(threading.Thread):
+    """interval마다 대상 스레드의 스택을 읽어서 folded stack 별 샘플 수를 셈"""
+    def __init__(self, trace: Trace, interval: float):
+        super().__init__(name=f"easyscore-profile-{trace.id[:8]}", daemon=True)
+        self.trace = trace
+        self.interval = max(0.001, interval)
+        self._stop_event = threading.Event()
+        self._samples: Counter = Counter()
+
+    def run(self) -> None:
+        names = {}
+        # 코드 객체 → 라벨 (이 파일의 프레임은 None)
+        labels = {}
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self.trace.active_threads():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code not in labels:
+                        labels[code] = None if os.path.abspath(code.co_filename) == _THIS_FILE else _frame_label(frame)
+                    if labels[code]:
+                        stack.append(labels[code])
+                    frame = frame.f_back
+                if ident not in names:
+                    names[ident] = next((t.name for t in threading.enumerate() if t.ident == ident), str(ident))
+                stack.append(names[ident])
+                self._samples[";".join(reversed(stack))] += 1
+            del frames
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join(timeout=1)
+        with self.trace._lock:
+            self.trace.samples.update(self._samples)
+
+
+# =========================================================
+# 사용하는 쪽 API
+# =========================================================
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def profiling() -> bool:
+    trace = _current_trace.get()
+    return trace is not None and trace.profile
+
+
+@contextmanager
+def activate(trace: Trace):
+    """이 블록 안(과 여기서 copy_context로 넘긴 스레드)의 구간은 trace에 기록됨"""
+    if _current_trace.get() is trace:
+        # 이미 활성화된 trace면 지금 구간 아래에 그대로 이어서 기록
+        yield trace
+        return
+    trace_token = _current_trace.set(trace)
+    span_token = _current_span.set(None)
+    try:
+        yield trace
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(trace, name, parent.id if parent else None, attrs)
+    trace._enter(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        trace._exit(current)
+
+
+def traced(name: Optional[str] = None):
+    """함수 전체를 구간으로 기록하는 데코레이터 (이름 생략 시 함수 이름)"""
+    def decorate(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def record(name: str, seconds: float, **attrs) -> None:
+    """다른 프로세스에서 잰 시간을 지금 구간의 자식으로 기록 (끝난 시각 = 지금)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    parent = _current_span.get()
+    done = Span(trace, name, parent.id if parent else None, attrs)
+    done.end = time.perf_counter()
+    done.start = done.end - seconds
+    with trace._lock:
+        trace.spans.append(done)
+
+
+@contextmanager
+def profile_session():
+    """지금 Trace가 프로파일 요청이면 블록 동안 샘플링"""
+    trace = _current_trace.get()
+    if trace is None or not trace.profile:
+        yield
+        return
+    trace.start_profiler()
+    try:
+        yield
+    finally:
+        trace.stop_profiler()
@@ -0,0 +1,117 @@
+# backend/workspace.py
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, List, Optional
+
+import metrics
+import tracing
+
+# =========================================================
+# 📁 요청(작업)별 작업 공간
+# - 요청마다 고유 id(run_날짜_시간_랜덤)를 가진 폴더를 만들고,
+#   모든 ai_engine 단계에 이 객체를 직접 넘김
+#   (예전처럼 "가장 최근 run_ 폴더"를 찾지 않으므로 동시 요청이 섞이지 않음)
+# - 중간 파일(Audiveris 내부 파일, 투명 PNG 등)은 scratch 폴더에 두고,
+#   남길 결과물만 run 폴더로 옮김
+# - scratch를 램디스크에 두려면:  export EASYSCORE_SCRATCH_DIR=/dev/shm/easyscore
+#   (설정하지 않으면 run 폴더를 그대로 scratch로 사용 = 예전과 동일)
+# - 진행 상황: 각 단계를 `with workspace.stage("omr"):` 로 감싸면
+#   구독자(listen)에게 stage_start / stage_end(소요 시간) 이벤트가 전달됨
+#   (소요 시간은 metrics의 단계별 히스토그램과 요청의 추적 구간에도 기록)
+# =========================================================
+SCRATCH_ROOT = os.getenv("EASYSCORE_SCRATCH_DIR", "")
+
+
+class Workspace:
+    def __init__(self, base_dir: str, scratch_root: Optional[str] = None, run_id: Optional[str] = None):
+        # run_id를 주면 기존 run 폴더에 이어서 작업 (캐시에 없는 결과물만 추가로 만들 때)
+        if run_id is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            run_id = f"run_{timestamp}_{uuid.uuid4().hex[:8]}"
+        self.id = run_id
+        self.base_dir = base_dir
+        self.run_dir = os.path.join(base_dir, self.id)
+        scratch_root = SCRATCH_ROOT if scratch_root is None else scratch_root
+        self.scratch_dir = os.path.join(scratch_root, self.id) if scratch_root else self.run_dir
+        self._scratch_root = scratch_root
+        self._listeners: List[Callable[[str, dict], None]] = []
+
+    def reopen(self, run_id: str) -> "Workspace":
+        """같은 설정과 구독자로 다른(기존) run 폴더를 여는 Workspace"""
+        other = Workspace(self.base_dir, self._scratch_root, run_id=run_id)
+        other._listeners = self._listeners
+        return other
+
+    # ---------- 진행 이벤트 ----------
+    def listen(self, callback: Callable[[str, dict], None]) -> None:
+        self._listeners.append(callback)
+
+    def emit(self, event: str, **data) -> None:
+        for callback in self._listeners:
+            try:
+                callback(event, data)
+            except Exception as e:
+                # 이벤트 전달 실패로 변환 작업이 멈추면 안 됨
+                print(f"⚠️ 진행 이벤트 전달 실패 ({event}): {e}")
+
+    @contextmanager
+    def stage(self, name: str, **data):
+        self.emit("stage_start", stage=name, **data)
+        start = time.perf_counter()
+        try:
+            with tracing.span(name, **data):
+                yield
+        except Exception as e:
+            elapsed = time.perf_counter() - start
+            metrics.observe_stage(name, elapsed, ok=False)
+            self.emit("stage_end", stage=name, ok=False, error=str(e),
+                      elapsed_ms=round(elapsed * 1000, 1), **data)
+            raise
+        elapsed = time.perf_counter() - start
+        metrics.observe_stage(name, elapsed)
+        self.emit("stage_end", stage=name, ok=True,
+                  elapsed_ms=round(elapsed * 1000, 1), **data)
+
+    @property
+    def separate_scratch(self) -> bool:
+        return self.scratch_dir != self.run_dir
+
+    def path(self, name: str) -> str:
+        """run 폴더에 남길 결과물 경로 (폴더는 처음 쓸 때 생성, "page_001/input.png" 같은 하위 경로 가능)"""
+        full = os.path.join(self.run_dir, name)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return full
+
+    def scratch(self, name: str) -> str:
+        """중간 파일 경로 (cleanup 시 삭제됨)"""
+        full = os.path.join(self.scratch_dir, name)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        return full
+
+    def keep(self, scratch_path: str) -> str:
+        """scratch에 만든 파일을 run 폴더의 같은 상대 경로로 옮기고 새 경로 반환"""
+        if not self.separate_scratch or not os.path.exists(scratch_path):
+            return scratch_path
+        rel = os.path.relpath(scratch_path, self.scratch_dir)
+        if rel.startswith(os.pardir):
+            rel = os.path.basename(scratch_path)
+        target = self.path(rel)
+        shutil.move(scratch_path, target)
+        return target
+
+    def cleanup(self) -> None:
+        if self.separate_scratch:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cleanup()
+
+    def __repr__(self) -> str:
+        return f"Workspace({self.id})"
@@ -2,9 +2,11 @@
 
 import streamlit as st
 import requests
-import base64
-import re
+import math
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from streamlit_lottie import st_lottie
 
 # =============================================================================
@@ -21,6 +23,8 @@ st.set_page_config(
 # 2. 세션 및 유틸리티 설정
 # =============================================================================
 DEFAULT_BACKEND = "http://127.0.0.1:8000"
+# 일괄 변환 시 동시에 올리는 업로드 요청 수:  export EASYSCORE_UPLOAD_PARALLELISM=4
+UPLOAD_PARALLELISM = max(1, int(os.getenv("EASYSCORE_UPLOAD_PARALLELISM", "4")))
 
 # [NEW] 변환 결과를 저장할 세션 상태 추가 (새로고침 방지)
 if "conversion_results" not in st.session_state: st.session_state.conversion_results = []
@@ -31,14 +35,64 @@ if "username" not in st.session_state: st.session_state.username = ""
 if "show_auth" not in st.session_state: st.session_state.show_auth = False
 if "backend_url" not in st.session_state: st.session_state.backend_url = DEFAULT_BACKEND
 
-def safe_b64_decode(b64: str) -> bytes:
-    if not b64: return b""
-    b64 = re.sub(r"\s+", "", b64)
-    return base64.b64decode(b64)
+# 백엔드 호출용 공용 HTTP 세션 (모든 사용자/재실행이 같은 연결 풀을 keep-alive로 재사용)
+@st.cache_resource
+def get_http() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=UPLOAD_PARALLELISM + 4)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+# 결과 파일은 JSON에 base64로 오지 않고 /results/... URL로 따로 받아옴
+# (같은 URL은 다시 받지 않도록 캐시, run_id가 URL에 들어있어서 결과마다 다름)
+# 원본 크기 이미지/MIDI는 탭을 열거나 다운로드를 누를 때만 받음 → 캐시 개수를 작게 유지
+def download_artifact(url: str, token: str, backend_url: str = "") -> bytes:
+    if not url: return b""
+    r = get_http().get(f"{backend_url or st.session_state.backend_url}{url}", headers={"Authorization": f"Bearer {token}"}, timeout=60)
+    r.raise_for_status()
+    return r.content
+
+# st.cache_data는 모든 사용자 세션이 공유 → 토큰과 백엔드 주소도 키에 넣어서
+# 다른 사용자가 같은 URL을 요청해도 백엔드 권한 확인 없이 남의 결과를 받지 않게 함
+@st.cache_data(max_entries=16, ttl=1800, show_spinner=False)
+def _fetch_artifact_cached(backend_url: str, url: str, token: str) -> bytes:
+    return download_artifact(url, token, backend_url)
+
+def fetch_artifact(url: str, token: str) -> bytes:
+    return _fetch_artifact_cached(st.session_state.backend_url, url, token)
+
+def to_session_entry(item: dict) -> dict:
+    """
+    일괄 변환 결과 → 세션에 남길 최소 정보 (파일 이름, job_id, 결과 URL, 작은 썸네일)
+    원본 이미지/MIDI 바이트는 세션에 넣지 않음
+    """
+    if item["status"] != "done":
+        return {"filename": item["filename"], "job_id": item.get("job_id"), "error": item.get("error"), "success": False}
+    levels = item["result"]["levels"]
+    thumb_url = next((files["thumb_url"] for files in levels.values() if files.get("thumb_url")), None)
+    try:
+        thumbnail = download_artifact(thumb_url, st.session_state.token) if thumb_url else None
+    except Exception:
+        thumbnail = None
+    return {
+        "filename": item["filename"],
+        "job_id": item.get("job_id"),
+        "run_id": item["result"]["run_id"],
+        "levels": {name: {"image_url": f.get("image_url"), "midi_url": f.get("midi_url")} for name, f in levels.items()},
+        "thumbnail": thumbnail,
+        "success": True,
+    }
+
+# 변환 단계 이름 (서버가 알려주는 현재 단계 → 화면 표시용)
+STAGE_LABELS = {
+    "preprocess": "이미지 전처리", "omr": "악보 인식", "load_score": "악보 정리",
+    "arrange": "난이도 편곡", "musescore": "MIDI/이미지 변환", "composite": "이미지 마무리",
+}
 
 def load_lottieurl(url: str):
     try:
-        r = requests.get(url, timeout=3)
+        r = get_http().get(url, timeout=3)
         return r.json() if r.status_code == 200 else None
     except: return None
 
@@ -113,7 +167,8 @@ st.markdown("""
         border: 1px solid #c3fae8;
     }
 
-    img.score-image-shadow {
+    [data-testid="stExpander"] [data-testid="stImage"] img { max-height: 80vh; width: auto !important; margin: 0 auto; }
+    img.score-image-shadow, [data-testid="stExpander"] [data-testid="stImage"] img {
         border-radius: 12px;
         box-shadow: 0 15px 50px rgba(0,0,0,0.12);
         border: 1px solid #eaeaea;
@@ -204,7 +259,7 @@ def render_login_page():
         st.write(""); l_id = st.text_input("아이디", key="login_id"); l_pw = st.text_input("비밀번호", type="password", key="login_pw"); st.write("") 
         if st.button("로그인하기", use_container_width=True, key="btn_login"):
             try:
-                r = requests.post(f"{st.session_state.backend_url}/auth/login", json={"username": l_id, "password": l_pw})
+                r = get_http().post(f"{st.session_state.backend_url}/auth/login", json={"username": l_id, "password": l_pw})
                 if r.status_code == 200:
                     data = r.json(); st.session_state.logged_in = True; st.session_state.token = data["access_token"]; st.session_state.username = l_id; st.session_state.show_auth = False; st.success("로그인 성공!"); st.rerun()
                 else: st.error(f"실패: {r.json().get('detail')}")
@@ -215,7 +270,7 @@ def render_login_page():
         st.write(""); r_id = st.text_input("새 아이디", key="reg_id"); r_pw = st.text_input("새 비밀번호", type="password", key="reg_pw"); st.write("")
         if st.button("가입하기", use_container_width=True, key="btn_reg"):
             try:
-                r = requests.post(f"{st.session_state.backend_url}/auth/register", json={"username": r_id, "password": r_pw})
+                r = get_http().post(f"{st.session_state.backend_url}/auth/register", json={"username": r_id, "password": r_pw})
                 if r.status_code == 200: st.success("가입 완료! 로그인 탭에서 로그인하세요. ")
                 else: st.error(f"실패: {r.json().get('detail')}")
             except Exception as e: st.error(f"오류: {e}")
@@ -272,7 +327,8 @@ def render_main_page():
         return
 
     with st.container():
-        uploaded_files = st.file_uploader("악보 이미지를 업로드하세요 (JPG, PNG)", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+        # PDF는 파일 하나가 여러 페이지짜리 악보 하나로 변환됨
+        uploaded_files = st.file_uploader("악보 이미지 또는 PDF를 업로드하세요 (JPG, PNG, PDF)", type=["png", "jpg", "jpeg", "pdf"], accept_multiple_files=True)
 
     # ------------------------------------------------------------------------------------------------
     # 🔥 [수정됨] 1. 변환 버튼 로직 (세션에 저장하고 Rerun)
@@ -290,49 +346,72 @@ def render_main_page():
             # 진행상황을 보여줄 컨테이너 미리 생성 (처리 중에만 보임)
             temp_containers = [st.container() for _ in range(len(uploaded_files))]
 
-            for idx, uploaded_file in enumerate(uploaded_files):
-                current_num = idx + 1
-                total_count = len(uploaded_files)
-                status_text.markdown(f"### 🔄 [{current_num}/{total_count}] **{uploaded_file.name}** 변환 중...")
-                
-                try:
-                    API_URL = f"{st.session_state.backend_url}/simplify"
-                    files = {"file": (uploaded_file.name, uploaded_file.getvalue(), uploaded_file.type)}
-                    headers = {"Authorization": f"Bearer {st.session_state.token}"}
-                    r = requests.post(API_URL, files=files, headers=headers, timeout=300)
-                    
-                    if r.status_code == 200:
-                        result_data = r.json()
-                        # 🔥 세션에 저장 (이름과 결과 데이터)
-                        st.session_state.conversion_results.append({
-                            "filename": uploaded_file.name,
-                            "data": result_data,
-                            "success": True
-                        })
-                        with temp_containers[idx]:
-                            st.success(f"✅ {uploaded_file.name} 완료")
-                    
-                    elif r.status_code == 401:
-                        st.error("로그인이 만료되었습니다."); st.session_state.logged_in = False; st.rerun(); break
-                    else:
-                        st.session_state.conversion_results.append({
-                            "filename": uploaded_file.name,
-                            "error": r.text,
-                            "success": False
-                        })
-                        with temp_containers[idx]:
-                            st.error(f"❌ {uploaded_file.name} 실패")
-                            
-                except Exception as e:
-                    st.session_state.conversion_results.append({
-                        "filename": uploaded_file.name,
-                        "error": str(e),
-                        "success": False
-                    })
-                    with temp_containers[idx]:
-                        st.error(f"❌ {uploaded_file.name} 에러")
-                
-                total_progress.progress(int((current_num / total_count) * 100))
+            headers = {"Authorization": f"Bearer {st.session_state.token}"}
+            # 화면에 보여줄 난이도/형식만 요청 (HARD는 만들지 않음)
+            data = {"levels": "easy,super_easy", "formats": "png,midi"}
+            http = get_http()
+            placeholders = [c.empty() for c in temp_containers]
+            for f, box in zip(uploaded_files, placeholders): box.caption(f"📤 {f.name} 업로드 대기")
+
+            # 파일을 UPLOAD_PARALLELISM개 묶음으로 나눠서 동시에 업로드 (각 묶음 = /simplify/batch 1번)
+            chunk_size = math.ceil(len(uploaded_files) / UPLOAD_PARALLELISM)
+            chunks = [list(range(i, min(i + chunk_size, len(uploaded_files)))) for i in range(0, len(uploaded_files), chunk_size)]
+
+            def upload_chunk(indices):
+                files = [("files", (uploaded_files[i].name, uploaded_files[i].getvalue(), uploaded_files[i].type)) for i in indices]
+                return http.post(f"{st.session_state.backend_url}/simplify/batch", files=files, data=data, headers=headers, timeout=120)
+
+            # items[i] = i번째 파일의 최신 상태, locations[i] = (batch_id, 묶음 안의 순번)
+            items = [{"filename": f.name, "status": "uploading"} for f in uploaded_files]
+            locations = {}
+            batches = {}
+            status_text.markdown(f"### 📤 {len(uploaded_files)}장 업로드 중... (동시 {len(chunks)}개)")
+            with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                futures = {pool.submit(upload_chunk, chunk): chunk for chunk in chunks}
+                # UI 갱신은 이 스레드에서만 (업로드가 끝나는 순서대로)
+                for future in as_completed(futures):
+                    chunk = futures[future]
+                    try:
+                        r = future.result()
+                        if r.status_code == 401:
+                            st.error("로그인이 만료되었습니다."); st.session_state.logged_in = False; st.rerun()
+                        r.raise_for_status()
+                        batch = r.json()
+                        batches[batch["batch_id"]] = batch
+                        for pos, i in enumerate(chunk):
+                            locations[i] = (batch["batch_id"], pos)
+                            items[i] = batch["items"][pos]
+                            placeholders[i].caption(f"⏳ {items[i]['filename']} 대기 중")
+                    except Exception as e:
+                        for i in chunk:
+                            items[i] = {"filename": uploaded_files[i].name, "status": "failed", "error": f"업로드 실패: {e}"}
+
+            # 진행 상황 확인 (파일별 상태 표시)
+            while True:
+                for item, box in zip(items, placeholders):
+                    if item["status"] == "done": box.success(f"✅ {item['filename']} 완료")
+                    elif item["status"] == "failed": box.error(f"❌ {item['filename']} 실패")
+                    elif item["status"] == "running": box.info(f"🔄 {item['filename']} {STAGE_LABELS.get(item.get('stage'), '변환')} 중...")
+                    else: box.caption(f"⏳ {item['filename']} 대기 중")
+                done_count = sum(1 for item in items if item["status"] in ("done", "failed"))
+                running = sum(1 for item in items if item["status"] == "running")
+                total_progress.progress(int(done_count / len(items) * 100))
+                status_text.markdown(f"### 🔄 [{done_count}/{len(items)}] 변환 중... (동시 처리 {running}개)")
+                if all(b["finished"] for b in batches.values()): break
+                time.sleep(1)
+                for batch_id, batch in list(batches.items()):
+                    if batch["finished"]: continue
+                    try:
+                        r = http.get(f"{st.session_state.backend_url}/simplify/batch/{batch_id}", headers=headers, timeout=30)
+                        r.raise_for_status()
+                        batches[batch_id] = r.json()
+                    except Exception as e:
+                        status_text.warning(f"⚠️ 진행 상황 확인 재시도 중: {e}")
+                for i, (batch_id, pos) in locations.items():
+                    items[i] = batches[batch_id]["items"][pos]
+
+            # 🔥 세션에 저장 (업로드한 순서대로, URL과 썸네일만)
+            st.session_state.conversion_results = [to_session_entry(item) for item in items]
 
             status_text.success("모든 변환 작업이 완료되었습니다! 결과가 아래에 표시됩니다.")
             time.sleep(1) # 잠시 대기 후 리프레시
@@ -345,55 +424,69 @@ def render_main_page():
         st.markdown("---")
         st.subheader("🎹 변환 결과 확인 및 다운로드")
         
-        for item in st.session_state.conversion_results:
+        for n, item in enumerate(st.session_state.conversion_results):
             fname = item["filename"]
             
             if not item["success"]:
                 st.error(f"❌ {fname} 변환 실패: {item.get('error', '알 수 없는 오류')}")
                 continue
 
-            result = item["data"]
-            
-            # 기존 UI 코드를 그대로 사용하여 결과 표시
-            with st.expander(f"완료: {fname}", expanded=True):
-                t_easy, t_super = st.tabs(["Easy", "Super Easy"])
+            # 닫혀 있는 결과는 썸네일만 표시, 펼친 결과의 선택된 탭만 원본 크기로 받아옴
+            c_thumb, c_body = st.columns([1, 6], vertical_alignment="top")
+            with c_thumb:
+                if item.get("thumbnail"): st.image(item["thumbnail"], use_container_width=True)
+            with c_body:
+                panel = st.expander(f"완료: {fname}", expanded=False, key=f"exp_{n}_{item['run_id']}", on_change="rerun")
+            if not panel.open:
+                continue
+            with panel:
+                t_easy, t_super = st.tabs(["Easy", "Super Easy"], key=f"tabs_{n}_{item['run_id']}", on_change="rerun")
                 
-                def show_res(ikey, mkey, pre):
-                    ib64 = result.get(ikey) or result.get("simplified_image_base64")
-                    mb64 = result.get(mkey) or result.get("simplified_midi_base64")
+                def show_res(level, pre):
+                    files = item["levels"].get(level) or {}
+                    if not files.get("image_url"):
+                        st.info("이 난이도의 결과가 없습니다.")
+                        return
+                    try:
+                        img_bytes = fetch_artifact(files["image_url"], st.session_state.token)
+                    except Exception as e:
+                        st.error(f"결과 파일을 불러오지 못했습니다: {e}")
+                        return
+                    
+                    # 레이아웃 비율 유지
+                    _, c_control, c_sheet = st.columns([0.4, 1.2, 3.0], vertical_alignment="center")
+                    filename_prefix = f"{fname}_{pre}"
                     
-                    if ib64:
-                        # 레이아웃 비율 유지
-                        _, c_control, c_sheet = st.columns([0.4, 1.2, 3.0], vertical_alignment="center")
-                        filename_prefix = f"{fname}_{pre}"
+                    with c_control:
+                        st.markdown(f"""
+                        <div class="control-panel-box">
+                            <div class="success-badge">✨ Conversion Success</div>
+                            <span class="info-label">File Name</span>
+                            <span class="info-value">{fname}</span>
+                            <span class="info-label">Mode</span>
+                            <span class="info-value">{pre.replace('_', ' ').title()}</span>
+                            <hr style="margin: 15px 0; border: 0; border-top: 1px solid #ddd;">
+                            <p style="font-size:0.9rem; color:#666;">아래 버튼을 눌러 저장하세요.</p>
+                        </div>
+                        """, unsafe_allow_html=True)
                         
-                        with c_control:
-                            st.markdown(f"""
-                            <div class="control-panel-box">
-                                <div class="success-badge">✨ Conversion Success</div>
-                                <span class="info-label">File Name</span>
-                                <span class="info-value">{fname}</span>
-                                <span class="info-label">Mode</span>
-                                <span class="info-value">{pre.replace('_', ' ').title()}</span>
-                                <hr style="margin: 15px 0; border: 0; border-top: 1px solid #ddd;">
-                                <p style="font-size:0.9rem; color:#666;">아래 버튼을 눌러 저장하세요.</p>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            
+                        st.write("")
+                        # 🔥 [핵심] 다운로드 버튼을 눌러도 이 블록은 st.session_state 덕분에 사라지지 않음
+                        st.download_button("🖼️ 이미지 다운로드", img_bytes, f"{filename_prefix}.png", "image/png", use_container_width=True, key=f"btn_img_{filename_prefix}")
+                        if files.get("midi_url"):
                             st.write("")
-                            # 🔥 [핵심] 다운로드 버튼을 눌러도 이 블록은 st.session_state 덕분에 사라지지 않음
-                            st.download_button("🖼️ 이미지 다운로드", safe_b64_decode(ib64), f"{filename_prefix}.png", "image/png", use_container_width=True, key=f"btn_img_{filename_prefix}")
-                            if mb64:
-                                st.write("")
-                                st.download_button("🎵 MIDI 다운로드", safe_b64_decode(mb64), f"{filename_prefix}.mid", "audio/midi", use_container_width=True, key=f"btn_mid_{filename_prefix}")
-                        
-                        with c_sheet:
-                            clean_b64 = re.sub(r"\s+", "", ib64)
-                            img_html = f'<img src="data:image/png;base64,{clean_b64}" class="score-image-shadow" style="max-height: 80vh; width: auto; max-width: 100%; display: block; margin: 0 auto;">'
-                            st.markdown(img_html, unsafe_allow_html=True)
-
-                with t_easy: show_res("easy_image_base64", "easy_midi_base64", "easy_score")
-                with t_super: show_res("super_easy_image_base64", "super_easy_midi_base64", "super_easy_score")
+                            # MIDI는 버튼을 누를 때 받아옴
+                            midi_url = files["midi_url"]
+                            st.download_button("🎵 MIDI 다운로드", lambda: fetch_artifact(midi_url, st.session_state.token), f"{filename_prefix}.mid", "audio/midi", use_container_width=True, key=f"btn_mid_{filename_prefix}")
+                    
+                    with c_sheet:
+                        # data: URI 대신 st.image → Streamlit이 URL로 내려줘서 페이지에 바이트가 쌓이지 않음
+                        st.image(img_bytes, use_container_width=True)
+
+                if t_easy.open:
+                    with t_easy: show_res("easy", "easy_score")
+                if t_super.open:
+                    with t_super: show_res("super_easy", "super_easy_score")
         
         # 다시하기 버튼
         if st.button("다른 악보 변환하기 (초기화)", use_container_width=True):